@@ -1,14 +1,27 @@
 DEBUG = False
 
 from abc import ABC, abstractmethod
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from enum import Enum
 from typing import Any, TypeAlias
 from datetime import datetime
+from bisect import bisect_left, bisect_right
+from heapq import heappop, heappush
 import sys
 
+from indexes import OrderIndex, IntervalTree, ActionColumns, EndpointTable, TimeRange, UNBOUNDED, INF_END, np
+
 # get_possible_values and get_possible_actions are not used, as well as forallquantifier and existsquantifier
 
+# Action types with fewer occurrences than this are scanned, as querying an index would not pay off
+INDEX_THRESHOLD = 16
+
+# Innermost quantifiers over at least this many occurrences are evaluated on columns, when NumPy is available
+VECTORIZE_THRESHOLD = 32
+
+# Default number of results kept by each memoized subformula
+MEMO_SIZE = 4096
+
 VarCollection : TypeAlias = dict[tuple["ActionType", int], list[str]]
 
 class ActionType(Enum):
@@ -29,7 +42,9 @@ class ActionType(Enum):
         return value in cls._value2member_map_
 
 class ActionValue():
-    def __init__(self, action_type: ActionType, interval_value: "IntervalValue", input_values: list[str], output_values: list[str]):
+    __slots__ = ("action_type", "interval_value", "input_values", "output_values")
+
+    def __init__(self, action_type: ActionType, interval_value: "IntervalValue", input_values: list[int], output_values: list[int]):
         self.action_type = action_type
         self.interval_value = interval_value
         self.input_values = input_values
@@ -41,15 +56,15 @@ class ActionValue():
     def get_interval_value(self) -> "IntervalValue":
         return self.interval_value
 
-    def get_input_values(self) -> list[str]:
+    def get_input_values(self) -> list[int]:
         return self.input_values
 
-    def get_output_values(self) -> list[str]:
+    def get_output_values(self) -> list[int]:
         return self.output_values
         self.output_values = output_values
 
     # Completes the action's end time point and sets the output values if missing
-    def complete_end(self, interval_end: int, output_values: list[str]) -> bool:
+    def complete_end(self, interval_end: int, output_values: list[int]) -> bool:
         if self.interval_value.end != float("inf") or self.output_values != []:
             return False
         else:
@@ -66,11 +81,11 @@ class ActionValue():
 
     def __repr__(self) -> str:
         # return f"ActionValue({self.action_type}, {self.interval_value}, {self.input_values}, {self.output_values})"
-        return f"({self.interval_value.begin, self.interval_value.end}, ({', '.join(self.input_values)}), ({', '.join(self.output_values)}))"
+        return f"({self.interval_value.begin, self.interval_value.end}, ({', '.join(map(SYMBOLS.name, self.input_values))}), ({', '.join(map(SYMBOLS.name, self.output_values))}))"
 
 class Event(ABC):
     @abstractmethod
-    def __init__(self, action_type: ActionType, id: str | None, values: str | list[str], time: datetime | None):
+    def __init__(self, action_type: ActionType, id: str | None, values: int | list[int], time: datetime | None):
         self.action_type = action_type
         self.id = id
         self.values = values if isinstance(values, list) else [values]
@@ -97,7 +112,7 @@ class Event(ABC):
         time_str = self.get_time().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
         action_type_str = self.action_type_str()
         id_str = self.get_id()
-        values_str = ', '.join(self.values)
+        values_str = ', '.join(map(SYMBOLS.name, self.values))
         return f"{time_str}, {action_type_str}, {id_str}, {values_str}"
 
     @abstractmethod
@@ -116,7 +131,7 @@ class Event(ABC):
 
     def __repr__(self):
         # return f"({self.time}, {self.id}, {self.action_type}, {self.values})"
-        return f"⟨{self.action_type.name.lower()}⟩_{self.id} ({', '.join(self.values)})"
+        return f"⟨{self.action_type.name.lower()}⟩_{self.id} ({', '.join(map(SYMBOLS.name, self.values))})"
 
 class BeginEvent(Event):
     def __init__(self, action_type, id, values, time):
@@ -158,12 +173,25 @@ class Trace:
 
         #NOTE: input and output values used only for variable quantifiers, which are currently not used
         if input_values is None:
-            input_values = defaultdict(list) # { (LOOKUP, 63) : list[str] }
+            input_values = defaultdict(list) # { (LOOKUP, 63) : list[int] }
         self.input_values = input_values
         if output_values is None:
             output_values = defaultdict(list)
         self.output_values = output_values
 
+        # Indexes are built on first use and discarded whenever the occurrences of their action type change
+        self.order_indexes: dict[ActionType, OrderIndex] = {}
+        self.interval_trees: dict[ActionType, IntervalTree] = {}
+        self.arity_buckets: dict[ActionType, dict[tuple[int, int], list[ActionValue]]] = {}
+        self.columns: dict[ActionType, dict[tuple[int, int], ActionColumns]] = {}
+        self.endpoint_tables: dict[ActionType, dict[tuple[int, int, tuple[int, ...]], dict[tuple, EndpointTable]]] = {}
+
+        # Occurrences by input or output value, updated as events are inserted: { (LOOKUP, 1) : { key : list[ActionValue] } }
+        self.input_index: dict[tuple[ActionType, int], dict[int, list[ActionValue]]] = {}
+        self.output_index: dict[tuple[ActionType, int], dict[int, list[ActionValue]]] = {}
+        # Incremented whenever an occurrence is inserted or completed, to discard results cached for older versions
+        self.version = 0
+
     def __len__(self) -> int:
         return len(self.events)
 
@@ -179,7 +207,7 @@ class Trace:
             self.events[-1].add(event) # same time point
         return len(self.events) - 1
 
-    def insert_begin_event(self, action_type: ActionType, id: str, input_values: list[str], time: datetime) -> ActionValue:
+    def insert_begin_event(self, action_type: ActionType, id: str, input_values: list[int], time: datetime) -> ActionValue:
         # Insert event into trace
         event = BeginEvent(action_type, id, input_values, time)
         begin_timepoint = self.insert_event(event)
@@ -187,12 +215,14 @@ class Trace:
         interval_value = IntervalValue(begin_timepoint)
         action_value = ActionValue(action_type, interval_value, input_values, [])
         self.actions.setdefault(action_type, []).append(action_value)
+        self.invalidate_indexes(action_type)
         # Insert input values
         for (i, value) in enumerate(input_values):
             self.input_values[(action_type, i)].append(value)
+            self.input_index.setdefault((action_type, i), {}).setdefault(value, []).append(action_value)
         return action_value
 
-    def insert_end_event(self, action_value: ActionValue, id: str, output_values: list[str], time: datetime) -> bool:
+    def insert_end_event(self, action_value: ActionValue, id: str, output_values: list[int], time: datetime) -> bool:
         # Insert event into trace
         event = EndEvent(action_value.get_action_type(), id, output_values, time)
         end_timepoint = self.insert_event(event)
@@ -200,17 +230,95 @@ class Trace:
         for (i, value) in enumerate(output_values):
             self.output_values[(action_value.get_action_type(), i)].append(value)
         # Update action occurrence
-        return action_value.complete_end(end_timepoint, output_values)
+        self.invalidate_indexes(action_value.get_action_type())
+        if not action_value.complete_end(end_timepoint, output_values):
+            return False
+        for (i, value) in enumerate(output_values):
+            self.output_index.setdefault((action_value.get_action_type(), i), {}).setdefault(value, []).append(action_value)
+        return True
 
-    def get_input_values(self, action_type: ActionType, index: int) -> list[str]:
+    def get_input_values(self, action_type: ActionType, index: int) -> list[int]:
         return self.input_values[(action_type, index)]
 
-    def get_output_values(self, action_type: ActionType, index: int) -> list[str]:
+    def get_output_values(self, action_type: ActionType, index: int) -> list[int]:
         return self.output_values[(action_type, index)]
 
     def find_occurrences(self, action_type: ActionType) -> list[ActionValue]:
         return self.actions[action_type]
 
+    # Returns the occurrences with at least the given number of input and output values,
+    # warning once about the occurrences that have less
+    def find_occurrences_by_arity(self, action_type: ActionType, num_inputs: int, num_outputs: int) -> list[ActionValue]:
+        buckets = self.arity_buckets.setdefault(action_type, {})
+        if (num_inputs, num_outputs) not in buckets:
+            occurrences = self.find_occurrences(action_type)
+            matching = [occurrence for occurrence in occurrences
+                if len(occurrence.input_values) >= num_inputs and len(occurrence.output_values) >= num_outputs]
+            if len(matching) < len(occurrences):
+                print(f"Warning: {len(occurrences) - len(matching)} occurrences of {action_type.name.lower()} have less than {num_inputs} input or {num_outputs} output values", file=sys.stderr)
+            buckets[(num_inputs, num_outputs)] = matching
+        return buckets[(num_inputs, num_outputs)]
+
+    # Returns the occurrences whose input value at the given position is the given value
+    def find_occurrences_by_input(self, action_type: ActionType, index: int, value: int) -> list[ActionValue]:
+        return self.input_index.get((action_type, index), {}).get(value, [])
+
+    # Returns the occurrences whose output value at the given position is the given value
+    def find_occurrences_by_output(self, action_type: ActionType, index: int, value: int) -> list[ActionValue]:
+        return self.output_index.get((action_type, index), {}).get(value, [])
+
+    def get_order_index(self, action_type: ActionType) -> OrderIndex:
+        if action_type not in self.order_indexes:
+            self.order_indexes[action_type] = OrderIndex(self.find_occurrences(action_type))
+        return self.order_indexes[action_type]
+
+    def get_interval_tree(self, action_type: ActionType) -> IntervalTree:
+        if action_type not in self.interval_trees:
+            self.interval_trees[action_type] = IntervalTree(self.find_occurrences(action_type))
+        return self.interval_trees[action_type]
+
+    # Returns the columns of the occurrences returned by find_occurrences_by_arity, which requires NumPy
+    def get_columns(self, action_type: ActionType, num_inputs: int, num_outputs: int) -> ActionColumns:
+        columns = self.columns.setdefault(action_type, {})
+        if (num_inputs, num_outputs) not in columns:
+            occurrences = self.find_occurrences_by_arity(action_type, num_inputs, num_outputs)
+            columns[(num_inputs, num_outputs)] = ActionColumns.build(occurrences, num_inputs, num_outputs)
+        return columns[(num_inputs, num_outputs)]
+
+    # Returns the endpoint tables of the occurrences returned by find_occurrences_by_arity, grouped by their values
+    # at the given positions among their input values followed by their output values
+    def get_endpoint_tables(self, action_type: ActionType, num_inputs: int, num_outputs: int, positions: tuple[int, ...]) -> dict[tuple, EndpointTable]:
+        tables = self.endpoint_tables.setdefault(action_type, {})
+        if (num_inputs, num_outputs, positions) not in tables:
+            groups = defaultdict(list)
+            for occurrence in self.find_occurrences_by_arity(action_type, num_inputs, num_outputs):
+                values = occurrence.input_values[:num_inputs] + occurrence.output_values[:num_outputs]
+                groups[tuple(values[position] for position in positions)].append(occurrence)
+            tables[(num_inputs, num_outputs, positions)] = {key: EndpointTable(occurrences) for (key, occurrences) in groups.items()}
+        return tables[(num_inputs, num_outputs, positions)]
+
+    def invalidate_indexes(self, action_type: ActionType) -> None:
+        self.version += 1
+        self.order_indexes.pop(action_type, None)
+        self.interval_trees.pop(action_type, None)
+        self.arity_buckets.pop(action_type, None)
+        self.columns.pop(action_type, None)
+        self.endpoint_tables.pop(action_type, None)
+
+    # Returns a read-only view of the trace restricted to the time points up to max_timepoint, to the ones whose
+    # events occur within time_range (both ends included), and to the occurrences of the node with the given name, sharing
+    # the events, occurrences and indexes of the trace (see TraceView). The trace must not be extended afterwards.
+    def view(self, max_timepoint: int | None = None, time_range: tuple[datetime, datetime] | None = None,
+        node: str | None = None) -> "TraceView":
+        (first, last) = (0, len(self.events) - 1)
+        if max_timepoint is not None:
+            last = min(last, max_timepoint)
+        if time_range is not None:
+            time_of = lambda timepoint: next(iter(self.events[timepoint])).get_time()
+            first = max(first, bisect_left(range(len(self.events)), time_range[0], key=time_of))
+            last = min(last, bisect_right(range(len(self.events)), time_range[1], key=time_of) - 1)
+        return TraceView(self, first, last, None if node is None else SYMBOLS.intern(node))
+
     def complete_event(self, event: Event, timepoint: int) -> None | Event: 
         assert event.id is None
         if timepoint < 0 or timepoint >= len(self.events):
@@ -234,30 +342,254 @@ class Trace:
             for value in values:
                 actions_str += f"\n{value}"
 
-        inputs_str = "\n".join([f"{action_type.name.lower()} {[i]}: {', '.join(values)}" for (action_type, i), values in self.input_values.items()])
-        outputs_str = "\n".join([f"{action_type.name.lower()} {[i]}: {', '.join(values)}" for (action_type, i), values in self.output_values.items()])
+        inputs_str = "\n".join([f"{action_type.name.lower()} {[i]}: {', '.join(map(SYMBOLS.name, values))}" for (action_type, i), values in self.input_values.items()])
+        outputs_str = "\n".join([f"{action_type.name.lower()} {[i]}: {', '.join(map(SYMBOLS.name, values))}" for (action_type, i), values in self.output_values.items()])
 
         return f"\nTrace(\nEvents:{events_str}\n\nAction Occurrences:{actions_str}\n\nInput Values:\n{inputs_str}\n\nOutput Values:\n{outputs_str})"
 
+# A read-only view of a trace, as returned by Trace.view: the occurrences that begin between the first and last time
+# points and, given a node, the ones whose first input value is that node or that have no input values (the ideal,
+# stable and read-only phases, which concern every node). They are selected on first use of each action type or index
+# entry, from the lists of the trace. An occurrence that ends after the last time point is seen as an ongoing one,
+# as when parsing the log up to that point: it is replaced by a copy with an infinite end and no output values.
+# Time points keep their numbering in the trace, and the events are those of the trace, whatever the node.
+class TraceView(Trace):
+    def __init__(self, trace: Trace, first: int, last: int, node: int | None = None):
+        super().__init__(trace.events)
+        self.trace = trace
+        self.first = first
+        self.last = last
+        self.node = node
+        # The occurrences of the view by action type, filled by find_occurrences
+        self.actions = {}
+        # Copies of the occurrences that end after the last time point, by id of the original
+        self.ongoing: dict[int, ActionValue] = {}
+
+    def __len__(self) -> int:
+        return min(len(self.events), self.last + 1)
+
+    def get_length(self) -> int:
+        return sum(len(self.events[timepoint]) for timepoint in range(self.first, len(self)))
+
+    def insert_event(self, event: Event) -> int:
+        raise TypeError("A trace view is read-only")
+
+    def insert_begin_event(self, action_type: ActionType, id: str, input_values: list[int], time: datetime) -> ActionValue:
+        raise TypeError("A trace view is read-only")
+
+    def insert_end_event(self, action_value: ActionValue, id: str, output_values: list[int], time: datetime) -> bool:
+        raise TypeError("A trace view is read-only")
+
+    def includes(self, occurrence: ActionValue) -> bool:
+        return self.node is None or not occurrence.input_values or occurrence.input_values[0] == self.node
+
+    # Returns the occurrence as seen in the view
+    def clip(self, occurrence: ActionValue) -> ActionValue:
+        if occurrence.interval_value.end <= self.last:
+            return occurrence
+        if id(occurrence) not in self.ongoing:
+            self.ongoing[id(occurrence)] = ActionValue(occurrence.get_action_type(),
+                IntervalValue(occurrence.interval_value.begin), occurrence.input_values, [])
+        return self.ongoing[id(occurrence)]
+
+    # Returns the occurrences of the view among ones of the trace, which are ordered by begin time point
+    def select(self, occurrences: list[ActionValue]) -> list[ActionValue]:
+        begin = lambda occurrence: occurrence.interval_value.begin
+        start = bisect_left(occurrences, self.first, key=begin)
+        stop = bisect_right(occurrences, self.last, lo=start, key=begin)
+        return [self.clip(occurrences[i]) for i in range(start, stop) if self.includes(occurrences[i])]
+
+    def find_occurrences(self, action_type: ActionType) -> list[ActionValue]:
+        if action_type not in self.actions:
+            self.actions[action_type] = self.select(self.trace.find_occurrences(action_type))
+        return self.actions[action_type]
+
+    def find_occurrences_by_input(self, action_type: ActionType, index: int, value: int) -> list[ActionValue]:
+        values = self.input_index.setdefault((action_type, index), {})
+        if value not in values:
+            if self.node is not None and index == 0 and value != self.node:
+                values[value] = []
+            else:
+                values[value] = self.select(self.trace.find_occurrences_by_input(action_type, index, value))
+        return values[value]
+
+    def find_occurrences_by_output(self, action_type: ActionType, index: int, value: int) -> list[ActionValue]:
+        values = self.output_index.setdefault((action_type, index), {})
+        if value not in values:
+            # Ordered by end time point: the ones that end after the last one have no output values in the view
+            values[value] = [occurrence for occurrence in self.trace.find_occurrences_by_output(action_type, index, value)
+                if self.first <= occurrence.interval_value.begin and occurrence.interval_value.end <= self.last and
+                self.includes(occurrence)]
+        return values[value]
+
+    def complete_event(self, event: Event, timepoint: int) -> None | Event:
+        if timepoint < self.first or timepoint > self.last:
+            return None
+        return super().complete_event(event, timepoint)
+
+    def __repr__(self) -> str:
+        for action_type in list(self.trace.actions):
+            self.find_occurrences(action_type)
+        return super().__repr__()
+
+# Fixed slot numbers of the variable and interval labels, shared by every formula so that
+# a subformula resolved on its own agrees with the formula that contains it
+class SlotTable:
+    def __init__(self):
+        self.variables: dict[str, int] = {}
+        self.intervals: dict[str, int] = {}
+
+    def variable_slot(self, label: str) -> int:
+        return self.variables.setdefault(label, len(self.variables))
+
+    def interval_slot(self, label: str) -> int:
+        return self.intervals.setdefault(label, len(self.intervals))
+
+SLOTS = SlotTable()
+
+# Numbers of the values of the logs, which traces store instead of the values themselves so that they are compared and
+# hashed as small integers. A single table is shared by every trace and formula, so that the constants of a formula are
+# numbered when it is parsed and agree with the values of any trace. Values are only named again to be printed.
+class SymbolTable:
+    def __init__(self):
+        self.numbers: dict[str, int] = {}
+        self.names: list[str] = []
+
+    def intern(self, name: str) -> int:
+        number = self.numbers.get(name)
+        if number is None:
+            number = self.numbers[name] = len(self.names)
+            self.names.append(name)
+        return number
+
+    # Returns the name of the value, as is if it is not a number (in a trace built with names)
+    def name(self, value: int | str) -> str:
+        return self.names[value] if isinstance(value, int) else value
+
+SYMBOLS = SymbolTable()
+
+# Values of the variables and intervals bound during evaluation, indexed by slot, where None means unbound.
+# Bindings are recorded on a trail so that a quantifier can undo them back to a mark without copying anything.
+# The values of the given store are names, numbered in the symbol table like the ones of a trace.
+class Environment:
+    def __init__(self, formula: "Formula | None" = None, store: dict[str, str] | None = None,
+                 interval_store: dict[str, "IntervalValue"] | None = None):
+        if formula is not None:
+            resolve_slots(formula)
+        for label in store or {}:
+            SLOTS.variable_slot(label)
+        for label in interval_store or {}:
+            SLOTS.interval_slot(label)
+        self.values: list[int | None] = [None] * len(SLOTS.variables)
+        self.intervals: list[IntervalValue | None] = [None] * len(SLOTS.intervals)
+        # Slots bound so far, intervals stored as their complement, with the value each one had before
+        self.trail: list[int] = []
+        self.previous: list[Any] = []
+        for (label, value) in (store or {}).items():
+            self.bind_value(SLOTS.variables[label], SYMBOLS.intern(value))
+        for (label, value) in (interval_store or {}).items():
+            self.bind_interval(SLOTS.intervals[label], value)
+
+    def bind_value(self, slot: int, value: int) -> None:
+        self.trail.append(slot)
+        self.previous.append(self.values[slot])
+        self.values[slot] = value
+
+    def bind_interval(self, slot: int, interval_value: "IntervalValue") -> None:
+        self.trail.append(~slot)
+        self.previous.append(self.intervals[slot])
+        self.intervals[slot] = interval_value
+
+    def mark(self) -> int:
+        return len(self.trail)
+
+    # Restores the bindings as they were when the mark was taken
+    def undo(self, mark: int) -> None:
+        trail = self.trail
+        previous = self.previous
+        while len(trail) > mark:
+            slot = trail.pop()
+            if slot >= 0:
+                self.values[slot] = previous.pop()
+            else:
+                self.intervals[~slot] = previous.pop()
+
+    def get_store(self) -> dict[str, int]:
+        return {label: self.values[slot] for (label, slot) in SLOTS.variables.items()
+            if slot < len(self.values) and self.values[slot] is not None}
+
+    def get_interval_store(self) -> dict[str, "IntervalValue"]:
+        return {label: self.intervals[slot] for (label, slot) in SLOTS.intervals.items()
+            if slot < len(self.intervals) and self.intervals[slot] is not None}
+
+    def __repr__(self) -> str:
+        store = {label: SYMBOLS.name(value) for (label, value) in self.get_store().items()}
+        return f"Environment({store}, {self.get_interval_store()})"
+
 class Formula(ABC):
     @abstractmethod
-    def evaluate(self, trace: Trace, store: dict[str, str], interval_store: "dict[str, IntervalValue]") -> Any:
+    def evaluate(self, trace: Trace, env: "Environment") -> Any:
         pass
 
-    def get_possible_values(self, trace: Trace, store: dict[str, str], interval_store: dict[str, "IntervalValue"], var: "Variable") -> list[str]:
+    def get_possible_values(self, trace: Trace, env: "Environment", var: "Variable") -> list[str]:
+        return []
+
+    # Returns the direct subformulas of the formula
+    def get_children(self) -> list["Formula"]:
         return []
 
-    def get_possible_actions(self, trace: Trace, store: dict[str, str], interval_store: dict[str, "IntervalValue"], interval: "Interval") -> list["Action"]:
+    # Replaces the direct subformulas of the formula, given in the same order as get_children
+    def set_children(self, children: list["Formula"]) -> None:
+        assert not children, f"{type(self).__name__} has no subformulas"
+
+    # Returns the labels of the domain variables and of the intervals that occur free in the formula,
+    # that is whose values must be given by the environment to evaluate it
+    def get_free_variables(self) -> tuple[set[str], set[str]]:
+        variables: set[str] = set()
+        intervals: set[str] = set()
+        for expression in self.get_children():
+            (expression_variables, expression_intervals) = expression.get_free_variables()
+            variables |= expression_variables
+            intervals |= expression_intervals
+        return variables, intervals
+
+    def get_possible_actions(self, trace: Trace, env: "Environment", interval: "Interval") -> list["Action"]:
         return []
 
+    # Returns the occurrences of the action type that may satisfy the formula when the given interval is bound to them,
+    # or None if the formula cannot restrict them
+    def select_occurrences(self, trace: Trace, action_type: ActionType, label: str, env: "Environment") -> list[ActionValue] | None:
+        return None
+
+    # Same as select_occurrences, but for the negation of the formula
+    def select_occurrences_negated(self, trace: Trace, action_type: ActionType, label: str, env: "Environment") -> list[ActionValue] | None:
+        return None
+
+    # Returns the interval that the given interval must overlap to satisfy the formula, together with the kinds
+    # of overlap ("overlapping", "within", "containing") that the formula implies, or None if there is no such interval
+    def get_overlap(self, label: str) -> tuple[str, set[str]] | None:
+        return None
+
 class Variable(Formula):
     def __init__(self, label: str):
         self.label = label
+        # Set by resolve_slots
+        self.slot: int | None = None
 
-    def evaluate(self, _trace, store, _interval_store) -> str:
-        if self.label not in store:
+    def evaluate(self, _trace, env) -> int:
+        value = env.values[self.slot]
+        if value is None:
             raise ValueError(f"Variable {self.label} not found in store")
-        return store[self.label]
+        return value
+
+    def evaluate_columns(self, columns, env, action) -> Any:
+        value = env.values[self.slot]
+        if value is not None:
+            return value
+        return action.get_column(columns, self.slot)
+
+    def get_free_variables(self) -> tuple[set[str], set[str]]:
+        return {self.label}, set()
 
     def __eq__(self, other: object) -> bool:
         return (isinstance(other, Variable) and
@@ -282,7 +614,7 @@ class IntervalValue(Formula):
             self.end = end
             return True
 
-    def evaluate(self, _trace, _store, _interval_store) -> "IntervalValue":
+    def evaluate(self, _trace, _env) -> "IntervalValue":
         return self
 
     def __eq__(self, other: object) -> bool:
@@ -296,11 +628,24 @@ class IntervalValue(Formula):
 class Interval(Formula):
     def __init__(self, label: str):
         self.label = label
+        # Set by resolve_slots
+        self.slot: int | None = None
 
-    def evaluate(self, _trace, _store, interval_store) -> IntervalValue:
-        if self.label not in interval_store:
+    def evaluate(self, _trace, env) -> IntervalValue:
+        interval_value = env.intervals[self.slot]
+        if interval_value is None:
             raise ValueError(f"Interval {self.label} not found in interval store")
-        return interval_store[self.label]
+        return interval_value
+
+    def get_free_variables(self) -> tuple[set[str], set[str]]:
+        return set(), {self.label}
+
+    # Returns the begin and end time points of the interval, as columns if it is the interval of the action
+    def evaluate_columns(self, columns, env, action) -> tuple[Any, Any]:
+        if self.slot == action.interval.slot:
+            return columns.begins, columns.ends
+        interval_value = env.intervals[self.slot]
+        return interval_value.begin, INF_END if interval_value.end == float("inf") else interval_value.end
 
     def __eq__(self, other: object) -> bool:
         return (isinstance(other, Interval) and
@@ -315,11 +660,17 @@ class UnaryExpr(Formula, ABC):
     def __init__(self, expression: Formula):
         self.expression = expression
 
-    def get_possible_values(self, trace, store, interval_store, variable) -> list[str]:
-        return self.expression.get_possible_values(trace, store, interval_store, variable)
+    def get_possible_values(self, trace, env, variable) -> list[str]:
+        return self.expression.get_possible_values(trace, env, variable)
+
+    def get_children(self) -> list[Formula]:
+        return [self.expression]
+
+    def set_children(self, children) -> None:
+        (self.expression,) = children
 
-    def get_possible_actions(self, trace, store, interval_store, interval) -> list["Action"]:
-        return self.expression.get_possible_actions(trace, store, interval_store, interval)
+    def get_possible_actions(self, trace, env, interval) -> list["Action"]:
+        return self.expression.get_possible_actions(trace, env, interval)
 
     def __eq__(self, other: object) -> bool:
         return (isinstance(other, type(self)) and
@@ -329,28 +680,92 @@ class Not(UnaryExpr):
     def __init__(self, expression):
         super().__init__(expression)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        result = self.expression.evaluate(trace, store, interval_store)
+    def evaluate(self, trace, env) -> bool:
+        result = self.expression.evaluate(trace, env)
         assert isinstance(result, bool), f"\"Not\" operator expected boolean result from {self.expression}, but got {result} of type {type(result)}"
         return not result
 
+    def select_occurrences(self, trace, action_type, label, env) -> list[ActionValue] | None:
+        return self.expression.select_occurrences_negated(trace, action_type, label, env)
+
+    def evaluate_columns(self, columns, env, action) -> Any:
+        return np.logical_not(self.expression.evaluate_columns(columns, env, action))
+
     def __repr__(self) -> str:
         return f"¬{self.expression}"
 
+# Results of a subformula cached by the values of its free variables and intervals, evicting the least recently used ones
+# beyond max_size. The cache is cleared when evaluating on another trace or a trace that changed.
+class MemoTable:
+    def __init__(self, max_size: int = MEMO_SIZE):
+        self.max_size = max_size
+        self.cache: OrderedDict[tuple, Any] = OrderedDict()
+        self.trace: Trace | None = None
+        self.version = -1
+
+# Caches the results of a subformula in a table. The table may be shared by the Memo nodes of equivalent subformulas
+# that only differ in the labels of their free variables and intervals, given in corresponding order:
+# by default they are the free labels of the subformula in alphabetical order.
+class Memo(UnaryExpr):
+    def __init__(self, expression, max_size: int = MEMO_SIZE, table: MemoTable | None = None,
+                 labels: tuple[list[str], list[str]] | None = None):
+        super().__init__(expression)
+        self.table = MemoTable(max_size) if table is None else table
+        if labels is None:
+            (variables, intervals) = expression.get_free_variables()
+            labels = (sorted(variables), sorted(intervals))
+        self.variable_slots = [SLOTS.variable_slot(label) for label in labels[0]]
+        self.interval_slots = [SLOTS.interval_slot(label) for label in labels[1]]
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self) -> OrderedDict[tuple, Any]:
+        return self.table.cache
+
+    def evaluate(self, trace, env) -> Any:
+        table = self.table
+        if trace is not table.trace or trace.version != table.version:
+            table.cache.clear()
+            (table.trace, table.version) = (trace, trace.version)
+        key = (tuple(env.values[slot] for slot in self.variable_slots),
+            tuple(None if interval_value is None else (interval_value.begin, interval_value.end)
+                for interval_value in (env.intervals[slot] for slot in self.interval_slots)))
+        cache = table.cache
+        if key in cache:
+            self.hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+        self.misses += 1
+        result = self.expression.evaluate(trace, env)
+        cache[key] = result
+        if len(cache) > table.max_size:
+            cache.popitem(last=False)
+        return result
+
+    def __repr__(self) -> str:
+        return f"{self.expression}"
+
 class BinaryExpr(Formula, ABC):
     @abstractmethod
     def __init__(self, left: Formula, right: Formula):
         self.left = left
         self.right = right
 
-    def get_possible_values(self, trace, store, interval_store, target_var: Variable) -> list[str]:
-        possible_values = self.left.get_possible_values(trace, store, interval_store, target_var)
-        possible_values.extend(self.right.get_possible_values(trace, store, interval_store, target_var))
+    def get_possible_values(self, trace, env, target_var: Variable) -> list[str]:
+        possible_values = self.left.get_possible_values(trace, env, target_var)
+        possible_values.extend(self.right.get_possible_values(trace, env, target_var))
         return possible_values
 
-    def get_possible_actions(self, trace, store, interval_store, interval) -> list["Action"]:
-        possible_actions = self.left.get_possible_actions(trace, store, interval_store, interval)
-        possible_actions.extend(self.right.get_possible_actions(trace, store, interval_store, interval))
+    def get_children(self) -> list[Formula]:
+        return [self.left, self.right]
+
+    def set_children(self, children) -> None:
+        (self.left, self.right) = children
+
+    def get_possible_actions(self, trace, env, interval) -> list["Action"]:
+        possible_actions = self.left.get_possible_actions(trace, env, interval)
+        possible_actions.extend(self.right.get_possible_actions(trace, env, interval))
         return possible_actions
 
     def __eq__(self, other: object) -> bool:
@@ -362,11 +777,14 @@ class Equal(BinaryExpr):
     def __init__(self, left, right):
         super().__init__(left, right)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        left =  self.left.evaluate(trace, store, interval_store) 
-        right = self.right.evaluate(trace, store, interval_store)
+    def evaluate(self, trace, env) -> bool:
+        left =  self.left.evaluate(trace, env) 
+        right = self.right.evaluate(trace, env)
         return left == right
 
+    def evaluate_columns(self, columns, env, action) -> Any:
+        return self.left.evaluate_columns(columns, env, action) == self.right.evaluate_columns(columns, env, action)
+
     def __repr__(self) -> str:
         return f"({self.left} = {self.right})"
 
@@ -374,11 +792,14 @@ class Implies(BinaryExpr):
     def __init__(self, left, right):
         super().__init__(left, right)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        left = self.left.evaluate(trace, store, interval_store)
-        right = self.right.evaluate(trace, store, interval_store)
+    def evaluate(self, trace, env) -> bool:
+        left = self.left.evaluate(trace, env)
+        right = self.right.evaluate(trace, env)
         return (not left) or right
 
+    def evaluate_columns(self, columns, env, action) -> Any:
+        return np.logical_or(np.logical_not(self.left.evaluate_columns(columns, env, action)), self.right.evaluate_columns(columns, env, action))
+
     def __repr__(self) -> str:
         return f"({self.left} => {self.right})"
 
@@ -388,16 +809,22 @@ class NAryExpr(Formula, ABC):
         self.expressions = expressions
         assert len(expressions) > 1, f"\"{self.__class__.__name__}\" requires at least two expressions, but got {len(expressions)}"
 
-    def get_possible_values(self, trace, store, interval_store, target_var) -> list[str]:
+    def get_possible_values(self, trace, env, target_var) -> list[str]:
         possible_values = []
         for expression in self.expressions:
-            possible_values.extend(expression.get_possible_values(trace, store, interval_store, target_var))
+            possible_values.extend(expression.get_possible_values(trace, env, target_var))
         return possible_values
 
-    def get_possible_actions(self, trace, store, interval_store, interval) -> list["Action"]:
+    def get_children(self) -> list[Formula]:
+        return list(self.expressions)
+
+    def set_children(self, children) -> None:
+        self.expressions = tuple(children)
+
+    def get_possible_actions(self, trace, env, interval) -> list["Action"]:
         possible_actions = []
         for expression in self.expressions:
-            possible_actions.extend(expression.get_possible_actions(trace, store, interval_store, interval))
+            possible_actions.extend(expression.get_possible_actions(trace, env, interval))
         return possible_actions
 
     def __eq__(self, other: object) -> bool:
@@ -408,14 +835,20 @@ class And(NAryExpr):
     def __init__(self, *expressions):
         super().__init__(*expressions)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
+    def evaluate(self, trace, env) -> bool:
         for expression in self.expressions:
-            result = expression.evaluate(trace, store, interval_store)
+            result = expression.evaluate(trace, env)
             assert isinstance(result, bool), f"\"And\" operator expected boolean result from {expression}, but got {result} of type {type(result)}"
             if not result:
                 return False
         return True
 
+    def evaluate_columns(self, columns, env, action) -> Any:
+        result = self.expressions[0].evaluate_columns(columns, env, action)
+        for expression in self.expressions[1:]:
+            result = np.logical_and(result, expression.evaluate_columns(columns, env, action))
+        return result
+
     def __repr__(self) -> str:
         return " ∧ ".join(map(str, self.expressions))
 
@@ -423,14 +856,30 @@ class Or(NAryExpr):
     def __init__(self, *expressions):
         super().__init__(*expressions)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
+    def evaluate(self, trace, env) -> bool:
         for expression in self.expressions:
-            result = expression.evaluate(trace, store, interval_store)
+            result = expression.evaluate(trace, env)
             assert isinstance(result, bool), f"\"Or\" operator expected boolean result from {expression}, but got {result} of type {type(result)}"
             if result:
                 return True
         return False
 
+    def evaluate_columns(self, columns, env, action) -> Any:
+        result = self.expressions[0].evaluate_columns(columns, env, action)
+        for expression in self.expressions[1:]:
+            result = np.logical_or(result, expression.evaluate_columns(columns, env, action))
+        return result
+
+    # A disjunction of relations with the same interval implies the kinds of overlap common to all of them
+    def get_overlap(self, label) -> tuple[str, set[str]] | None:
+        overlaps = [expression.get_overlap(label) for expression in self.expressions]
+        if any(overlap is None for overlap in overlaps) or len({other_label for (other_label, _) in overlaps}) != 1:
+            return None
+        return overlaps[0][0], set.intersection(*(kinds for (_, kinds) in overlaps))
+
+    def select_occurrences(self, trace, action_type, label, env) -> list[ActionValue] | None:
+        return select_overlapping(self, trace, action_type, label, env)
+
     def __repr__(self) -> str:
         return " v ".join(map(str, self.expressions))
 
@@ -440,23 +889,34 @@ class Quantifier(Formula, ABC):
         self.variables = variables if isinstance(variables, list) else [variables]
         self.expression = expression
 
-    def get_possible_values(self, trace, store, interval_store, var) -> list[str]:
+    def get_possible_values(self, trace, env, var) -> list[str]:
         if var in self.variables:
             return []
         else:
-            return self.expression.get_possible_values(trace, store, interval_store, var)
+            return self.expression.get_possible_values(trace, env, var)
+
+    def get_possible_actions(self, trace, env, interval) -> list["Action"]:
+        return self.expression.get_possible_actions(trace, env, interval)
 
-    def get_possible_actions(self, trace, store, interval_store, interval) -> list["Action"]:
-        return self.expression.get_possible_actions(trace, store, interval_store, interval)
+    def get_children(self) -> list[Formula]:
+        return self.variables + [self.expression]
 
-    def evaluate_naively(self, trace: Trace, store: dict[str, str], interval_store: dict[str, IntervalValue], short_circuit_on: bool) -> bool:
-        return self.evaluate_naively_recursive(trace, store, interval_store, short_circuit_on, 0)
+    def set_children(self, children) -> None:
+        self.variables = children[:-1]
+        self.expression = children[-1]
 
-    def evaluate_naively_recursive(self, trace: Trace, store: dict[str, str], interval_store: dict[str, IntervalValue], short_circuit_on: bool, var_idx: int) -> bool:
+    def get_free_variables(self) -> tuple[set[str], set[str]]:
+        (variables, intervals) = self.expression.get_free_variables()
+        return variables - {variable.label for variable in self.variables}, intervals
+
+    def evaluate_naively(self, trace: Trace, env: Environment, short_circuit_on: bool) -> bool:
+        return self.evaluate_naively_recursive(trace, env, short_circuit_on, 0)
+
+    def evaluate_naively_recursive(self, trace: Trace, env: Environment, short_circuit_on: bool, var_idx: int) -> bool:
 
         if var_idx >= len(self.variables):
-            result =  self.expression.evaluate(trace, var_store, interval_store)
-            # print(f"Base case Evaluating: {self.expr} with {var_store} -> {result}")
+            result =  self.expression.evaluate(trace, env)
+            # print(f"Base case Evaluating: {self.expr} with {env} -> {result}")
             return result
 
         else:
@@ -464,7 +924,7 @@ class Quantifier(Formula, ABC):
             #TODO: check if var is not bound in current store?
             var = self.variables[var_idx]
 
-            possible_values = self.expression.get_possible_values(trace, var_store, interval_store, var)
+            possible_values = self.expression.get_possible_values(trace, env, var)
     
             # print(f"{var = } {possible_values = }")
 
@@ -478,21 +938,22 @@ class Quantifier(Formula, ABC):
                 if short_circuit_on: # == True
                     return False
 
-                result = self.evaluate_naively_recursive(trace, var_store, interval_store, short_circuit_on, var_idx + 1)
+                result = self.evaluate_naively_recursive(trace, env, short_circuit_on, var_idx + 1)
 
                 return result
 
+            mark = env.mark()
             for value in possible_values:                    
-                new_store = var_store.copy()
-                new_store[var.label] = value
+                env.bind_value(var.slot, value)
 
-                result = self.evaluate_naively_recursive(trace, new_store, interval_store, short_circuit_on, var_idx + 1)
-                # print(f"Recursive case Evaluating {var_idx = }, {var = }, { value = }: {self.expr} with {var_store} -> {result}")
+                result = self.evaluate_naively_recursive(trace, env, short_circuit_on, var_idx + 1)
+                env.undo(mark)
+                # print(f"Recursive case Evaluating {var_idx = }, {var = }, { value = }: {self.expr} with {env} -> {result}")
                 if result == short_circuit_on:
                     return short_circuit_on
             else:
 
-                # print(f"Recursive case COMPLETED Evaluating {var_idx = }, {var = }: {self.expr} with {var_store}")
+                # print(f"Recursive case COMPLETED Evaluating {var_idx = }, {var = }: {self.expr} with {env}")
                 return not short_circuit_on
 
     def __eq__(self, other: object) -> bool:
@@ -504,8 +965,8 @@ class Exists(Quantifier):
     def __init__(self, variables, expression):
         super().__init__(variables, expression)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        return self.evaluate_naively(trace, store, interval_store, True)
+    def evaluate(self, trace, env) -> bool:
+        return self.evaluate_naively(trace, env, True)
 
     def __repr__(self) -> str:
         variables_str = ", ".join(map(str, self.variables))
@@ -515,8 +976,8 @@ class ForAll(Quantifier):
     def __init__(self, variables, expression):
         super().__init__(variables, expression)
 
-    def evaluate(self, trace, store, interval_store) -> bool: 
-        return self.evaluate_naively(trace, store, interval_store, False)
+    def evaluate(self, trace, env) -> bool: 
+        return self.evaluate_naively(trace, env, False)
 
     def __repr__(self) -> str:
         variables_str = ", ".join(map(str, self.variables))
@@ -529,62 +990,153 @@ class ActionQuantifier(Formula, ABC):
         assert isinstance(action, Action), f"Expected Action, but got '{action}' of {type(action)}"
         self.action = action
         self.expression = expression
+        self.plan()
 
-    #def get_possible_values(self, trace, store, interval_store, var) -> list[str]:
+    # Derives from the body how the quantifier is evaluated, again whenever the body is replaced
+    def plan(self) -> None:
+        self.guards = self.get_guards()
+        # Variables and intervals of a body that can be evaluated on columns, which must be bound to do so
+        self.column_leaves = leaves(self.expression) if is_vectorizable(self.expression) else None
+        self.aggregate_lookup = AggregateLookup.plan(self)
+
+    # Returns the subformulas that every relevant occurrence must satisfy:
+    # an occurrence that does not satisfy one of them cannot change the result of the quantifier
+    @abstractmethod
+    def get_guards(self) -> list[Formula]:
+        pass
+
+    # Returns the body below the quantifiers of the same kind directly in it, with the labels of the variables and
+    # intervals of their actions: the conjuncts of that body that depend on none of them constrain the occurrences of
+    # this quantifier as well
+    def get_inner_body(self) -> tuple[Formula, set[str]]:
+        (body, labels) = (self.expression, set())
+        while type(body) is type(self):
+            action = body.action
+            labels |= {variable.label for variable in action.inputs + action.outputs if not isinstance(variable, Wildcard)}
+            labels.add(action.interval.label)
+            body = body.expression
+        return body, labels
+
+    # Returns the occurrences of the action that may change the result of the quantifier,
+    # looking up the values of variables already bound in the trace's value index, and
+    # using the trace's order index when a guard relates the quantified interval to an already bound one
+    def find_candidates(self, trace: Trace, env: Environment) -> list[ActionValue]:
+        action = self.action
+        action_type = action.get_action_type()
+        occurrences = trace.find_occurrences_by_arity(action_type, len(action.inputs), len(action.outputs))
+        if len(occurrences) < INDEX_THRESHOLD:
+            return occurrences
+        for (i, variable) in enumerate(action.inputs):
+            if not isinstance(variable, Wildcard) and env.values[variable.slot] is not None:
+                candidates = trace.find_occurrences_by_input(action_type, i, env.values[variable.slot])
+                if len(candidates) < len(occurrences):
+                    occurrences = candidates
+        for (i, variable) in enumerate(action.outputs):
+            if not isinstance(variable, Wildcard) and env.values[variable.slot] is not None:
+                candidates = trace.find_occurrences_by_output(action_type, i, env.values[variable.slot])
+                if len(candidates) < len(occurrences):
+                    occurrences = candidates
+        label = action.interval.label
+        for guard in self.guards:
+            if not occurrences:
+                break
+            candidates = guard.select_occurrences(trace, action_type, label, env)
+            if candidates is not None and len(candidates) < len(occurrences):
+                occurrences = candidates
+        return occurrences
+
+    #def get_possible_values(self, trace, env, var) -> list[str]:
     #    if var in self.vars:
     #        return []
     #    else:
-    #        return self.expr.get_possible_values(trace, store, interval_store, var)
+    #        return self.expr.get_possible_values(trace, env, var)
 
-    def get_possible_actions(self, trace, store, interval_store, interval) -> list["Action"]:
-        return self.expression.get_possible_actions(trace, store, interval_store, interval)
+    def get_possible_actions(self, trace, env, interval) -> list["Action"]:
+        return self.expression.get_possible_actions(trace, env, interval)
 
-    def evaluate_naively(self, trace: Trace, store: dict[str, str], interval_store: dict[str, IntervalValue], short_circuit_on: bool) -> bool:
+    def get_children(self) -> list[Formula]:
+        return [self.action, self.expression]
+
+    def set_children(self, children) -> None:
+        (self.action, self.expression) = children
+        self.plan()
+
+    # The variables of the action are free: the ones already bound restrict the occurrences of the action
+    def get_free_variables(self) -> tuple[set[str], set[str]]:
+        (variables, intervals) = self.expression.get_free_variables()
+        variables |= {variable.label for variable in self.action.inputs + self.action.outputs if not isinstance(variable, Wildcard)}
+        return variables, intervals - {self.action.interval.label}
+
+    # Binds the domain variables of the action to the values of the occurrence and returns True,
+    # or leaves the environment unchanged and returns False if the occurrence does not match the action in the formula
+    def bind_occurrence(self, occurrence: ActionValue, env: Environment) -> bool:
         action = self.action
-        occurrences = trace.find_occurrences(action.get_action_type())
-        # For each occurrence of the action in the trace
-        for occurrence in occurrences:
-            interval_value = occurrence.interval_value
-            input_values = occurrence.input_values
-            output_values = occurrence.output_values
+        input_values = occurrence.input_values
+        output_values = occurrence.output_values
 
-            # TODO: Mismatched number of inputs and outputs between formula and trace action
-            if len(input_values) < len(action.inputs) or len(output_values) < len(action.outputs):
-                print(f"Warning: Occurrence {occurrence} has less input or output values than action in formula: {action}", file=sys.stderr)
-                continue
+        # TODO: Mismatched number of inputs and outputs between formula and trace action
+        # NOTE: The trace warns about these occurrences once, when bucketing them by arity
+        if len(input_values) < len(action.inputs) or len(output_values) < len(action.outputs):
+            return False
 
-            # New domain variable environment
-            skip_occurrence = False
-            new_store = store.copy()
-            for (variable, value) in zip(action.inputs, input_values):
-                if isinstance(variable, Wildcard):
-                    continue
-                if variable.label in new_store:
-                    if new_store[variable.label] != value:
-                        skip_occurrence = True
-                        break
-                else:
-                    new_store[variable.label] = value
-            if skip_occurrence:
-                continue
-            for (variable, value) in zip(action.outputs, output_values):
-                if isinstance(variable, Wildcard):
+        values = env.values
+        mark = env.mark()
+        for (variables, occurrence_values) in ((action.inputs, input_values), (action.outputs, output_values)):
+            for (variable, value) in zip(variables, occurrence_values):
+                slot = variable.slot
+                if slot is None:
                     continue
-                if variable.label in new_store:
-                    if new_store[variable.label] != value:
-                        skip_occurrence = True
-                        break
-                else:
-                    new_store[variable.label] = value
-            if skip_occurrence:
-                continue
+                bound = values[slot]
+                if bound is None:
+                    env.bind_value(slot, value)
+                elif bound != value:
+                    env.undo(mark)
+                    return False
+        return True
+
+    # Returns whether the body can be evaluated on the columns of the action in the current environment
+    def can_evaluate_columns(self, env: Environment) -> bool:
+        if self.column_leaves is None or np is None:
+            return False
+        action = self.action
+        for leaf in self.column_leaves:
+            if isinstance(leaf, Interval):
+                if leaf.slot != action.interval.slot and env.intervals[leaf.slot] is None:
+                    return False
+            elif env.values[leaf.slot] is None and all(variable.slot != leaf.slot for variable in action.inputs + action.outputs):
+                return False
+        return True
 
-            # New interval variable environment
-            new_interval_store = interval_store.copy()
-            new_interval_store[action.interval.label] = interval_value
+    # Vectorized counterpart of evaluate_naively: the body becomes a boolean array over the occurrences
+    def evaluate_columns_naively(self, trace: Trace, env: Environment, occurrences: list[ActionValue], short_circuit_on: bool) -> bool:
+        action = self.action
+        columns = trace.get_columns(action.get_action_type(), len(action.inputs), len(action.outputs))
+        if occurrences is not columns.occurrences:
+            columns = columns.select(occurrences)
+        matches = action.match_columns(columns, env)
+        results = self.expression.evaluate_columns(columns, env, action)
+        if short_circuit_on:
+            return bool(np.any(np.logical_and(matches, results)))
+        return not np.any(np.logical_and(matches, np.logical_not(results)))
+
+    def evaluate_naively(self, trace: Trace, env: Environment, short_circuit_on: bool) -> bool:
+        return self.evaluate_occurrences(trace, env, self.find_candidates(trace, env), short_circuit_on)
+
+    # Evaluates the quantifier over the given occurrences only, a subset of its candidates
+    def evaluate_occurrences(self, trace: Trace, env: Environment, occurrences: list[ActionValue], short_circuit_on: bool) -> bool:
+        if len(occurrences) >= VECTORIZE_THRESHOLD and self.can_evaluate_columns(env):
+            return self.evaluate_columns_naively(trace, env, occurrences, short_circuit_on)
+        interval_slot = self.action.interval.slot
+        mark = env.mark()
+        # For each occurrence of the action in the trace
+        for occurrence in occurrences:
+            if not self.bind_occurrence(occurrence, env):
+                continue
+            env.bind_interval(interval_slot, occurrence.interval_value)
             # Evaluate the inner expression
-            DEBUG and print(f"{new_store = }, {new_interval_store = }")
-            result = self.expression.evaluate(trace, new_store, new_interval_store)
+            DEBUG and print(f"{env = }")
+            result = self.expression.evaluate(trace, env)
+            env.undo(mark)
             if result == short_circuit_on:
                 return short_circuit_on
         return not short_circuit_on
@@ -598,8 +1150,22 @@ class ExistsAction(ActionQuantifier):
     def __init__(self, action, expression):
         super().__init__(action, expression)
     
-    def evaluate(self, trace, store, interval_store) -> bool: 
-        return self.evaluate_naively(trace, store, interval_store, True)
+    def plan(self) -> None:
+        super().plan()
+        self.symmetric_join = SymmetricJoin.plan(self)
+
+    def evaluate(self, trace, env) -> bool: 
+        if self.symmetric_join is not None:
+            return self.symmetric_join.evaluate(trace, env)
+        if self.aggregate_lookup is not None:
+            return self.aggregate_lookup.evaluate(trace, env)
+        return self.evaluate_naively(trace, env, True)
+
+    # A witness must satisfy every conjunct of the body, and the ones below the existentials directly in it
+    # that do not depend on them
+    def get_guards(self) -> list[Formula]:
+        (body, labels) = self.get_inner_body()
+        return [conjunct for conjunct in conjuncts(body) if not depends_on(conjunct, labels)]
 
     def __repr__(self) -> str:
         return f"∃ {self.action} . {self.expression}"
@@ -608,12 +1174,454 @@ class ForAllAction(ActionQuantifier):
     def __init__(self, action, expression):
         super().__init__(action, expression)
 
-    def evaluate(self, trace, store, interval_store) -> bool: 
-        return self.evaluate_naively(trace, store, interval_store, False)
+    def plan(self) -> None:
+        super().plan()
+        self.sweep_join = SweepJoin.plan(self)
+        self.symmetric_join = SymmetricJoin.plan(self)
+
+    def evaluate(self, trace, env) -> bool: 
+        if self.sweep_join is not None:
+            return self.sweep_join.evaluate(trace, env)
+        if self.symmetric_join is not None:
+            return self.symmetric_join.evaluate(trace, env)
+        if self.aggregate_lookup is not None:
+            return self.aggregate_lookup.evaluate(trace, env)
+        return self.evaluate_naively(trace, env, False)
+
+    # A counterexample must satisfy every conjunct of the premise of an implication body, and the ones below the
+    # universals directly in it that do not depend on them
+    def get_guards(self) -> list[Formula]:
+        (body, labels) = self.get_inner_body()
+        if isinstance(body, Implies):
+            return [conjunct for conjunct in conjuncts(body.left) if not depends_on(conjunct, labels)]
+        return []
 
     def __repr__(self) -> str:
         return f"∀ {self.action} . {self.expression}"
 
+# Physical operator for "∀ A . ∃ B . (relation A B)", where the relation implies that A and B overlap.
+# Instead of a nested loop, the existential is decided for every occurrence of A in a single pass:
+# occurrences of both actions are grouped by the values they must share and sorted by begin time point,
+# and each occurrence of A is only checked against the occurrences of B that are active at its begin
+# or begin during it. The body of A may also be a conjunction or disjunction of such existentials.
+class SweepJoin:
+    def __init__(self, quantifier: ForAllAction, joins: list[ExistsAction], combinator: type[NAryExpr] | None):
+        self.quantifier = quantifier
+        self.joins = joins
+        self.combinator = combinator
+
+    # Returns the operator for the quantifier, or None if its body does not have the expected shape
+    @staticmethod
+    def plan(quantifier: ForAllAction) -> "SweepJoin | None":
+        body = quantifier.expression
+        if isinstance(body, ExistsAction):
+            (joins, combinator) = ([body], None)
+        elif isinstance(body, (And, Or)) and all(isinstance(expression, ExistsAction) for expression in body.expressions):
+            (joins, combinator) = (list(body.expressions), type(body))
+        else:
+            return None
+        label = quantifier.action.interval.label
+        for join in joins:
+            inner_label = join.action.interval.label
+            if inner_label == label:
+                return None
+            # Only relations between both intervals have an overlap
+            overlap = join.expression.get_overlap(inner_label)
+            if overlap is None or overlap[0] != label:
+                return None
+        return SweepJoin(quantifier, joins, combinator)
+
+    def evaluate(self, trace: Trace, env: Environment) -> bool:
+        quantifier = self.quantifier
+        bindings = []
+        mark = env.mark()
+        for occurrence in quantifier.find_candidates(trace, env):
+            if quantifier.bind_occurrence(occurrence, env):
+                bindings.append(occurrence)
+                env.undo(mark)
+        if not bindings:
+            return True
+
+        witnesses = [self.find_witnesses(join, trace, env, bindings) for join in self.joins]
+        for i in range(len(bindings)):
+            results = [join_witnesses[i] for join_witnesses in witnesses]
+            if not (all(results) if self.combinator is And else any(results)):
+                return False
+        return True
+
+    # Returns, for each binding of A, whether the existential over B has a witness
+    def find_witnesses(self, join: ExistsAction, trace: Trace, env: Environment, bindings: list[ActionValue]) -> list[bool]:
+        # Variables of B bound by A, but not by the enclosing environment, must be equal in both occurrences
+        outer_slots = {variable.slot for variable in self.quantifier.action.inputs + self.quantifier.action.outputs}
+        key_slots = []
+        for variable in join.action.inputs + join.action.outputs:
+            slot = variable.slot
+            if (slot is not None and env.values[slot] is None and
+                    slot in outer_slots and slot not in key_slots):
+                key_slots.append(slot)
+
+        mark = env.mark()
+        inner_groups = defaultdict(list)
+        action = join.action
+        for occurrence in trace.find_occurrences_by_arity(action.get_action_type(), len(action.inputs), len(action.outputs)):
+            if join.bind_occurrence(occurrence, env):
+                inner_groups[tuple(env.values[slot] for slot in key_slots)].append(occurrence)
+                env.undo(mark)
+
+        outer_groups = defaultdict(list)
+        for (i, occurrence) in enumerate(bindings):
+            self.quantifier.bind_occurrence(occurrence, env)
+            outer_groups[tuple(env.values[slot] for slot in key_slots)].append((i, occurrence))
+            env.undo(mark)
+
+        witnesses = [False] * len(bindings)
+        for (key, outer_occurrences) in outer_groups.items():
+            inner_occurrences = inner_groups.get(key)
+            if inner_occurrences:
+                self.sweep(join, trace, env, outer_occurrences, inner_occurrences, witnesses)
+        return witnesses
+
+    def sweep(self, join: ExistsAction, trace: Trace, env: Environment,
+              outer_occurrences: list[tuple[int, ActionValue]], inner_occurrences: list[ActionValue], witnesses: list[bool]) -> None:
+        outer_slot = self.quantifier.action.interval.slot
+        inner_slot = join.action.interval.slot
+        relation = join.expression
+        mark = env.mark()
+
+        inner_occurrences = sorted(inner_occurrences, key=lambda occurrence: occurrence.interval_value.begin)
+        begins = [occurrence.interval_value.begin for occurrence in inner_occurrences]
+        # Occurrences of B that contain the begin time point of the current occurrence of A, ordered by end time point
+        active: list[tuple[int | float, int]] = []
+        position = 0
+        for (i, occurrence) in sorted(outer_occurrences, key=lambda item: item[1].interval_value.begin):
+            interval_value = occurrence.interval_value
+            while position < len(inner_occurrences) and begins[position] <= interval_value.begin:
+                heappush(active, (inner_occurrences[position].interval_value.end, position))
+                position += 1
+            while active and active[0][0] < interval_value.begin:
+                heappop(active)
+
+            env.bind_interval(outer_slot, interval_value)
+            inner_mark = env.mark()
+            candidates = [inner_position for (_, inner_position) in active]
+            candidates.extend(range(position, bisect_right(begins, interval_value.end, lo=position)))
+            for inner_position in candidates:
+                env.bind_interval(inner_slot, inner_occurrences[inner_position].interval_value)
+                result = relation.evaluate(trace, env)
+                env.undo(inner_mark)
+                if result:
+                    witnesses[i] = True
+                    break
+            env.undo(mark)
+
+# Physical operator for a self-join "∀ A1 . ∀ A2 . φ" (or "∀ A1 . (P → ∀ A2 . φ)", or "∃ A1 . ∃ A2 . φ") over two
+# occurrences of the same action, where swapping the occurrences bound to A1 and A2 leaves the body unchanged,
+# e.g. "(n1 = n2)" or "(intersects a1 a2)". The body then has the same value on both ordered pairs of occurrences,
+# so only the pairs i <= j of the candidate occurrences are evaluated. Occurrences are grouped by the values of the
+# variables both actions share, as the other pairs cannot match.
+class SymmetricJoin:
+    def __init__(self, quantifier: ActionQuantifier, inner: ActionQuantifier, premise: Formula | None,
+                 shared_variables: list[Variable], swapped_variables: list[Variable]):
+        self.quantifier = quantifier
+        self.inner = inner
+        self.premise = premise
+        self.shared_variables = shared_variables
+        self.swapped_variables = swapped_variables
+
+    # Returns the operator for the quantifier, or None if it is not a symmetric self-join
+    @staticmethod
+    def plan(quantifier: ActionQuantifier) -> "SymmetricJoin | None":
+        body = quantifier.expression
+        if type(body) is type(quantifier):
+            (premise, inner) = (None, body)
+        elif isinstance(quantifier, ForAllAction) and isinstance(body, Implies) and isinstance(body.right, ForAllAction):
+            (premise, inner) = (body.left, body.right)
+        else:
+            return None
+        (action, inner_action) = (quantifier.action, inner.action)
+        (label, inner_label) = (action.interval.label, inner_action.interval.label)
+        if (action.get_action_type() != inner_action.get_action_type() or label == inner_label or
+                len(action.inputs) != len(inner_action.inputs) or len(action.outputs) != len(inner_action.outputs)):
+            return None
+        # The premise of the outer quantifier cannot refer to an interval of the same name bound outside
+        if premise is not None and inner_label in premise.get_free_variables()[1]:
+            return None
+
+        # Variables in the same position are either the same, or swapped with each other
+        pairs = list(zip(action.inputs + action.outputs, inner_action.inputs + inner_action.outputs))
+        renaming: dict[str, str] = {}
+        (shared_variables, swapped_variables) = ([], [])
+        for (variable, inner_variable) in pairs:
+            if isinstance(variable, Wildcard) != isinstance(inner_variable, Wildcard):
+                return None
+            if isinstance(variable, Wildcard):
+                continue
+            if variable.label == inner_variable.label:
+                shared_variables.append(variable)
+            else:
+                renaming[variable.label] = inner_variable.label
+                renaming[inner_variable.label] = variable.label
+                swapped_variables += [variable, inner_variable]
+        for (variable, inner_variable) in pairs:
+            if not isinstance(variable, Wildcard) and (renaming.get(variable.label, variable.label) != inner_variable.label or
+                    renaming.get(inner_variable.label, inner_variable.label) != variable.label):
+                return None
+        if label in renaming or inner_label in renaming:
+            return None
+        renaming[label] = inner_label
+        renaming[inner_label] = label
+
+        pair_body = inner.expression if premise is None else Implies(premise, inner.expression)
+        if canonical_form(pair_body, {}) != canonical_form(pair_body, renaming):
+            return None
+        return SymmetricJoin(quantifier, inner, premise, shared_variables, swapped_variables)
+
+    def evaluate(self, trace: Trace, env: Environment) -> bool:
+        quantifier = self.quantifier
+        short_circuit_on = isinstance(quantifier, ExistsAction)
+        # Swapping the occurrences only preserves the body if the variables they bind were not bound before
+        if not self.applies(env):
+            return quantifier.evaluate_naively(trace, env, short_circuit_on)
+        for occurrences in self.find_groups(trace, env):
+            if self.evaluate_rows(trace, env, occurrences, range(len(occurrences))) == short_circuit_on:
+                return short_circuit_on
+        return not short_circuit_on
+
+    # Returns whether the variables bound by a single action are unbound, as required to swap the occurrences
+    def applies(self, env: Environment) -> bool:
+        return all(env.values[variable.slot] is None for variable in self.swapped_variables)
+
+    # Returns the candidate occurrences grouped by the values of the shared variables that are not bound yet.
+    # The candidates of the outer quantifier include both occurrences of every pair for which the body may
+    # not hold (or hold, for an existential), since the body has the same value on both ordered pairs.
+    def find_groups(self, trace: Trace, env: Environment) -> list[list[ActionValue]]:
+        quantifier = self.quantifier
+        values = env.values
+        key_slots = [variable.slot for variable in self.shared_variables if values[variable.slot] is None]
+        mark = env.mark()
+        groups = defaultdict(list)
+        for occurrence in quantifier.find_candidates(trace, env):
+            if quantifier.bind_occurrence(occurrence, env):
+                groups[tuple(values[slot] for slot in key_slots)].append(occurrence)
+                env.undo(mark)
+        return list(groups.values())
+
+    # Evaluates the pairs (i, j) of occurrences of a group with i in the given rows and i <= j
+    def evaluate_rows(self, trace: Trace, env: Environment, occurrences: list[ActionValue], rows: range) -> bool:
+        (quantifier, inner) = (self.quantifier, self.inner)
+        short_circuit_on = isinstance(quantifier, ExistsAction)
+        (outer_slot, inner_slot) = (quantifier.action.interval.slot, inner.action.interval.slot)
+        mark = env.mark()
+        for i in rows:
+            occurrence = occurrences[i]
+            quantifier.bind_occurrence(occurrence, env)
+            env.bind_interval(outer_slot, occurrence.interval_value)
+            # An occurrence that does not satisfy the premise cannot be part of a counterexample in either position
+            if self.premise is None or self.premise.evaluate(trace, env):
+                inner_mark = env.mark()
+                for j in range(i, len(occurrences)):
+                    other = occurrences[j]
+                    if not inner.bind_occurrence(other, env):
+                        continue
+                    env.bind_interval(inner_slot, other.interval_value)
+                    result = inner.expression.evaluate(trace, env)
+                    env.undo(inner_mark)
+                    if result == short_circuit_on:
+                        env.undo(mark)
+                        return short_circuit_on
+            env.undo(mark)
+        return not short_circuit_on
+
+# Rewrite of "∀ A1 . (P1 → ∀ A2 . (P2 → (v1 = v2)))" over two occurrences of the same action, where P1 only depends
+# on A1 and P2 only on A2 (besides the variables bound outside): within each group of occurrences that agree on the
+# variables both actions share, all the values of v1 and v2 of the occurrences satisfying their premise must be equal.
+# Each action is scanned once, the values being collected per group, instead of a nested loop over all pairs.
+# The premises may be missing. The formula is the original quantifier, evaluated instead if one of the variables
+# bound by a single action is already bound.
+class GroupAgreement(UnaryExpr):
+    def __init__(self, expression: ForAllAction, inner: ForAllAction, premise: Formula | None, inner_premise: Formula | None,
+                 value: Variable, inner_value: Variable, key_variables: list[Variable], own_variables: list[Variable]):
+        super().__init__(expression)
+        self.quantifier = expression
+        self.inner = inner
+        self.premise = premise
+        self.inner_premise = inner_premise
+        self.value = value
+        self.inner_value = inner_value
+        self.key_variables = key_variables
+        self.own_variables = own_variables
+
+    # Returns the rewrite of the quantifier, or None if it does not have the expected shape
+    @staticmethod
+    def plan(quantifier: Formula) -> "GroupAgreement | None":
+        if not isinstance(quantifier, ForAllAction):
+            return None
+        (premise, inner) = split_implication(quantifier.expression)
+        if not isinstance(inner, ForAllAction):
+            return None
+        (inner_premise, conclusion) = split_implication(inner.expression)
+        if not isinstance(conclusion, Equal):
+            return None
+        (action, inner_action) = (quantifier.action, inner.action)
+        (label, inner_label) = (action.interval.label, inner_action.interval.label)
+        if (action.get_action_type() != inner_action.get_action_type() or label == inner_label or
+                len(action.inputs) != len(inner_action.inputs) or len(action.outputs) != len(inner_action.outputs)):
+            return None
+
+        # The variables in the same position of both actions form the key of the groups,
+        # any other variable must be bound by a single action
+        variables = [variable for variable in action.inputs + action.outputs if not isinstance(variable, Wildcard)]
+        inner_variables = [variable for variable in inner_action.inputs + inner_action.outputs if not isinstance(variable, Wildcard)]
+        key_variables = [variable for (variable, inner_variable) in zip(action.inputs + action.outputs, inner_action.inputs + inner_action.outputs)
+            if not isinstance(variable, Wildcard) and variable == inner_variable]
+        key_labels = {variable.label for variable in key_variables}
+        labels = {variable.label for variable in variables} - key_labels
+        inner_labels = {variable.label for variable in inner_variables} - key_labels
+        if labels & {variable.label for variable in inner_variables} or inner_labels & {variable.label for variable in variables}:
+            return None
+
+        # The conclusion compares a value of each action
+        (left, right) = (conclusion.left, conclusion.right)
+        if not all(isinstance(operand, Variable) and not isinstance(operand, Wildcard) for operand in (left, right)):
+            return None
+        if left.label in inner_labels and right.label in labels:
+            (left, right) = (right, left)
+        if left.label not in labels or right.label not in inner_labels:
+            return None
+
+        # Each premise depends on a single occurrence, otherwise the pairs must be enumerated
+        if premise is not None:
+            (premise_variables, premise_intervals) = premise.get_free_variables()
+            if premise_variables & inner_labels or inner_label in premise_intervals:
+                return None
+        if inner_premise is not None:
+            (premise_variables, premise_intervals) = inner_premise.get_free_variables()
+            if premise_variables & labels or label in premise_intervals:
+                return None
+        own_variables = [variable for variable in variables + inner_variables if variable.label not in key_labels]
+        return GroupAgreement(quantifier, inner, premise, inner_premise, left, right, key_variables, own_variables)
+
+    def evaluate(self, trace, env) -> bool:
+        values = env.values
+        if any(values[variable.slot] is not None for variable in self.own_variables):
+            return self.expression.evaluate(trace, env)
+        key_slots = [variable.slot for variable in self.key_variables if values[variable.slot] is None]
+        # Values of v1 and of v2 in each group
+        groups: defaultdict[tuple, tuple[set, set]] = defaultdict(lambda: (set(), set()))
+        self.collect(self.quantifier, self.premise, self.value, 0, trace, env, key_slots, groups)
+        self.collect(self.inner, self.inner_premise, self.inner_value, 1, trace, env, key_slots, groups)
+        for (group_values, inner_group_values) in groups.values():
+            if group_values and inner_group_values and len(group_values | inner_group_values) > 1:
+                return False
+        return True
+
+    def collect(self, quantifier: ForAllAction, premise: Formula | None, value: Variable, side: int,
+                trace: Trace, env: Environment, key_slots: list[int], groups: defaultdict[tuple, tuple[set, set]]) -> None:
+        values = env.values
+        interval_slot = quantifier.action.interval.slot
+        mark = env.mark()
+        for occurrence in quantifier.find_candidates(trace, env):
+            if not quantifier.bind_occurrence(occurrence, env):
+                continue
+            env.bind_interval(interval_slot, occurrence.interval_value)
+            if premise is None or premise.evaluate(trace, env):
+                groups[tuple(values[slot] for slot in key_slots)][side].add(values[value.slot])
+            env.undo(mark)
+
+    def __repr__(self) -> str:
+        return f"{self.expression}"
+
+# Physical operator for a quantifier whose body only compares the time points of its interval with the ones of intervals
+# bound outside, through Before and Meets in either direction, e.g. "∃ A . (before a l)", or
+# "∀ A . (¬(equals a b) ∧ (before a l) → ¬(before b a))". A universal is decided as the negation of an existential
+# over its counterexamples. Whether an occurrence satisfies all the comparisons only depends on the smallest and
+# largest time points of the occurrences that share the values of the variables already bound, which are looked up
+# in the trace's endpoint tables instead of scanning the occurrences.
+class AggregateLookup:
+    def __init__(self, quantifier: ActionQuantifier, constraints: list[tuple[str, str, Interval, str]]):
+        self.quantifier = quantifier
+        # (time point of the quantified interval, comparison, other interval, time point of the other interval)
+        self.constraints = constraints
+
+    # Returns the operator for the quantifier, or None if its body does not have the expected shape
+    @staticmethod
+    def plan(quantifier: ActionQuantifier) -> "AggregateLookup | None":
+        action = quantifier.action
+        labels = [variable.label for variable in action.inputs + action.outputs if not isinstance(variable, Wildcard)]
+        # A variable repeated in the action compares values of the same occurrence
+        if len(set(labels)) != len(labels):
+            return None
+        body = quantifier.expression
+        if isinstance(quantifier, ExistsAction):
+            literals = conjuncts(body)
+        elif isinstance(body, Implies):
+            literals = conjuncts(body.left) + negated_conjuncts(body.right)
+        else:
+            literals = negated_conjuncts(body)
+
+        label = action.interval.label
+        constraints = []
+        # Pairs of intervals that an unnegated Before puts in some order, hence that cannot be equal
+        ordered = set()
+        for literal in literals:
+            (negated, relation) = (True, literal.expression) if isinstance(literal, Not) else (False, literal)
+            if isinstance(relation, (Before, Meets)) and not negated or isinstance(relation, Before):
+                if relation.left.label == relation.right.label or label not in (relation.left.label, relation.right.label):
+                    return None
+                if isinstance(relation, Before) and not negated:
+                    ordered.add(frozenset((relation.left.label, relation.right.label)))
+                comparison = {(Before, False): "<", (Before, True): ">=", (Meets, False): "=="}[(type(relation), negated)]
+                if relation.left.label == label:
+                    constraints.append(("end", comparison, relation.right, "begin"))
+                else:
+                    # The other interval is on the left: the comparison is reversed
+                    comparison = {"<": ">", ">=": "<=", "==": "=="}[comparison]
+                    constraints.append(("begin", comparison, relation.left, "end"))
+            elif not (negated and isinstance(relation, Equals)):
+                return None
+        # An occurrence different from a bound interval is implied by a Before between them
+        for literal in literals:
+            if isinstance(literal, Not) and isinstance(literal.expression, Equals):
+                relation = literal.expression
+                if label not in (relation.left.label, relation.right.label) or frozenset((relation.left.label, relation.right.label)) not in ordered:
+                    return None
+        if not constraints:
+            return None
+        return AggregateLookup(quantifier, constraints)
+
+    def evaluate(self, trace: Trace, env: Environment) -> bool:
+        quantifier = self.quantifier
+        short_circuit_on = isinstance(quantifier, ExistsAction)
+        ranges = {"begin": UNBOUNDED, "end": UNBOUNDED}
+        for (endpoint, comparison, interval, other_endpoint) in self.constraints:
+            other = env.intervals[interval.slot]
+            if other is None:
+                return quantifier.evaluate_naively(trace, env, short_circuit_on)
+            ranges[endpoint] = restrict_range(ranges[endpoint], comparison, other.begin if other_endpoint == "begin" else other.end)
+
+        action = quantifier.action
+        values = env.values
+        positions = []
+        key = []
+        for (position, variable) in enumerate(action.inputs + action.outputs):
+            if variable.slot is not None and values[variable.slot] is not None:
+                positions.append(position)
+                key.append(values[variable.slot])
+        tables = trace.get_endpoint_tables(action.get_action_type(), len(action.inputs), len(action.outputs), tuple(positions))
+        table = tables.get(tuple(key))
+        # Whether there is a witness of the existential, or a counterexample of the universal
+        found = table is not None and table.exists(ranges["end"], ranges["begin"])
+        return found if short_circuit_on else not found
+
+# Narrows a range of time points to the ones that compare as given with a time point
+def restrict_range(time_range: TimeRange, comparison: str, timepoint: int | float) -> TimeRange:
+    (low, low_excluded, high, high_excluded) = time_range
+    if comparison in ("<", "<=", "==") and (timepoint < high or timepoint == high and comparison == "<"):
+        (high, high_excluded) = (timepoint, comparison == "<")
+    if comparison in (">", ">=", "==") and (timepoint > low or timepoint == low and comparison == ">"):
+        (low, low_excluded) = (timepoint, comparison == ">")
+    return low, low_excluded, high, high_excluded
+
 class Action(Formula):
     def __init__(self, action_type: ActionType, interval: Interval, inputs: Variable | list[Variable], outputs: Variable | list[Variable]):
         self.action_type = action_type
@@ -627,10 +1635,10 @@ class Action(Formula):
     def get_action_type(self) -> ActionType:
         return self.action_type
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        eval_interval = self.interval.evaluate(trace, store, interval_store)
-        eval_inputs = [variable.evaluate(trace, store, interval_store) for variable in self.inputs]
-        eval_outputs = [variable.evaluate(trace, store, interval_store) for variable in self.outputs]
+    def evaluate(self, trace, env) -> bool:
+        eval_interval = self.interval.evaluate(trace, env)
+        eval_inputs = [variable.evaluate(trace, env) for variable in self.inputs]
+        eval_outputs = [variable.evaluate(trace, env) for variable in self.outputs]
 
         # Create begin and end events with missing id and time, to be completed by the trace
         begin_event = BeginEvent(self.action_type, None, eval_inputs, None)
@@ -653,7 +1661,7 @@ class Action(Formula):
     
         return (completed_end_event is not None) and completed_end_event.id == completed_begin_event.id
 
-    def get_possible_values(self, trace, store, interval_store, var) -> list[str]:
+    def get_possible_values(self, trace, env, var) -> list[str]:
         possible_values = []
         for (i, variable) in enumerate(self.inputs):
             if variable.label == var.label:
@@ -663,7 +1671,39 @@ class Action(Formula):
                 possible_values.extend(trace.get_outputs(self.action_type, i))
         return possible_values
 
-    def get_possible_actions(self, trace, store, interval_store, interval) -> list["Action"]:
+    def get_children(self) -> list[Formula]:
+        return [self.interval] + self.inputs + self.outputs
+
+    def set_children(self, children) -> None:
+        self.interval = children[0]
+        self.inputs = children[1:len(self.inputs) + 1]
+        self.outputs = children[len(self.inputs) + 1:]
+
+    # Returns the column of the values bound to the variable with the given slot
+    def get_column(self, columns: ActionColumns, slot: int) -> Any:
+        for (variable, column) in zip(self.inputs + self.outputs, columns.inputs + columns.outputs):
+            if variable.slot == slot:
+                return column
+        raise ValueError(f"Variable with slot {slot} not found in {self}")
+
+    # Same as ActionQuantifier.bind_occurrence on every row of the columns, returning a boolean array
+    def match_columns(self, columns: ActionColumns, env: "Environment") -> Any:
+        matches = np.ones(len(columns), dtype=bool)
+        bound = {}
+        for (variable, column) in zip(self.inputs + self.outputs, columns.inputs + columns.outputs):
+            slot = variable.slot
+            if slot is None:
+                continue
+            value = env.values[slot]
+            if value is not None:
+                matches &= column == value
+            elif slot in bound:
+                matches &= column == bound[slot]
+            else:
+                bound[slot] = column
+        return matches
+
+    def get_possible_actions(self, trace, env, interval) -> list["Action"]:
         if self.interval.label == interval.label:
             return [self]
         else:
@@ -689,6 +1729,37 @@ class IntervalPredicate(Formula, ABC):
         assert isinstance(right, Interval), f"Expected Interval, but got '{right}' of {type(right)}"
         self.left = left
         self.right = right
+
+    # Kinds of overlap that the relation implies for its left interval with respect to its right one
+    overlap_kinds: set[str] = set()
+
+    def get_overlap(self, label) -> tuple[str, set[str]] | None:
+        if not self.overlap_kinds or self.left.label == self.right.label:
+            return None
+        if self.left.label == label:
+            return self.right.label, self.overlap_kinds
+        if self.right.label == label:
+            return self.left.label, {INVERSE_OVERLAP_KINDS[kind] for kind in self.overlap_kinds}
+        return None
+
+    def select_occurrences(self, trace, action_type, label, env) -> list[ActionValue] | None:
+        return select_overlapping(self, trace, action_type, label, env)
+
+    def get_children(self) -> list[Formula]:
+        return [self.left, self.right]
+
+    def set_children(self, children) -> None:
+        (self.left, self.right) = children
+
+    def evaluate_columns(self, columns, env, action) -> Any:
+        (left_begin, left_end) = self.left.evaluate_columns(columns, env, action)
+        (right_begin, right_end) = self.right.evaluate_columns(columns, env, action)
+        return self.holds(left_begin, left_end, right_begin, right_end)
+
+    # Same as evaluate on time points that may be columns, hence the operators on booleans instead of and/or
+    @abstractmethod
+    def holds(self, left_begin: Any, left_end: Any, right_begin: Any, right_end: Any) -> Any:
+        pass
     
     def __eq__(self, other: object) -> bool:
         return (isinstance(other, type(self)) and
@@ -699,11 +1770,28 @@ class Before(IntervalPredicate):
     def __init__(self, left, right):
         super().__init__(left, right)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        left = self.left.evaluate(trace, store, interval_store)
-        right = self.right.evaluate(trace, store, interval_store)
+    def evaluate(self, trace, env) -> bool:
+        left = self.left.evaluate(trace, env)
+        right = self.right.evaluate(trace, env)
         return left.end < right.begin
 
+    def select_occurrences(self, trace, action_type, label, env) -> list[ActionValue] | None:
+        if self.left.label == label and self.right.label != label and env.intervals[self.right.slot] is not None:
+            return trace.get_order_index(action_type).ending_before(env.intervals[self.right.slot].begin)
+        if self.right.label == label and self.left.label != label and env.intervals[self.left.slot] is not None:
+            return trace.get_order_index(action_type).beginning_after(env.intervals[self.left.slot].end)
+        return None
+
+    def select_occurrences_negated(self, trace, action_type, label, env) -> list[ActionValue] | None:
+        if self.left.label == label and self.right.label != label and env.intervals[self.right.slot] is not None:
+            return trace.get_order_index(action_type).ending_from(env.intervals[self.right.slot].begin)
+        if self.right.label == label and self.left.label != label and env.intervals[self.left.slot] is not None:
+            return trace.get_order_index(action_type).beginning_until(env.intervals[self.left.slot].end)
+        return None
+
+    def holds(self, left_begin, left_end, right_begin, right_end) -> Any:
+        return left_end < right_begin
+
     def __repr__(self) -> str:
         return f"Before({self.left}, {self.right})"
 
@@ -711,80 +1799,364 @@ class Meets(IntervalPredicate):
     def __init__(self, left, right):
         super().__init__(left, right)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        left = self.left.evaluate(trace, store, interval_store)
-        right = self.right.evaluate(trace, store, interval_store)
+    def evaluate(self, trace, env) -> bool:
+        left = self.left.evaluate(trace, env)
+        right = self.right.evaluate(trace, env)
         return left.end == right.begin
 
+    def select_occurrences(self, trace, action_type, label, env) -> list[ActionValue] | None:
+        if self.left.label == label and self.right.label != label and env.intervals[self.right.slot] is not None:
+            return trace.get_order_index(action_type).ending_at(env.intervals[self.right.slot].begin)
+        if self.right.label == label and self.left.label != label and env.intervals[self.left.slot] is not None:
+            return trace.get_order_index(action_type).beginning_at(env.intervals[self.left.slot].end)
+        return None
+
+    def holds(self, left_begin, left_end, right_begin, right_end) -> Any:
+        return left_end == right_begin
+
     def __repr__(self) -> str:
         return f"Meets({self.left}, {self.right})"
 
 class Overlaps(IntervalPredicate):
+    overlap_kinds = {"overlapping"}
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        left = self.left.evaluate(trace, store, interval_store)
-        right = self.right.evaluate(trace, store, interval_store)
+    def evaluate(self, trace, env) -> bool:
+        left = self.left.evaluate(trace, env)
+        right = self.right.evaluate(trace, env)
         return left.begin < right.begin < left.end < right.end
 
+    def holds(self, left_begin, left_end, right_begin, right_end) -> Any:
+        return (left_begin < right_begin) & (right_begin < left_end) & (left_end < right_end)
+
     def __repr__(self) -> str:
         return f"Overlaps({self.left}, {self.right})"
 
 class Starts(IntervalPredicate):
+    overlap_kinds = {"overlapping", "within"}
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        left = self.left.evaluate(trace, store, interval_store)
-        right = self.right.evaluate(trace, store, interval_store)
+    def evaluate(self, trace, env) -> bool:
+        left = self.left.evaluate(trace, env)
+        right = self.right.evaluate(trace, env)
         return left.begin == right.begin and left.end < right.end
 
+    def holds(self, left_begin, left_end, right_begin, right_end) -> Any:
+        return (left_begin == right_begin) & (left_end < right_end)
+
     def __repr__(self) -> str:
         return f"Starts({self.left}, {self.right})"
 
 class During(IntervalPredicate):
+    overlap_kinds = {"overlapping", "within"}
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        left = self.left.evaluate(trace, store, interval_store)
-        right = self.right.evaluate(trace, store, interval_store)
+    def evaluate(self, trace, env) -> bool:
+        left = self.left.evaluate(trace, env)
+        right = self.right.evaluate(trace, env)
         return right.begin < left.begin and left.end < right.end
 
+    def holds(self, left_begin, left_end, right_begin, right_end) -> Any:
+        return (right_begin < left_begin) & (left_end < right_end)
+
     def __repr__(self) -> str:
         return f"During({self.left}, {self.right})"
 
 class Finishes(IntervalPredicate):
+    overlap_kinds = {"overlapping", "within"}
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        left = self.left.evaluate(trace, store, interval_store)
-        right = self.right.evaluate(trace, store, interval_store)
+    def evaluate(self, trace, env) -> bool:
+        left = self.left.evaluate(trace, env)
+        right = self.right.evaluate(trace, env)
         return left.end == right.end and right.begin < left.begin
 
+    def holds(self, left_begin, left_end, right_begin, right_end) -> Any:
+        return (left_end == right_end) & (right_begin < left_begin)
+
     def __repr__(self) -> str:
         return f"Finishes({self.left}, {self.right})"
 
 class Equals(IntervalPredicate):
+    overlap_kinds = {"overlapping", "within", "containing"}
+
     def __init__(self, left, right):
         super().__init__(left, right)
 
-    def evaluate(self, trace, store, interval_store) -> bool:
-        left = self.left.evaluate(trace, store, interval_store)
-        right = self.right.evaluate(trace, store, interval_store)
+    def evaluate(self, trace, env) -> bool:
+        left = self.left.evaluate(trace, env)
+        right = self.right.evaluate(trace, env)
         return left == right
 
+    def holds(self, left_begin, left_end, right_begin, right_end) -> Any:
+        return (left_begin == right_begin) & (left_end == right_end)
+
     def __repr__(self) -> str:
         return f"Equals({self.left}, {self.right})"
 
+# The 13 basic relations of Allen's interval algebra, in the order of their bits in a relation set
+ALLEN_RELATIONS = [
+    "before", "meets", "overlaps", "starts", "during", "finishes", "equals",
+    "finished_by", "contains", "started_by", "overlapped_by", "met_by", "after",
+]
+ALLEN_BITS = {name: 1 << i for (i, name) in enumerate(ALLEN_RELATIONS)}
+
+# Kinds of overlap implied by each basic relation for its left interval with respect to its right one
+ALLEN_OVERLAP_KINDS = {
+    "before": set(),
+    "meets": {"overlapping"},
+    "overlaps": {"overlapping"},
+    "starts": {"overlapping", "within"},
+    "during": {"overlapping", "within"},
+    "finishes": {"overlapping", "within"},
+    "equals": {"overlapping", "within", "containing"},
+    "finished_by": {"overlapping", "containing"},
+    "contains": {"overlapping", "containing"},
+    "started_by": {"overlapping", "containing"},
+    "overlapped_by": {"overlapping"},
+    "met_by": {"overlapping"},
+    "after": set(),
+}
+
+# Returns the position in ALLEN_RELATIONS of the basic relation between two intervals, with at most four comparisons.
+# Ongoing intervals end at infinity, which compares equal to itself. A degenerate interval (begin == end) is classified
+# by comparing begins and ends first, so one that starts another is not considered to meet it.
+def allen_relation(left_begin: int | float, left_end: int | float, right_begin: int | float, right_end: int | float) -> int:
+    if left_begin < right_begin:
+        if left_end < right_end:
+            if right_begin < left_end:
+                return 2 # overlaps
+            return 1 if left_end == right_begin else 0 # meets, before
+        return 7 if left_end == right_end else 8 # finished_by, contains
+    if left_begin == right_begin:
+        if left_end < right_end:
+            return 3 # starts
+        return 6 if left_end == right_end else 9 # equals, started_by
+    if left_end > right_end:
+        if left_begin < right_end:
+            return 10 # overlapped_by
+        return 11 if left_begin == right_end else 12 # met_by, after
+    return 5 if left_end == right_end else 4 # finishes, during
+
+# Same as allen_relation on time points that may be columns
+def allen_relations(left_begin: Any, left_end: Any, right_begin: Any, right_end: Any) -> Any:
+    return np.where(left_begin < right_begin,
+        np.where(left_end < right_end,
+            np.where(right_begin < left_end, 2, np.where(left_end == right_begin, 1, 0)),
+            np.where(left_end == right_end, 7, 8)),
+        np.where(left_begin == right_begin,
+            np.where(left_end < right_end, 3, np.where(left_end == right_end, 6, 9)),
+            np.where(left_end > right_end,
+                np.where(left_begin < right_end, 10, np.where(left_begin == right_end, 11, 12)),
+                np.where(left_end == right_end, 5, 4))))
+
+# Disjunction of basic relations between two intervals, such as "in" or "intersects", evaluated by
+# classifying the pair of intervals once and testing the bit of its relation in the mask of the set
+class AllenRelationSet(IntervalPredicate):
+    def __init__(self, name: str, relations: list[str], left, right):
+        super().__init__(left, right)
+        self.name = name
+        self.relations = relations
+        self.mask = 0
+        for relation in relations:
+            self.mask |= ALLEN_BITS[relation]
+        self.overlap_kinds = set.intersection(*(ALLEN_OVERLAP_KINDS[relation] for relation in relations))
+
+    def evaluate(self, trace, env) -> bool:
+        left = self.left.evaluate(trace, env)
+        right = self.right.evaluate(trace, env)
+        return (1 << allen_relation(left.begin, left.end, right.begin, right.end)) & self.mask != 0
+
+    def holds(self, left_begin, left_end, right_begin, right_end) -> Any:
+        return (1 << allen_relations(left_begin, left_end, right_begin, right_end)) & self.mask != 0
+
+    def __eq__(self, other: object) -> bool:
+        return super().__eq__(other) and self.mask == other.mask
+
+    def __repr__(self) -> str:
+        return f"{self.name.capitalize()}({self.left}, {self.right})"
+
+INVERSE_OVERLAP_KINDS = {
+    "overlapping": "overlapping",
+    "within": "containing",
+    "containing": "within",
+}
+
+# Returns the occurrences that overlap the interval implied by the formula, using the trace's interval tree
+def select_overlapping(formula: Formula, trace: Trace, action_type: ActionType, label: str, env: Environment) -> list[ActionValue] | None:
+    overlap = formula.get_overlap(label)
+    if overlap is None:
+        return None
+    (other_label, kinds) = overlap
+    interval_value = env.intervals[SLOTS.intervals[other_label]]
+    if interval_value is None:
+        return None
+    interval_tree = trace.get_interval_tree(action_type)
+    if "within" in kinds:
+        return interval_tree.within(interval_value.begin, interval_value.end)
+    if "containing" in kinds:
+        return interval_tree.containing(interval_value.begin, interval_value.end)
+    return interval_tree.overlapping(interval_value.begin, interval_value.end)
+
+# Assigns the slot of every variable and interval of the formula, wildcards being never bound
+def resolve_slots(formula: Formula) -> Formula:
+    stack = [formula]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Wildcard):
+            continue
+        if isinstance(node, Variable):
+            node.slot = SLOTS.variable_slot(node.label)
+        elif isinstance(node, Interval):
+            node.slot = SLOTS.interval_slot(node.label)
+        stack.extend(node.get_children())
+    return formula
+
+# Wraps in a Memo every quantifier that does not depend on the variables and intervals bound by one of the quantifiers
+# around it, as it is then evaluated repeatedly with the same free values. Returns the memoized subformulas.
+def memoize(formula: Formula, max_size: int = MEMO_SIZE) -> list[Memo]:
+    memos = []
+    # Labels of the variables and intervals bound by each quantifier around the visited node
+    binders: list[tuple[set[str], set[str]]] = []
+    def visit(node: Formula) -> Formula:
+        if isinstance(node, ActionQuantifier):
+            action = node.action
+            binders.append(({variable.label for variable in action.inputs + action.outputs if not isinstance(variable, Wildcard)}, {action.interval.label}))
+        elif isinstance(node, Quantifier):
+            binders.append(({variable.label for variable in node.variables}, set()))
+        children = node.get_children()
+        if children:
+            node.set_children([visit(child) for child in children])
+        if isinstance(node, (ActionQuantifier, Quantifier)):
+            binders.pop()
+            (variables, intervals) = node.get_free_variables()
+            if any(not (bound_variables & variables or bound_intervals & intervals) for (bound_variables, bound_intervals) in binders):
+                memo = Memo(node, max_size)
+                memos.append(memo)
+                return memo
+        return node
+    visit(formula)
+    return memos
+
+# Returns whether the formula only relates intervals and compares values, so that it can be evaluated on columns:
+# every node that it accepts has an evaluate_columns method, which evaluates it on every row of the columns of the
+# action, returning a boolean array, or a single boolean if the formula does not depend on the action
+def is_vectorizable(formula: Formula) -> bool:
+    if isinstance(formula, (Not, And, Or, Implies)):
+        return all(is_vectorizable(expression) for expression in formula.get_children())
+    if isinstance(formula, Equal):
+        return all(isinstance(expression, (Variable, Constant)) and not isinstance(expression, Wildcard) for expression in formula.get_children())
+    return isinstance(formula, IntervalPredicate)
+
+# Returns the variables and intervals occurring in the formula
+def leaves(formula: Formula) -> list[Formula]:
+    if isinstance(formula, (Variable, Interval)):
+        return [formula]
+    return [leaf for expression in formula.get_children() for leaf in leaves(expression)]
+
+# Returns whether one of the given labels of variables and intervals occurs free in the formula
+def depends_on(formula: Formula, labels: set[str]) -> bool:
+    (variables, intervals) = formula.get_free_variables()
+    return not labels.isdisjoint(variables) or not labels.isdisjoint(intervals)
+
+# Flattens nested conjunctions into the list of their conjuncts
+def conjuncts(formula: Formula) -> list[Formula]:
+    if isinstance(formula, And):
+        return [conjunct for expression in formula.expressions for conjunct in conjuncts(expression)]
+    return [formula]
+
+# Returns formulas whose conjunction is the negation of the given one
+def negated_conjuncts(formula: Formula) -> list[Formula]:
+    if isinstance(formula, Not):
+        return conjuncts(formula.expression)
+    if isinstance(formula, Or):
+        return [conjunct for expression in formula.expressions for conjunct in negated_conjuncts(expression)]
+    if isinstance(formula, Implies):
+        return conjuncts(formula.left) + negated_conjuncts(formula.right)
+    return [Not(formula)]
+
+# Splits a formula into the premise of an implication, or None, and its conclusion
+def split_implication(formula: Formula) -> tuple[Formula | None, Formula]:
+    if isinstance(formula, Implies):
+        return formula.left, formula.right
+    return None, formula
+
+# Flattens nested disjunctions into the list of their disjuncts
+def disjuncts(formula: Formula) -> list[Formula]:
+    if isinstance(formula, Or):
+        return [disjunct for expression in formula.expressions for disjunct in disjuncts(expression)]
+    return [formula]
+
+# Returns the relation set of the converse relations, that holds between b and a when the given one holds between a and b
+def converse_mask(mask: int) -> int:
+    return sum(1 << (len(ALLEN_RELATIONS) - 1 - i) for i in range(len(ALLEN_RELATIONS)) if mask & (1 << i))
+
+# Returns a string that is the same for two formulas if they are equivalent up to the order of conjuncts and disjuncts,
+# the merging of nested implications and the order of the operands of symmetric relations, once the free variables
+# and intervals of the formula are renamed as given
+def canonical_form(formula: Formula, renaming: dict[str, str]) -> str:
+    if isinstance(formula, (Memo, GroupAgreement)):
+        return canonical_form(formula.expression, renaming)
+    if isinstance(formula, Wildcard):
+        return "-"
+    if isinstance(formula, (Variable, Interval)):
+        return renaming.get(formula.label, formula.label)
+    if isinstance(formula, Constant):
+        return repr(formula.label)
+    if isinstance(formula, (And, Or)):
+        expressions = conjuncts(formula) if isinstance(formula, And) else disjuncts(formula)
+        return f"({type(formula).__name__} " + " ".join(sorted(canonical_form(expression, renaming) for expression in expressions)) + ")"
+    if isinstance(formula, Implies):
+        (premises, conclusion) = (conjuncts(formula.left), formula.right)
+        while isinstance(conclusion, Implies):
+            premises += conjuncts(conclusion.left)
+            conclusion = conclusion.right
+        return ("(Implies (And " + " ".join(sorted(canonical_form(premise, renaming) for premise in premises)) + ") " +
+            canonical_form(conclusion, renaming) + ")")
+    if isinstance(formula, (Equal, Equals)):
+        operands = sorted(canonical_form(expression, renaming) for expression in formula.get_children())
+        return f"({type(formula).__name__} " + " ".join(operands) + ")"
+    if isinstance(formula, AllenRelationSet):
+        (left, right) = (canonical_form(formula.left, renaming), canonical_form(formula.right, renaming))
+        mask = formula.mask
+        if right < left:
+            (left, right, mask) = (right, left, converse_mask(mask))
+        return f"(AllenRelationSet {mask} {left} {right})"
+    if isinstance(formula, (ActionQuantifier, Quantifier)):
+        # A renamed label rebound inside the formula would be captured by the quantifier, so the formula
+        # is considered different from any other
+        if isinstance(formula, ActionQuantifier):
+            labels = {formula.action.interval.label}
+        else:
+            labels = {variable.label for variable in formula.variables}
+        if labels & set(renaming):
+            return f"({type(formula).__name__} {id(formula)})"
+    if isinstance(formula, Action):
+        action = formula
+        return (f"(Action {action.action_type.name} {canonical_form(action.interval, renaming)} (" +
+            " ".join(canonical_form(variable, renaming) for variable in action.inputs) + ") (" +
+            " ".join(canonical_form(variable, renaming) for variable in action.outputs) + "))")
+    return f"({type(formula).__name__} " + " ".join(canonical_form(expression, renaming) for expression in formula.get_children()) + ")"
+
 class Constant(Formula):
     def __init__(self, label: str):
         self.label = label
-    
-    def evaluate(self, _trace, _store, _interval_store) -> str:
-        return self.label
+        # Number of the value in the symbol table, compared with the values of the trace
+        self.symbol = SYMBOLS.intern(label)
+
+    def evaluate(self, _trace, _env) -> int:
+        return self.symbol
+
+    def evaluate_columns(self, _columns, _env, _action) -> int:
+        return self.symbol
 
     def __eq__(self, other: object) -> bool:
         return (isinstance(other, Constant) and
@@ -797,9 +2169,12 @@ class Wildcard(Variable):
     def __init__(self):
         super().__init__("-")
 
-    def evaluate(self, _trace, _store, _interval_store) -> bool:
+    def evaluate(self, _trace, _env) -> bool:
         raise ValueError("Wildcard should not be evaluated directly")
 
+    def get_free_variables(self) -> tuple[set[str], set[str]]:
+        return set(), set()
+
     def __eq__(self, other: object) -> bool:
         return False
 
@@ -0,0 +1,159 @@
+DEBUG = False
+
+from collections import defaultdict
+
+from ast_nodes import *
+from parse_formula import format_formula
+
+# Evaluates several formulas on the same trace, returning the verdict of each one. Besides the indexes of the trace,
+# which are built once for all of them:
+# - the quantifiers that occur in several places, up to the labels of their intervals and free variables,
+#   share the cache of their results (see share_subformulas), and
+# - the outermost quantifiers over the same action, including the conjuncts of a conjunction at the root of a formula,
+#   are evaluated in a single loop over its occurrences (see evaluate_merged).
+# As with memoize, the shared subformulas are wrapped in Memo nodes in place, keeping up to max_size results (0 to disable).
+def evaluate_all(formulas: list[Formula], trace: Trace, max_size: int = MEMO_SIZE) -> list[bool]:
+    if max_size > 0:
+        share_subformulas(formulas, max_size)
+    for formula in formulas:
+        resolve_slots(formula)
+    env = Environment()
+
+    # A formula holds if all the conjuncts at its root hold: the ones that cannot be merged are evaluated first,
+    # and the other conjuncts of a formula that does not hold are not evaluated
+    parts = [conjuncts(formula) for formula in formulas]
+    verdicts = [True] * len(formulas)
+    loops: defaultdict[tuple[ActionType, int, int], list[tuple[int, ActionQuantifier]]] = defaultdict(list)
+    for (i, formula_parts) in enumerate(parts):
+        for part in formula_parts:
+            if isinstance(part, ActionQuantifier) and uses_loop(part):
+                action = part.action
+                loops[(action.get_action_type(), len(action.inputs), len(action.outputs))].append((i, part))
+            elif verdicts[i] and not part.evaluate(trace, env):
+                verdicts[i] = False
+
+    for quantifiers in loops.values():
+        quantifiers = [(i, quantifier) for (i, quantifier) in quantifiers if verdicts[i]]
+        if not quantifiers:
+            continue
+        if len(quantifiers) == 1:
+            # Evaluated on its own, possibly on columns
+            results = [quantifiers[0][1].evaluate(trace, env)]
+        else:
+            DEBUG and print(f"Evaluating {len(quantifiers)} quantifiers over {quantifiers[0][1].action.get_action_type().name.lower()} in one loop")
+            results = evaluate_merged([quantifier for (_, quantifier) in quantifiers], trace, env)
+        for ((i, _), result) in zip(quantifiers, results):
+            verdicts[i] = verdicts[i] and result
+    return verdicts
+
+# Returns whether the quantifier loops over its occurrences, rather than being evaluated by a physical operator
+def uses_loop(quantifier: ActionQuantifier) -> bool:
+    return (getattr(quantifier, "sweep_join", None) is None and quantifier.symmetric_join is None and
+        quantifier.aggregate_lookup is None)
+
+# Evaluates quantifiers over the same action, with no variable bound, in a single loop over its occurrences:
+# each one is bound in turn to every occurrence, until the quantifier is decided
+def evaluate_merged(quantifiers: list[ActionQuantifier], trace: Trace, env: Environment) -> list[bool]:
+    results: list[bool | None] = [None] * len(quantifiers)
+    pending = list(range(len(quantifiers)))
+    action = quantifiers[0].action
+    mark = env.mark()
+    for occurrence in trace.find_occurrences_by_arity(action.get_action_type(), len(action.inputs), len(action.outputs)):
+        decided = False
+        for i in pending:
+            quantifier = quantifiers[i]
+            if not quantifier.bind_occurrence(occurrence, env):
+                continue
+            env.bind_interval(quantifier.action.interval.slot, occurrence.interval_value)
+            result = quantifier.expression.evaluate(trace, env)
+            env.undo(mark)
+            # A counterexample for a universal, a witness for an existential
+            if result == isinstance(quantifier, ExistsAction):
+                results[i] = result
+                decided = True
+        if decided:
+            pending = [i for i in pending if results[i] is None]
+            if not pending:
+                break
+    return [not isinstance(quantifier, ExistsAction) if result is None else result for (quantifier, result) in zip(quantifiers, results)]
+
+# Wraps the quantifiers that occur more than once among the formulas, up to the labels of their intervals and free
+# variables, in Memo nodes sharing a table, so that each result is only computed once for all of them. The quantifiers
+# at the root of a formula are not wrapped, nor the ones evaluated by the join of an enclosing quantifier.
+# Returns the Memo nodes.
+def share_subformulas(formulas: list[Formula], max_size: int = MEMO_SIZE) -> list[Memo]:
+    # Places of the quantifiers by normalized formula: (parent, position among the children of the parent, quantifier, free labels)
+    places: defaultdict[str, list[tuple[Formula, int, ActionQuantifier, tuple[list[str], list[str]]]]] = defaultdict(list)
+
+    def visit(node: Formula, in_join: bool) -> None:
+        if isinstance(node, GroupAgreement):
+            return
+        for (i, child) in enumerate(node.get_children()):
+            # The operands of a join are nested quantifiers, possibly in a conjunction, disjunction or implication
+            child_in_join = (isinstance(node, ActionQuantifier) and not uses_loop(node) or
+                in_join and isinstance(node, (And, Or, Implies)))
+            if isinstance(child, ActionQuantifier) and not child_in_join:
+                (shape, labels) = normalize(child)
+                places[shape].append((node, i, child, labels))
+            visit(child, child_in_join)
+
+    for formula in formulas:
+        visit(formula, False)
+
+    memos = []
+    for (shape, shape_places) in places.items():
+        if len(shape_places) < 2:
+            continue
+        DEBUG and print(f"Sharing the results of {len(shape_places)} occurrences of:\n{shape}")
+        table = MemoTable(max_size)
+        for (parent, i, quantifier, labels) in shape_places:
+            memo = Memo(quantifier, table=table, labels=labels)
+            children = list(parent.get_children())
+            children[i] = memo
+            parent.set_children(children)
+            memos.append(memo)
+    return memos
+
+# Returns the formula with its intervals and variables renamed by order of appearance, the quantified intervals
+# apart from the others, together with the labels of the variables and of the intervals that are not quantified
+# in that order. Two formulas with the same result only differ in their labels, the free ones being in correspondence.
+# The labels are renamed in place for printing and then restored, as copying the formula would leave cyclic garbage
+# (the plans of the quantifiers refer to them) for the collector to scan along with the trace.
+def normalize(formula: Formula) -> tuple[str, tuple[list[str], list[str]]]:
+    (variables, intervals) = ([], [])
+    renamed: list[tuple[Interval | Variable, str]] = []
+    renamed_ids: set[int] = set()
+    bound = [0]
+
+    def rename(node: Formula, renaming: dict[str, str]) -> None:
+        if isinstance(node, ActionQuantifier):
+            renaming = dict(renaming)
+            renaming[node.action.interval.label] = f"b{bound[0]}"
+            bound[0] += 1
+        # A node shared by several parents is renamed once
+        if id(node) in renamed_ids:
+            pass
+        elif isinstance(node, Interval):
+            renamed.append((node, node.label))
+            renamed_ids.add(id(node))
+            if node.label in renaming:
+                node.label = renaming[node.label]
+            else:
+                if node.label not in intervals:
+                    intervals.append(node.label)
+                node.label = f"i{intervals.index(node.label)}"
+        elif isinstance(node, Variable) and not isinstance(node, Wildcard):
+            renamed.append((node, node.label))
+            renamed_ids.add(id(node))
+            if node.label not in variables:
+                variables.append(node.label)
+            node.label = f"v{variables.index(node.label)}"
+        for child in node.get_children():
+            rename(child, renaming)
+
+    try:
+        rename(formula, {})
+        return format_formula(formula), (variables, intervals)
+    finally:
+        for (node, label) in reversed(renamed):
+            node.label = label
@@ -0,0 +1,238 @@
+DEBUG = False
+
+from array import array
+from datetime import datetime, timedelta
+
+from ast_nodes import Trace, ActionType, ActionValue, IntervalValue, Event, BeginEvent, EndEvent
+
+# Action types by number, the number of the action type of an event being part of its code
+ACTION_TYPES = list(ActionType)
+TYPE_NUMBERS = {action_type: number for (number, action_type) in enumerate(ACTION_TYPES)}
+
+# End time point of the ongoing occurrences in the end columns, as integer arrays cannot hold infinity
+ONGOING = -1
+
+# Times are stored as the number of microseconds since this date
+EPOCH = datetime(1970, 1, 1)
+
+# Returns the code of the begin or end event of the occurrence of the action type at the given row
+def event_code(action_type: ActionType, row: int, end: bool) -> int:
+    return row << 5 | TYPE_NUMBERS[action_type] << 1 | end
+
+# An occurrence of a columnar trace, materialized from the columns of its action type
+class ActionRecord(ActionValue):
+    __slots__ = ("row",)
+
+    def __init__(self, action_type: ActionType, interval_value: IntervalValue, input_values: list[int], output_values: list[int], row: int):
+        super().__init__(action_type, interval_value, input_values, output_values)
+        # Position of the occurrence among the ones of its action type
+        self.row = row
+
+# The occurrences of an action type, one row per occurrence in begin order. The input and output values of each row,
+# numbers of the symbol table, are stored in values from the given starts.
+class OccurrenceColumns:
+    __slots__ = ("begins", "ends", "ids", "input_starts", "input_counts", "output_starts", "output_counts", "values")
+
+    def __init__(self):
+        self.begins = array("q")
+        self.ends = array("q")
+        self.ids: list[str] = []
+        self.input_starts = array("q")
+        self.input_counts = array("H")
+        self.output_starts = array("q")
+        self.output_counts = array("H")
+        self.values = array("q")
+
+    def __len__(self) -> int:
+        return len(self.begins)
+
+# The events of a columnar trace by time point, as the list of sets of a trace: the events of a time point are
+# materialized each time it is accessed
+class EventSets:
+    def __init__(self, trace: "ColumnarTrace"):
+        self.trace = trace
+
+    def __len__(self) -> int:
+        return len(self.trace.times)
+
+    def __getitem__(self, timepoint: int | slice) -> set[Event] | list[set[Event]]:
+        if isinstance(timepoint, slice):
+            return [self[i] for i in range(*timepoint.indices(len(self)))]
+        return self.trace.get_events(range(len(self))[timepoint])
+
+    def __iter__(self):
+        return (self[timepoint] for timepoint in range(len(self)))
+
+# Occurrences by input or output value, as in the indexes of a trace, built from the columns for a position of
+# an action type when it is first looked up, and discarded whenever the occurrences of the action type change
+class ValueIndex(dict):
+    def __init__(self, trace: "ColumnarTrace", outputs: bool):
+        super().__init__()
+        self.trace = trace
+        self.outputs = outputs
+
+    def __missing__(self, key: tuple[ActionType, int]) -> dict[int, list[ActionValue]]:
+        (action_type, position) = key
+        occurrences = self.trace.find_occurrences(action_type)
+        if self.outputs:
+            # Ordered by end time point, as the occurrences are indexed when they end
+            occurrences = [occurrences[row] for row in self.trace.end_rows(action_type)]
+        values: dict[int, list[ActionValue]] = {}
+        for occurrence in occurrences:
+            occurrence_values = occurrence.output_values if self.outputs else occurrence.input_values
+            if position < len(occurrence_values):
+                values.setdefault(occurrence_values[position], []).append(occurrence)
+        self[key] = values
+        return values
+
+    def get(self, key: tuple[ActionType, int], default=None) -> dict[int, list[ActionValue]]:
+        return self[key]
+
+    def discard(self, action_type: ActionType) -> None:
+        for key in [key for key in self if key[0] == action_type]:
+            del self[key]
+
+# Trace storing its events and occurrences in arrays instead of objects: the time of each time point, a code per
+# event (the row, action type and kind of its occurrence), and the columns of the occurrences of each action type.
+# The occurrences are materialized as records the first time the ones of their action type are looked up, and kept
+# up to date afterwards, so that formulas are evaluated on the same objects as on a trace; events are materialized
+# each time their time point is accessed.
+# The end event of an occurrence has the id of its begin event.
+class ColumnarTrace(Trace):
+    def __init__(self):
+        super().__init__(EventSets(self))
+        self.times = array("q")
+        # Index of the first event of each time point
+        self.timepoint_starts = array("q")
+        self.event_codes = array("q")
+        self.occurrence_columns: dict[ActionType, OccurrenceColumns] = {}
+        # The records of the occurrences by action type, filled by find_occurrences
+        self.actions = {}
+        self.input_index = ValueIndex(self, False)
+        self.output_index = ValueIndex(self, True)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def get_length(self) -> int:
+        return len(self.event_codes)
+
+    def insert_event(self, event: Event) -> int:
+        raise TypeError("The events of a columnar trace are inserted by insert_begin_event and insert_end_event")
+
+    # Returns the time point of an event at the given time, adding one if it is later than the last one
+    def insert_time(self, time: datetime) -> int:
+        microseconds = (time - EPOCH) // timedelta(microseconds=1)
+        if len(self.times) == 0 or self.times[-1] < microseconds:
+            self.times.append(microseconds)
+            self.timepoint_starts.append(len(self.event_codes))
+        else:
+            assert self.times[-1] == microseconds, f"Trace events not ordered: {self.get_time(len(self.times) - 1)} > {time}"
+        return len(self.times) - 1
+
+    def get_time(self, timepoint: int) -> datetime:
+        return EPOCH + timedelta(microseconds=self.times[timepoint])
+
+    def decode(self, columns: OccurrenceColumns, start: int, count: int) -> list[int]:
+        return columns.values[start:start + count].tolist()
+
+    def insert_begin_event(self, action_type: ActionType, id: str, input_values: list[int], time: datetime) -> ActionValue:
+        timepoint = self.insert_time(time)
+        columns = self.occurrence_columns.setdefault(action_type, OccurrenceColumns())
+        row = len(columns)
+        columns.begins.append(timepoint)
+        columns.ends.append(ONGOING)
+        columns.ids.append(id)
+        columns.input_starts.append(len(columns.values))
+        columns.input_counts.append(len(input_values))
+        columns.values.extend(input_values)
+        columns.output_starts.append(len(columns.values))
+        columns.output_counts.append(0)
+        self.event_codes.append(event_code(action_type, row, False))
+        self.invalidate_indexes(action_type)
+        action_value = ActionRecord(action_type, IntervalValue(timepoint), input_values, [], row)
+        if action_type in self.actions:
+            self.actions[action_type].append(action_value)
+        return action_value
+
+    def insert_end_event(self, action_value: ActionValue, id: str, output_values: list[int], time: datetime) -> bool:
+        action_type = action_value.get_action_type()
+        columns = self.occurrence_columns[action_type]
+        row = action_value.row
+        if columns.ends[row] != ONGOING or columns.output_counts[row] != 0:
+            return False
+        timepoint = self.insert_time(time)
+        columns.ends[row] = timepoint
+        columns.output_starts[row] = len(columns.values)
+        columns.output_counts[row] = len(output_values)
+        columns.values.extend(output_values)
+        self.event_codes.append(event_code(action_type, row, True))
+        self.invalidate_indexes(action_type)
+        action_value.complete_end(timepoint, output_values)
+        # The record returned when the occurrence began is not the one materialized since
+        occurrences = self.actions.get(action_type)
+        if occurrences is not None and occurrences[row] is not action_value:
+            occurrences[row].complete_end(timepoint, output_values)
+        return True
+
+    def record(self, action_type: ActionType, row: int) -> ActionRecord:
+        columns = self.occurrence_columns[action_type]
+        end = columns.ends[row]
+        return ActionRecord(action_type, IntervalValue(columns.begins[row], None if end == ONGOING else end),
+            self.decode(columns, columns.input_starts[row], columns.input_counts[row]),
+            self.decode(columns, columns.output_starts[row], columns.output_counts[row]), row)
+
+    def find_occurrences(self, action_type: ActionType) -> list[ActionValue]:
+        if action_type not in self.actions:
+            columns = self.occurrence_columns.get(action_type, ())
+            self.actions[action_type] = [self.record(action_type, row) for row in range(len(columns))]
+        return self.actions[action_type]
+
+    # Returns the rows of the occurrences of the action type that ended, in the order of their end events
+    def end_rows(self, action_type: ActionType) -> list[int]:
+        end_code = TYPE_NUMBERS[action_type] << 1 | 1
+        return [code >> 5 for code in self.event_codes if code & 31 == end_code]
+
+    def get_events(self, timepoint: int) -> set[Event]:
+        start = self.timepoint_starts[timepoint]
+        stop = self.timepoint_starts[timepoint + 1] if timepoint + 1 < len(self.timepoint_starts) else len(self.event_codes)
+        time = self.get_time(timepoint)
+        events: set[Event] = set()
+        for code in self.event_codes[start:stop]:
+            (row, action_type, end) = (code >> 5, ACTION_TYPES[code >> 1 & 15], code & 1)
+            columns = self.occurrence_columns[action_type]
+            if end:
+                values = self.decode(columns, columns.output_starts[row], columns.output_counts[row])
+                events.add(EndEvent(action_type, columns.ids[row], values, time))
+            else:
+                values = self.decode(columns, columns.input_starts[row], columns.input_counts[row])
+                events.add(BeginEvent(action_type, columns.ids[row], values, time))
+        return events
+
+    def get_input_values(self, action_type: ActionType, index: int) -> list[int]:
+        return [occurrence.input_values[index] for occurrence in self.find_occurrences(action_type)
+            if index < len(occurrence.input_values)]
+
+    def get_output_values(self, action_type: ActionType, index: int) -> list[int]:
+        occurrences = self.find_occurrences(action_type)
+        return [occurrences[row].output_values[index] for row in self.end_rows(action_type)
+            if index < len(occurrences[row].output_values)]
+
+    def invalidate_indexes(self, action_type: ActionType) -> None:
+        super().invalidate_indexes(action_type)
+        self.input_index.discard(action_type)
+        self.output_index.discard(action_type)
+
+    # Materializes the occurrences and the lists of input and output values of every action type, as a trace
+    # stores them, to print them
+    def materialize(self) -> None:
+        for (action_type, columns) in self.occurrence_columns.items():
+            self.find_occurrences(action_type)
+            for i in range(max(columns.input_counts, default=0)):
+                self.input_values[(action_type, i)] = self.get_input_values(action_type, i)
+            for i in range(max(columns.output_counts, default=0)):
+                self.output_values[(action_type, i)] = self.get_output_values(action_type, i)
+
+    def __repr__(self) -> str:
+        self.materialize()
+        return super().__repr__()
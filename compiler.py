@@ -0,0 +1,254 @@
+DEBUG = False
+
+import sys
+import argparse
+
+from ast_nodes import *
+from parse_formula import parse_formula, handle_input
+
+# Templates of the relations between two intervals, inlined as comparisons between their time points
+RELATION_TEMPLATES = {
+    Before: "{left_end} < {right_begin}",
+    Meets: "{left_end} == {right_begin}",
+    Overlaps: "{left_begin} < {right_begin} < {left_end} < {right_end}",
+    Starts: "{left_begin} == {right_begin} and {left_end} < {right_end}",
+    During: "{right_begin} < {left_begin} and {left_end} < {right_end}",
+    Finishes: "{left_end} == {right_end} and {right_begin} < {left_begin}",
+    Equals: "{left_begin} == {right_begin} and {left_end} == {right_end}",
+}
+
+def unbound_variable(label: str):
+    raise ValueError(f"Variable {label} not found in store")
+
+def unbound_interval(label: str):
+    raise ValueError(f"Interval {label} not found in interval store")
+
+# Generates the Python source of a formula: every action quantifier becomes a function with a loop over the
+# occurrences of its action, taking the trace and every variable bound so far as arguments. Domain variables
+# are held in locals named "v_<label>" and intervals in pairs of locals "b_<label>" and "e_<label>".
+class FormulaCompiler:
+    def __init__(self, formula: Formula, store_labels: list[str], interval_store_labels: list[str]):
+        self.formula = formula
+        self.store_labels = store_labels
+        self.interval_store_labels = interval_store_labels
+        self.functions: list[str] = []
+
+    def generate(self) -> str:
+        body = self.expression(self.formula, self.store_labels, self.interval_store_labels)
+        lines = ["def evaluate(trace, store, interval_store):"]
+        for label in self.store_labels:
+            lines.append(f"    v_{label} = store[{label!r}]")
+        for label in self.interval_store_labels:
+            lines.append(f"    b_{label} = interval_store[{label!r}].begin")
+            lines.append(f"    e_{label} = interval_store[{label!r}].end")
+        lines.append(f"    return {body}")
+        return "\n\n".join(self.functions + ["\n".join(lines)]) + "\n"
+
+    def expression(self, formula: Formula, domain: list[str], intervals: list[str]) -> str:
+        if isinstance(formula, ActionQuantifier):
+            return self.quantifier(formula, domain, intervals)
+        elif isinstance(formula, (Memo, GroupAgreement)):
+            return self.expression(formula.expression, domain, intervals)
+        elif isinstance(formula, Not):
+            return f"(not {self.expression(formula.expression, domain, intervals)})"
+        elif isinstance(formula, And):
+            return "(" + " and ".join(self.expression(expression, domain, intervals) for expression in formula.expressions) + ")"
+        elif isinstance(formula, Or):
+            return "(" + " or ".join(self.expression(expression, domain, intervals) for expression in formula.expressions) + ")"
+        elif isinstance(formula, Implies):
+            return f"(not {self.expression(formula.left, domain, intervals)} or {self.expression(formula.right, domain, intervals)})"
+        elif isinstance(formula, Equal):
+            return f"({self.value(formula.left, domain)} == {self.value(formula.right, domain)})"
+        elif isinstance(formula, AllenRelationSet):
+            relation = "allen_relation({}, {}, {}, {})".format(self.begin(formula.left, intervals), self.end(formula.left, intervals),
+                self.begin(formula.right, intervals), self.end(formula.right, intervals))
+            return f"((1 << {relation}) & {formula.mask} != 0)"
+        elif type(formula) in RELATION_TEMPLATES:
+            return "(" + RELATION_TEMPLATES[type(formula)].format(
+                left_begin=self.begin(formula.left, intervals), left_end=self.end(formula.left, intervals),
+                right_begin=self.begin(formula.right, intervals), right_end=self.end(formula.right, intervals)) + ")"
+        else:
+            raise ValueError(f"Cannot compile formula {formula} of {type(formula)}")
+
+    def value(self, formula: Formula, domain: list[str]) -> str:
+        if isinstance(formula, Constant):
+            return repr(formula.symbol)
+        elif isinstance(formula, Wildcard):
+            return "unbound_variable('-')"
+        elif isinstance(formula, Variable):
+            return f"v_{formula.label}" if formula.label in domain else f"unbound_variable({formula.label!r})"
+        else:
+            raise ValueError(f"Cannot compile value {formula} of {type(formula)}")
+
+    def begin(self, interval: Interval, intervals: list[str]) -> str:
+        return f"b_{interval.label}" if interval.label in intervals else f"unbound_interval({interval.label!r})"
+
+    def end(self, interval: Interval, intervals: list[str]) -> str:
+        return f"e_{interval.label}" if interval.label in intervals else f"unbound_interval({interval.label!r})"
+
+    def quantifier(self, quantifier: ActionQuantifier, domain: list[str], intervals: list[str]) -> str:
+        action = quantifier.action
+        action_type = f"ActionType.{action.get_action_type().name}"
+        index = len(self.functions)
+        name = f"quantifier_{index}"
+        # Reserve the position of the function before generating the ones it calls
+        self.functions.append("")
+        parameters = ", ".join(["trace"] + [f"v_{label}" for label in domain] + [f"b_{label}, e_{label}" for label in intervals])
+
+        lines = [f"def {name}({parameters}):"]
+        lines.append(f"    occurrences = trace.find_occurrences_by_arity({action_type}, {len(action.inputs)}, {len(action.outputs)})")
+        candidates = self.candidates(quantifier, action_type, domain, intervals)
+        lines.extend("    " + line for line in candidates)
+        lines.append("    for occurrence in occurrences:")
+        # Occurrences found through an index are not bucketed by arity
+        if candidates:
+            lines.append(f"        if len(occurrence.input_values) < {len(action.inputs)} or len(occurrence.output_values) < {len(action.outputs)}:")
+            lines.append("            continue")
+
+        # Bind the values of the occurrence, or compare them with the variables already bound
+        inner_domain = list(domain)
+        for (values, variables) in (("input_values", action.inputs), ("output_values", action.outputs)):
+            if any(not isinstance(variable, Wildcard) for variable in variables):
+                lines.append(f"        values = occurrence.{values}")
+            for (i, variable) in enumerate(variables):
+                if isinstance(variable, Wildcard):
+                    continue
+                if variable.label in inner_domain:
+                    lines.append(f"        if values[{i}] != v_{variable.label}:")
+                    lines.append("            continue")
+                else:
+                    lines.append(f"        v_{variable.label} = values[{i}]")
+                    inner_domain.append(variable.label)
+        label = action.interval.label
+        inner_intervals = intervals + [label] if label not in intervals else list(intervals)
+        lines.append("        interval_value = occurrence.interval_value")
+        lines.append(f"        b_{label} = interval_value.begin")
+        lines.append(f"        e_{label} = interval_value.end")
+
+        body = self.expression(quantifier.expression, inner_domain, inner_intervals)
+        if isinstance(quantifier, ForAllAction):
+            lines.append(f"        if not {body}:")
+            lines.append("            return False")
+            lines.append("    return True")
+        else:
+            lines.append(f"        if {body}:")
+            lines.append("            return True")
+            lines.append("    return False")
+
+        self.functions[index] = "\n".join(lines)
+        arguments = ", ".join(["trace"] + [f"v_{label}" for label in domain] + [f"b_{label}, e_{label}" for label in intervals])
+        return f"{name}({arguments})"
+
+    # Generates the same choice of candidate occurrences as ActionQuantifier.find_candidates,
+    # which is known statically given the variables bound at the quantifier
+    def candidates(self, quantifier: ActionQuantifier, action_type: str, domain: list[str], intervals: list[str]) -> list[str]:
+        action = quantifier.action
+        lookups = []
+        for (i, variable) in enumerate(action.inputs):
+            if not isinstance(variable, Wildcard) and variable.label in domain:
+                lookups.append(f"trace.find_occurrences_by_input({action_type}, {i}, v_{variable.label})")
+        for (i, variable) in enumerate(action.outputs):
+            if not isinstance(variable, Wildcard) and variable.label in domain:
+                lookups.append(f"trace.find_occurrences_by_output({action_type}, {i}, v_{variable.label})")
+        guards = []
+        for guard in quantifier.guards:
+            source = self.guard(guard, action_type, action.interval.label, intervals)
+            if source is not None:
+                guards.append(source)
+        if not lookups and not guards:
+            return []
+
+        lines = ["if len(occurrences) >= INDEX_THRESHOLD:"]
+        for lookup in lookups:
+            lines.append(f"    candidates = {lookup}")
+            lines.append("    if len(candidates) < len(occurrences):")
+            lines.append("        occurrences = candidates")
+        for guard in guards:
+            lines.append("    if occurrences:")
+            lines.append(f"        candidates = {guard}")
+            lines.append("        if len(candidates) < len(occurrences):")
+            lines.append("            occurrences = candidates")
+        return lines
+
+    # Generates the index query selecting the occurrences that may satisfy a guard, mirroring select_occurrences
+    def guard(self, guard: Formula, action_type: str, label: str, intervals: list[str]) -> str | None:
+        (negated, relation) = (True, guard.expression) if isinstance(guard, Not) else (False, guard)
+        if isinstance(relation, (Before, Meets)):
+            if relation.left.label == label and relation.right.label != label and relation.right.label in intervals:
+                queries = {(Before, False): "ending_before", (Before, True): "ending_from", (Meets, False): "ending_at"}
+                argument = f"b_{relation.right.label}"
+            elif relation.right.label == label and relation.left.label != label and relation.left.label in intervals:
+                queries = {(Before, False): "beginning_after", (Before, True): "beginning_until", (Meets, False): "beginning_at"}
+                argument = f"e_{relation.left.label}"
+            else:
+                return None
+            query = queries.get((type(relation), negated))
+            return None if query is None else f"trace.get_order_index({action_type}).{query}({argument})"
+        if negated:
+            return None
+        overlap = guard.get_overlap(label)
+        if overlap is None or overlap[0] not in intervals:
+            return None
+        (other_label, kinds) = overlap
+        query = "within" if "within" in kinds else "containing" if "containing" in kinds else "overlapping"
+        return f"trace.get_interval_tree({action_type}).{query}(b_{other_label}, e_{other_label})"
+
+class CompiledFormula:
+    def __init__(self, formula: Formula):
+        self.formula = formula
+        # The generated code depends on which variables are bound when the evaluation starts
+        self.functions: dict[tuple[tuple[str, ...], tuple[str, ...]], Any] = {}
+        self.sources: dict[tuple[tuple[str, ...], tuple[str, ...]], str] = {}
+
+    def get_source(self, store_labels: list[str] | None = None, interval_store_labels: list[str] | None = None) -> str:
+        key = (tuple(sorted(store_labels or [])), tuple(sorted(interval_store_labels or [])))
+        if key not in self.sources:
+            self.sources[key] = FormulaCompiler(self.formula, list(key[0]), list(key[1])).generate()
+        return self.sources[key]
+
+    def evaluate(self, trace: Trace, env: Environment) -> bool:
+        store = env.get_store()
+        interval_store = env.get_interval_store()
+        key = (tuple(sorted(store)), tuple(sorted(interval_store)))
+        if key not in self.functions:
+            source = self.get_source(list(key[0]), list(key[1]))
+            namespace = {
+                "ActionType": ActionType,
+                "INDEX_THRESHOLD": INDEX_THRESHOLD,
+                "allen_relation": allen_relation,
+                "unbound_variable": unbound_variable,
+                "unbound_interval": unbound_interval,
+            }
+            exec(compile(source, "<compiled formula>", "exec"), namespace)
+            self.functions[key] = namespace["evaluate"]
+        return self.functions[key](trace, store, interval_store)
+
+def compile_formula(formula: Formula) -> CompiledFormula:
+    return CompiledFormula(formula)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a formula from string or file to Python source")
+    parser.add_argument("-d", "--debug", action="store_true", help="Enable debug output")
+    parser.add_argument("-f", "--formula", type=handle_input, help="Path to formula file or formula string")
+    args = parser.parse_args()
+
+    global DEBUG
+    DEBUG = args.debug
+    if args.formula is not None:
+        formula = args.formula
+    else:
+    # If we do not have a formula, read from stdin
+        print("Enter formula (Ctrl+D to end input):", file=sys.stderr)
+        formula = sys.stdin.read().strip()
+    if not formula:
+        print("Error: No input provided.", file=sys.stderr)
+        sys.exit(1)
+    ast = parse_formula(formula)
+    if DEBUG:
+        print("-"*50, "Parsed formula:", ast, sep="\n")
+
+    # Print the source that was generated from the formula
+    print("-"*50, "Compiled formula:", compile_formula(ast).get_source(), "-"*50, sep="\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+DEBUG = False
+
+from math import prod
+
+from ast_nodes import *
+from profiler import Profiler, label, LEAVES
+
+# Number of directly nested loops over all the occurrences of their action from which a quantifier is reported
+WARN_DEGREE = 3
+
+# Estimated evaluation of a node of the formula. The numbers are None when they cannot be estimated, without a trace
+# or within a join, whose bodies are only evaluated for the pairs of occurrences that the join selects.
+class PlanStep:
+    def __init__(self, node: Formula, depth: int, operator: str, calls: float | None,
+                 candidates: float | None = None, evaluations: float | None = None, scans: tuple[str, ...] = ()):
+        self.node = node
+        self.depth = depth
+        self.operator = operator
+        # Times the node is evaluated, the occurrences considered by each evaluation of a quantifier,
+        # and the evaluations of its body over all of them
+        self.calls = calls
+        self.candidates = candidates
+        self.evaluations = evaluations
+        # Quantifiers around the node and the node itself that loop over all the occurrences of their action
+        self.scans = scans
+
+# Returns how each node of the formula would be evaluated on the trace, in the order of the formula tree. The numbers
+# of evaluations are upper bounds: every occurrence is assumed to match the action and no quantifier to be decided
+# before the end of its occurrences. The occurrences of an action that share a value bound outside are estimated from
+# the number of distinct values at its position, and the cached results of a memo from the values of its free labels.
+def explain(formula: Formula, trace: Trace | None = None) -> list[PlanStep]:
+    steps: list[PlanStep] = []
+
+    # The estimated number of distinct values of each variable bound around the node, and of occurrences bound to
+    # each interval, are given in distinct
+    def visit(node: Formula, depth: int, calls: float | None, scans: tuple[str, ...], distinct: dict[str, float | None]) -> None:
+        if isinstance(node, LEAVES):
+            return
+        if isinstance(node, ActionQuantifier):
+            visit_quantifier(node, depth, calls, scans, distinct)
+        elif isinstance(node, Memo):
+            (variables, intervals) = node.expression.get_free_variables()
+            # The labels that are not bound around the memo are bound by the quantifier it caches
+            keys = product([distinct[label] for label in variables | intervals if label in distinct])
+            steps.append(PlanStep(node, depth, "memo", calls, evaluations=minimum(calls, keys), scans=scans))
+            visit(node.expression, depth + 1, minimum(calls, keys), scans, distinct)
+        elif isinstance(node, GroupAgreement):
+            (quantifier, inner) = (node.quantifier, node.inner)
+            (count, inner_count) = (cardinality(quantifier, trace), cardinality(inner, trace))
+            steps.append(PlanStep(node, depth, "group agreement", calls, add(count, inner_count),
+                multiply(calls, add(count, inner_count)), scans))
+            steps.append(PlanStep(quantifier, depth + 1, "grouped", 0, count, None, scans))
+            steps.append(PlanStep(inner, depth + 1, "grouped", 0, inner_count, None, scans))
+        else:
+            steps.append(PlanStep(node, depth, "", calls, scans=scans))
+            for child in node.get_children():
+                visit(child, depth + 1, calls, scans, distinct)
+
+    def visit_quantifier(quantifier: ActionQuantifier, depth: int, calls: float | None, scans: tuple[str, ...],
+                         distinct: dict[str, float | None]) -> None:
+        action = quantifier.action
+        count = cardinality(quantifier, trace)
+        inner_distinct = bind(quantifier, distinct)
+        if getattr(quantifier, "sweep_join", None) is not None:
+            joins = quantifier.sweep_join.joins
+            counts = [cardinality(join, trace) for join in joins]
+            candidates = add(count, *counts)
+            steps.append(PlanStep(quantifier, depth, "sweep join", calls, candidates, multiply(calls, candidates), scans))
+            for (join, join_count) in zip(joins, counts):
+                steps.append(PlanStep(join, depth + 1, "joined", 0, join_count, None, scans))
+            return
+        if quantifier.symmetric_join is not None:
+            join = quantifier.symmetric_join
+            groups = max((distinct_count for distinct_count in (inner_distinct[variable.label] for variable in join.shared_variables)
+                if distinct_count), default=1)
+            # The pairs i <= j of the occurrences of each group, the groups being about as large as each other
+            pairs = None if count is None else count * (count / groups + 1) / 2
+            # Without shared variables, all the pairs are evaluated
+            scans = scans + (header(quantifier),) * (1 if join.shared_variables else 2)
+            steps.append(PlanStep(quantifier, depth, "symmetric join", calls, count, multiply(calls, pairs), scans))
+            steps.append(PlanStep(join.inner, depth + 1, "joined", 0, count, None, scans))
+            inner_distinct = bind(join.inner, inner_distinct)
+            if join.premise is not None:
+                visit(join.premise, depth + 1, multiply(calls, count), scans, inner_distinct)
+            visit(join.inner.expression, depth + 2, multiply(calls, pairs), scans, inner_distinct)
+            return
+        if quantifier.aggregate_lookup is not None:
+            steps.append(PlanStep(quantifier, depth, "aggregate lookup", calls, 0, 0, scans))
+            return
+
+        # Occurrences sharing the values of the variables bound outside, looked up in the value index of the trace
+        indexed = [(variable, count_at(quantifier, trace, i)) for (i, variable) in enumerate(action.inputs + action.outputs)
+            if not isinstance(variable, Wildcard) and variable.label in distinct]
+        if indexed and (count is None or count >= INDEX_THRESHOLD):
+            operator = "index (" + ", ".join(variable.label for (variable, _) in indexed) + ")"
+            candidates = None if count is None else min(count / max(values or 1, 1) for (_, values) in indexed)
+        else:
+            (operator, candidates) = ("scan", count)
+            scans = scans + (header(quantifier),)
+        vectorized = np is not None and quantifier.column_leaves is not None and candidates is not None and candidates >= VECTORIZE_THRESHOLD
+        if vectorized:
+            operator += ", vectorized"
+        evaluations = multiply(calls, candidates)
+        steps.append(PlanStep(quantifier, depth, operator, calls, candidates, evaluations, scans))
+        # A vectorized body is evaluated on columns, not node by node
+        visit(quantifier.expression, depth + 1, 0 if vectorized else evaluations, scans, inner_distinct)
+
+    # Returns the estimates of the labels bound around the body of the quantifier
+    def bind(quantifier: ActionQuantifier, distinct: dict[str, float | None]) -> dict[str, float | None]:
+        action = quantifier.action
+        distinct = dict(distinct)
+        for (i, variable) in enumerate(action.inputs + action.outputs):
+            if not isinstance(variable, Wildcard) and variable.label not in distinct:
+                distinct[variable.label] = count_at(quantifier, trace, i)
+        distinct[action.interval.label] = cardinality(quantifier, trace)
+        return distinct
+
+    visit(formula, 0, 1, (), {})
+    return steps
+
+# Returns the representation of the quantifier without its body
+def header(quantifier: ActionQuantifier) -> str:
+    return label(quantifier, [quantifier.expression])
+
+# Number of occurrences of the action of the quantifier
+def cardinality(quantifier: ActionQuantifier, trace: Trace | None) -> int | None:
+    if trace is None:
+        return None
+    action = quantifier.action
+    return len(trace.find_occurrences_by_arity(action.get_action_type(), len(action.inputs), len(action.outputs)))
+
+# Number of distinct values at the given position among the input values followed by the output values of the action
+def count_at(quantifier: ActionQuantifier, trace: Trace | None, position: int) -> int | None:
+    if trace is None:
+        return None
+    action = quantifier.action
+    if position < len(action.inputs):
+        return len(trace.input_index.get((action.get_action_type(), position), {}))
+    return len(trace.output_index.get((action.get_action_type(), position - len(action.inputs)), {}))
+
+def add(*numbers: float | None) -> float | None:
+    return None if None in numbers else sum(numbers)
+
+def multiply(a: float | None, b: float | None) -> float | None:
+    return None if a is None or b is None else a * b
+
+def product(numbers: list[float | None]) -> float | None:
+    return None if None in numbers else prod(numbers)
+
+def minimum(a: float | None, b: float | None) -> float | None:
+    return b if a is None else a if b is None else min(a, b)
+
+# Returns a warning for each quantifier nested in loops over all the occurrences of their actions at least
+# WARN_DEGREE deep, the deepest one of each nest only
+def complexity_warnings(steps: list[PlanStep]) -> list[str]:
+    nests = {step.scans for step in steps if len(step.scans) >= WARN_DEGREE}
+    warnings = []
+    for scans in sorted(nests, key=len, reverse=True):
+        if any(other[:len(scans)] == scans for other in nests if len(other) > len(scans)):
+            continue
+        warnings.append(f"Warning: {len(scans)} nested loops over all the occurrences of their action, O(n^{len(scans)}): " +
+            " / ".join(scans))
+    return warnings
+
+# Returns the plan, one node per line indented below its parent, with the counts recorded by the profiler if given
+def format_plan(steps: list[PlanStep], profiler: Profiler | None = None) -> str:
+    header = f"{'operator':<22} {'calls':>10} {'candidates':>10} {'body evals':>10}"
+    if profiler is not None:
+        header += f" {'act calls':>10} {'scanned':>10}"
+    lines = [header + "  formula"]
+    for step in steps:
+        line = f"{step.operator:<22} {estimate_str(step.calls):>10} {estimate_str(step.candidates):>10} {estimate_str(step.evaluations):>10}"
+        if profiler is not None:
+            stats = profiler.stats.get(id(step.node))
+            scanned = stats.scanned if stats is not None and isinstance(step.node, ActionQuantifier) else "-"
+            line += f" {'-' if stats is None else stats.calls:>10} {scanned:>10}"
+        children = [child for child in step.node.get_children() if not isinstance(child, LEAVES)]
+        lines.append(f"{line}  {'  ' * step.depth}{label(step.node, children)}")
+    return "\n".join(lines + complexity_warnings(steps))
+
+def estimate_str(number: float | None) -> str:
+    if number is None:
+        return "-"
+    if number >= 1e6:
+        return f"{number:.2e}"
+    return str(round(number))
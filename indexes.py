@@ -0,0 +1,271 @@
+from bisect import bisect_left, bisect_right
+from typing import Any
+
+# NumPy is optional: without it, quantifiers are always evaluated one occurrence at a time
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# End time point of ongoing actions in the columns, as integer arrays cannot hold infinity
+INF_END = None if np is None else np.iinfo(np.int64).max
+
+# Indexes over the occurrences of a single action type, built once from a completed trace
+# and used by the action quantifiers to avoid scanning every occurrence
+
+class OrderIndex:
+    def __init__(self, occurrences: list["ActionValue"]):
+        # Occurrences are inserted in begin order, but sort anyway in case the trace was built by hand
+        self.by_begin = sorted(occurrences, key=lambda occurrence: occurrence.interval_value.begin)
+        self.begins = [occurrence.interval_value.begin for occurrence in self.by_begin]
+        # Ongoing actions end at infinity and are therefore placed last
+        self.by_end = sorted(occurrences, key=lambda occurrence: occurrence.interval_value.end)
+        self.ends = [occurrence.interval_value.end for occurrence in self.by_end]
+
+    def __len__(self) -> int:
+        return len(self.by_begin)
+
+    # Occurrences whose end time point is smaller than the given time point
+    def ending_before(self, timepoint: int | float) -> list["ActionValue"]:
+        return self.by_end[:bisect_left(self.ends, timepoint)]
+
+    # Occurrences whose end time point is equal to the given time point
+    def ending_at(self, timepoint: int | float) -> list["ActionValue"]:
+        return self.by_end[bisect_left(self.ends, timepoint):bisect_right(self.ends, timepoint)]
+
+    # Occurrences whose end time point is greater than or equal to the given time point
+    def ending_from(self, timepoint: int | float) -> list["ActionValue"]:
+        return self.by_end[bisect_left(self.ends, timepoint):]
+
+    # Occurrences whose begin time point is greater than the given time point
+    def beginning_after(self, timepoint: int | float) -> list["ActionValue"]:
+        return self.by_begin[bisect_right(self.begins, timepoint):]
+
+    # Occurrences whose begin time point is equal to the given time point
+    def beginning_at(self, timepoint: int | float) -> list["ActionValue"]:
+        return self.by_begin[bisect_left(self.begins, timepoint):bisect_right(self.begins, timepoint)]
+
+    # Occurrences whose begin time point is smaller than or equal to the given time point
+    def beginning_until(self, timepoint: int | float) -> list["ActionValue"]:
+        return self.by_begin[:bisect_right(self.begins, timepoint)]
+
+    # The queries of an interval tree, for indexes kept up to date as occurrences are inserted (see monitor.OnlineTrace).
+    # Each returns the smaller of the two ranges of occurrences that bound its result, without filtering them: the
+    # occurrences are candidates, and the formula checks the relation again for each one.
+
+    # Occurrences among which are the ones that share at least one time point with [begin, end]
+    def overlapping(self, begin: int | float, end: int | float) -> list["ActionValue"]:
+        (beginning, ending) = (bisect_right(self.begins, end), bisect_left(self.ends, begin))
+        return self.by_begin[:beginning] if beginning <= len(self.ends) - ending else self.by_end[ending:]
+
+    # Occurrences among which are the ones that contain [begin, end]
+    def containing(self, begin: int | float, end: int | float) -> list["ActionValue"]:
+        (beginning, ending) = (bisect_right(self.begins, begin), bisect_left(self.ends, end))
+        return self.by_begin[:beginning] if beginning <= len(self.ends) - ending else self.by_end[ending:]
+
+    # Occurrences among which are the ones that lie within [begin, end]
+    def within(self, begin: int | float, end: int | float) -> list["ActionValue"]:
+        (beginning, ending) = (bisect_left(self.begins, begin), bisect_right(self.ends, end))
+        return self.by_begin[beginning:] if len(self.begins) - beginning <= ending else self.by_end[:ending]
+
+class IntervalTreeNode:
+    def __init__(self, center: int | float, occurrences: list["ActionValue"], left: "IntervalTreeNode | None", right: "IntervalTreeNode | None"):
+        self.center = center
+        # Every occurrence stored in a node contains its center
+        self.by_begin = sorted(occurrences, key=lambda occurrence: occurrence.interval_value.begin)
+        self.by_end = sorted(occurrences, key=lambda occurrence: occurrence.interval_value.end, reverse=True)
+        self.left = left
+        self.right = right
+
+# Static centered interval tree, answering which occurrences overlap, contain or lie within an interval
+# in O(log n + k), where k is the number of overlapping occurrences
+class IntervalTree:
+    def __init__(self, occurrences: list["ActionValue"]):
+        self.size = len(occurrences)
+        self.root = self.build(occurrences)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def build(self, occurrences: list["ActionValue"]) -> IntervalTreeNode | None:
+        if not occurrences:
+            return None
+        # The median begin time point is always finite and is contained by at least one occurrence
+        begins = sorted(occurrence.interval_value.begin for occurrence in occurrences)
+        center = begins[len(begins) // 2]
+        left, middle, right = [], [], []
+        for occurrence in occurrences:
+            if occurrence.interval_value.end < center:
+                left.append(occurrence)
+            elif occurrence.interval_value.begin > center:
+                right.append(occurrence)
+            else:
+                middle.append(occurrence)
+        return IntervalTreeNode(center, middle, self.build(left), self.build(right))
+
+    # Occurrences that share at least one time point with [begin, end]
+    def overlapping(self, begin: int | float, end: int | float) -> list["ActionValue"]:
+        result = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if end < node.center:
+                for occurrence in node.by_begin:
+                    if occurrence.interval_value.begin > end:
+                        break
+                    result.append(occurrence)
+                stack.append(node.left)
+            elif begin > node.center:
+                for occurrence in node.by_end:
+                    if occurrence.interval_value.end < begin:
+                        break
+                    result.append(occurrence)
+                stack.append(node.right)
+            else:
+                result.extend(node.by_begin)
+                stack.append(node.left)
+                stack.append(node.right)
+        return result
+
+    # Occurrences that contain [begin, end]
+    def containing(self, begin: int | float, end: int | float) -> list["ActionValue"]:
+        return [occurrence for occurrence in self.overlapping(begin, begin) if occurrence.interval_value.end >= end]
+
+    # Occurrences that lie within [begin, end]
+    def within(self, begin: int | float, end: int | float) -> list["ActionValue"]:
+        return [occurrence for occurrence in self.overlapping(begin, end)
+            if occurrence.interval_value.begin >= begin and occurrence.interval_value.end <= end]
+
+# Range of time points: (low, low excluded, high, high excluded)
+TimeRange = tuple[int | float, bool, int | float, bool]
+UNBOUNDED: TimeRange = (float("-inf"), False, float("inf"), False)
+
+def in_range(timepoint: int | float, time_range: TimeRange) -> bool:
+    (low, low_excluded, high, high_excluded) = time_range
+    return (low < timepoint if low_excluded else low <= timepoint) and (timepoint < high if high_excluded else timepoint <= high)
+
+# Begin and end time points of occurrences of a single action type sharing some of their values, sorted by end time point,
+# with sparse tables of the smallest and largest begin time points of their ranges
+class EndpointTable:
+    def __init__(self, occurrences: list["ActionValue"]):
+        by_end = sorted(occurrences, key=lambda occurrence: occurrence.interval_value.end)
+        self.ends = [occurrence.interval_value.end for occurrence in by_end]
+        self.begins = [occurrence.interval_value.begin for occurrence in by_end]
+        self.min_begins = sparse_table(self.begins, min)
+        self.max_begins = sparse_table(self.begins, max)
+        # Segment tree of the sorted begin time points of ranges of occurrences, built for the first range of begin
+        # time points bounded on both sides that the smallest and largest ones do not decide
+        self.sorted_begins: list[list[int | float]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    # Whether an occurrence ends and begins in the given ranges: the occurrences ending in the range are found by bisection,
+    # and a range of begin time points open on one side only needs their smallest or largest begin time point.
+    # A range bounded on both sides is decided by them when one of them is in it or both are on the same side of it,
+    # and is looked up otherwise in the sorted begin time points of the O(log n) nodes of the segment tree covering them.
+    def exists(self, end_range: TimeRange, begin_range: TimeRange) -> bool:
+        (low, low_excluded, high, high_excluded) = end_range
+        start = bisect_right(self.ends, low) if low_excluded else bisect_left(self.ends, low)
+        stop = bisect_left(self.ends, high) if high_excluded else bisect_right(self.ends, high)
+        if start >= stop:
+            return False
+        if begin_range == UNBOUNDED:
+            return True
+        (begin_low, begin_low_excluded, begin_high, begin_high_excluded) = begin_range
+        min_begin = range_query(self.min_begins, start, stop, min)
+        max_begin = range_query(self.max_begins, start, stop, max)
+        if begin_high == float("inf"):
+            return in_range(max_begin, begin_range)
+        if begin_low == float("-inf"):
+            return in_range(min_begin, begin_range)
+        if in_range(min_begin, begin_range) or in_range(max_begin, begin_range):
+            return True
+        # All the begin time points are before the range, or all after it
+        if max_begin < begin_low or max_begin == begin_low and begin_low_excluded or \
+                min_begin > begin_high or min_begin == begin_high and begin_high_excluded:
+            return False
+        if self.sorted_begins is None:
+            self.sorted_begins = segment_tree(self.begins)
+        # Bottom-up over the nodes covering the range [start, stop)
+        (left, right) = (start + len(self.begins), stop + len(self.begins))
+        while left < right:
+            if left & 1:
+                if has_in_range(self.sorted_begins[left], begin_range):
+                    return True
+                left += 1
+            if right & 1:
+                right -= 1
+                if has_in_range(self.sorted_begins[right], begin_range):
+                    return True
+            (left, right) = (left >> 1, right >> 1)
+        return False
+
+# Levels of the values combined over ranges of 1, 2, 4... of them: level k holds the combination of the 2^k values from each index
+def sparse_table(values: list, combine) -> list[list]:
+    levels = [values]
+    width = 1
+    while 2 * width <= len(values):
+        previous = levels[-1]
+        levels.append([combine(previous[i], previous[i + width]) for i in range(len(values) - 2 * width + 1)])
+        width *= 2
+    return levels
+
+# Combination of the values in the non-empty range [start, stop), from the two overlapping ranges of a level that cover it
+def range_query(levels: list[list], start: int, stop: int, combine) -> Any:
+    level = (stop - start).bit_length() - 1
+    return combine(levels[level][start], levels[level][stop - (1 << level)])
+
+# Bottom-up segment tree of n values: node n + i holds value i, and node i the sorted values of nodes 2i and 2i + 1
+def segment_tree(values: list) -> list[list]:
+    tree: list[list] = [[] for _ in values] + [[value] for value in values]
+    for node in range(len(values) - 1, 0, -1):
+        tree[node] = sorted(tree[2 * node] + tree[2 * node + 1])
+    return tree
+
+# Whether one of the sorted time points is in the range
+def has_in_range(timepoints: list[int | float], time_range: TimeRange) -> bool:
+    (low, low_excluded, _, _) = time_range
+    index = bisect_right(timepoints, low) if low_excluded else bisect_left(timepoints, low)
+    return index < len(timepoints) and in_range(timepoints[index], time_range)
+
+
+# Returns the values as an integer column when they are numbers of the symbol table, as they are in a parsed trace,
+# and as an object column otherwise
+def value_column(values: list) -> "np.ndarray":
+    return np.array(values, dtype=np.int64 if all(type(value) is int for value in values) else object)
+
+# Occurrences of a single action type with at least a given number of input and output values,
+# stored column by column to evaluate a formula on all of them at once
+class ActionColumns:
+    def __init__(self, occurrences: list["ActionValue"], begins: "np.ndarray", ends: "np.ndarray",
+                 inputs: list["np.ndarray"], outputs: list["np.ndarray"]):
+        self.occurrences = occurrences
+        self.begins = begins
+        self.ends = ends
+        self.inputs = inputs
+        self.outputs = outputs
+        # Row of every occurrence, built when first selecting a subset of them
+        self.rows: dict[int, int] | None = None
+
+    @staticmethod
+    def build(occurrences: list["ActionValue"], num_inputs: int, num_outputs: int) -> "ActionColumns":
+        begins = np.array([occurrence.interval_value.begin for occurrence in occurrences], dtype=np.int64)
+        ends = np.array([INF_END if occurrence.interval_value.end == float("inf") else occurrence.interval_value.end
+            for occurrence in occurrences], dtype=np.int64)
+        inputs = [value_column([occurrence.input_values[i] for occurrence in occurrences]) for i in range(num_inputs)]
+        outputs = [value_column([occurrence.output_values[i] for occurrence in occurrences]) for i in range(num_outputs)]
+        return ActionColumns(occurrences, begins, ends, inputs, outputs)
+
+    def __len__(self) -> int:
+        return len(self.occurrences)
+
+    # Returns the columns of the given occurrences, ignoring the ones that are not stored
+    def select(self, occurrences: list["ActionValue"]) -> "ActionColumns":
+        if self.rows is None:
+            self.rows = {id(occurrence): row for (row, occurrence) in enumerate(self.occurrences)}
+        rows = np.array([row for row in map(self.rows.get, map(id, occurrences)) if row is not None], dtype=np.intp)
+        return ActionColumns([self.occurrences[row] for row in rows], self.begins[rows], self.ends[rows],
+            [column[rows] for column in self.inputs], [column[rows] for column in self.outputs])
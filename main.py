@@ -5,9 +5,15 @@ import sys
 import argparse
 import time
 
-from ast_nodes import Formula
-from parse_formula import parse_formula
-from parse_log import parse_log
+from ast_nodes import Formula, Environment, memoize, MEMO_SIZE
+from parse_formula import parse_formula, format_formula
+from parse_log import parse_log, read_log
+from compiler import compile_formula
+from optimizer import optimize
+from parallel import evaluate_parallel
+from batch import evaluate_all
+from profiler import Profiler
+from explain import explain, format_plan
 
 def handle_input(value: str) -> str:
     # If the value is a file path, return its content
@@ -25,12 +31,31 @@ def handle_input(value: str) -> str:
     # If the value is a string, return it directly
     return value
 
+# Reads the formulas of the .actl files in a directory, by file name
+def read_formulas(directory: str) -> dict[str, str]:
+    formulas = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".actl"):
+            formulas[name] = handle_input(os.path.join(directory, name))
+    if not formulas:
+        print(f"Error: No .actl file in {directory}.", file=sys.stderr)
+        sys.exit(1)
+    return formulas
+
 def main():
     parser = argparse.ArgumentParser(description="Provide a formula and a log to evaluate the formula on the log")
     parser.add_argument("-d", "--debug", action="store_true", help="Enable debug mode")
-    parser.add_argument("-f", "--formula", type=handle_input, help="Path to formula file or formula string")
-    parser.add_argument("-l", "--log", type=handle_input, help="Path to log file or log string")
+    parser.add_argument("-f", "--formula", type=handle_input, help="Path to formula file, formula string, or directory of .actl formula files to evaluate together")
+    parser.add_argument("-l", "--log", help="Path to log file or log string")
     parser.add_argument("-n", "--num-lines", type=int, default=None, help="Maximum number of lines to process (default: all)")
+    parser.add_argument("-e", "--engine", choices=["tree", "compiled"], default="tree", help="Evaluate the formula by walking its tree or by compiling it to Python (default: tree)")
+    parser.add_argument("-o", "--optimize", action="store_true", help="Reorder quantifiers and hoist invariant subformulas before evaluating the formula")
+    parser.add_argument("-p", "--print-formula", action="store_true", help="Print the formula that is evaluated, after optimization")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes evaluating the occurrences of the outermost quantifier, with the tree engine (default: 1)")
+    parser.add_argument("-m", "--memo-size", type=int, default=MEMO_SIZE, help=f"Maximum number of results cached by each memoized subformula, 0 to disable (default: {MEMO_SIZE})")
+    parser.add_argument("--profile", nargs="?", const="profile.folded", default=None, metavar="FILE", help="Print the calls, scanned occurrences and time of each node of the formula, and write the time of each stack of nodes to FILE in the collapsed format of flame graph tools (default: profile.folded)")
+    parser.add_argument("-c", "--columnar", action="store_true", help="Store the trace in columns, using less memory per event")
+    parser.add_argument("--explain", action="store_true", help="Print how each node of the formula will be evaluated and the estimated number of evaluations, then the actual counts after evaluating it")
     args = parser.parse_args()
 
     global DEBUG
@@ -44,17 +69,35 @@ def main():
     if not formula:
         print("Error: No input provided.", file=sys.stderr)
         sys.exit(1)
-    ast = parse_formula(formula)
+    if args.jobs < 1 or args.jobs > 1 and args.engine == "compiled":
+        print("Error: The number of jobs must be positive, and 1 with the compiled engine.", file=sys.stderr)
+        sys.exit(1)
+    # A directory holds several formulas, that are evaluated together on the trace
+    directory = os.path.isdir(formula)
+    if directory and (args.engine == "compiled" or args.jobs > 1):
+        print("Error: A directory of formulas is evaluated with the tree engine and 1 job.", file=sys.stderr)
+        sys.exit(1)
+    if (args.profile is not None or args.explain) and (directory or args.engine == "compiled" or args.jobs > 1):
+        print("Error: Profiling and explaining evaluate a single formula with the tree engine and 1 job.", file=sys.stderr)
+        sys.exit(1)
+    if directory:
+        asts = {name: parse_formula(text) for (name, text) in read_formulas(formula).items()}
+    else:
+        ast = parse_formula(formula)
+    if args.log == "":
+        print("Error: No input provided.", file=sys.stderr)
+        sys.exit(1)
+    # The lines of the log are parsed as they are read, up to the maximum number of lines
     if args.log is not None:
-        log = args.log
+        log = read_log(args.log)
     # If we do not have a log, read from stdin
     else:
         print("Enter log (Ctrl+D to end input):", file=sys.stderr)
-        log = sys.stdin.read().strip()
-    if not log:
-        print("Error: No input provided.", file=sys.stderr)
-        sys.exit(1)
-    trace = parse_log(args.log, args.num_lines)
+        log = sys.stdin
+    trace = parse_log(log, args.num_lines, columnar=args.columnar)
+    if directory:
+        evaluate_directory(asts, trace, args)
+        return
 
     # Print the AST and the trace that were parsed from the formula and the log respectively
     if DEBUG:
@@ -65,14 +108,76 @@ def main():
                 events_str += f"{event}"
             events_str += " }"
         print(f"{'-'*50}\nParsed formula:\n{ast}\n{'-'*50}\nParsed trace events:{events_str}")
+    # Rewrite the formula using the number of occurrences of each action in the trace
+    if args.optimize:
+        rewrites: list[str] = []
+        ast = optimize(ast, trace, rewrites)
+        if DEBUG:
+            print("-"*50, "Rewrites:", *(rewrites or ["None"]), sep="\n")
+    if args.print_formula:
+        print(f"{'-'*50}\nEvaluated formula:\n{format_formula(ast)}")
+    # Cache the results of the subformulas that are evaluated repeatedly with the same free variables
+    memos = memoize(ast, args.memo_size) if args.memo_size > 0 else []
     # Evaluate the formula on the trace
-    store = {}
-    interval_store = {}
-    result = ast.evaluate(trace, store, interval_store)
+    env = Environment(ast)
+    if args.explain:
+        plan = explain(ast, trace)
+        print(f"{'-'*50}\nPlan:\n{format_plan(plan)}")
+    if args.engine == "compiled":
+        compiled = compile_formula(ast)
+        if DEBUG:
+            print(f"{'-'*50}\nCompiled formula:\n{compiled.get_source()}")
+        result = compiled.evaluate(trace, env)
+    elif args.profile is not None or args.explain:
+        profiler = Profiler(ast)
+        result = ast.evaluate(trace, env)
+        profiler.detach()
+    else:
+        result = evaluate_parallel(ast, trace, env, args.jobs)
     result_str = "The formula does not hold on the log"
     if result:
         result_str = "the formula holds on the trace"
     print(f"{'-'*50}\nEvaluation:\n{result} - {result_str}\n{'-'*50}")
+    if args.explain:
+        print(f"Plan and actual counts:\n{format_plan(plan, profiler)}\n{'-'*50}")
+    if args.profile is not None:
+        print(f"Profile:\n{profiler.report()}\n{'-'*50}")
+        write_stacks(profiler, args.profile)
+    if DEBUG:
+        for memo in memos:
+            print(f"Memoized {memo}: {memo.hits} hits, {memo.misses} misses", file=sys.stderr)
+
+# Evaluates the formulas of a directory together on the trace, sharing the loops over the occurrences of their outermost
+# quantifiers and the results of their common subformulas, and prints the verdict of each one
+def evaluate_directory(asts: dict[str, Formula], trace, args: argparse.Namespace) -> None:
+    if args.optimize:
+        for (name, ast) in asts.items():
+            rewrites: list[str] = []
+            asts[name] = optimize(ast, trace, rewrites)
+            if DEBUG:
+                print("-"*50, f"Rewrites of {name}:", *(rewrites or ["None"]), sep="\n")
+    if args.print_formula:
+        for (name, ast) in asts.items():
+            print(f"{'-'*50}\nEvaluated formula {name}:\n{format_formula(ast)}")
+    memos = [memo for ast in asts.values() for memo in memoize(ast, args.memo_size)] if args.memo_size > 0 else []
+    results = evaluate_all(list(asts.values()), trace, args.memo_size)
+    print(f"{'-'*50}\nEvaluation:")
+    for (name, result) in zip(asts, results):
+        result_str = "the formula holds on the trace" if result else "The formula does not hold on the log"
+        print(f"{name}: {result} - {result_str}")
+    print("-"*50)
+    if DEBUG:
+        for memo in memos:
+            print(f"Memoized {memo}: {memo.hits} hits, {memo.misses} misses", file=sys.stderr)
+
+# Writes the collapsed stacks of the profile to the file
+def write_stacks(profiler: Profiler, path: str) -> None:
+    try:
+        with open(path, "w") as file:
+            file.write(profiler.collapsed_stacks())
+    except OSError as e:
+        print(f"Error writing file: {e}", file=sys.stderr)
+        sys.exit(1)
 
 if __name__ == "__main__":
     start = time.perf_counter()
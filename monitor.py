@@ -0,0 +1,408 @@
+DEBUG = False
+
+import sys
+import argparse
+import time
+from bisect import bisect_left
+from itertools import islice
+from typing import Iterable
+
+from ast_nodes import *
+from parse_formula import parse_formula, handle_input
+from parse_log import parse_log_line, LogParsingError
+
+# Position of a value in an occurrence: whether it is an output value, and its index among the inputs or outputs
+Position = tuple[bool, int]
+
+# Trace that grows while it is being monitored. The arity buckets and order indexes of its actions are updated as
+# events are inserted, instead of being rebuilt from scratch after each one, and the occurrences inserted or
+# completed since the last call to pop_changes are recorded.
+class OnlineTrace(Trace):
+    def __init__(self):
+        super().__init__()
+        self.changes: list[ActionValue] = []
+
+    def insert_begin_event(self, action_type: ActionType, id: str, input_values: list[str], time: datetime) -> ActionValue:
+        action_value = super().insert_begin_event(action_type, id, input_values, time)
+        for ((num_inputs, num_outputs), bucket) in self.arity_buckets.get(action_type, {}).items():
+            if len(input_values) >= num_inputs and num_outputs == 0:
+                bucket.append(action_value)
+        order_index = self.order_indexes.get(action_type)
+        if order_index is not None:
+            # Its begin time point is the latest one, and ongoing actions end at infinity
+            order_index.by_begin.append(action_value)
+            order_index.begins.append(action_value.interval_value.begin)
+            order_index.by_end.append(action_value)
+            order_index.ends.append(action_value.interval_value.end)
+        self.changes.append(action_value)
+        return action_value
+
+    def insert_end_event(self, action_value: ActionValue, id: str, output_values: list[str], time: datetime) -> bool:
+        if not super().insert_end_event(action_value, id, output_values, time):
+            return False
+        action_type = action_value.get_action_type()
+        begin = action_value.interval_value.begin
+        for ((num_inputs, num_outputs), bucket) in self.arity_buckets.get(action_type, {}).items():
+            if num_outputs > 0 and len(action_value.input_values) >= num_inputs and len(output_values) >= num_outputs:
+                # Buckets keep the occurrences in begin order
+                bucket.insert(bisect_left(bucket, begin + 1, key=lambda occurrence: occurrence.interval_value.begin), action_value)
+        order_index = self.order_indexes.get(action_type)
+        if order_index is not None:
+            # Its end time point is the latest finite one: it moves from the ongoing actions to just before them
+            ongoing = bisect_left(order_index.ends, float("inf"))
+            # The ongoing actions are in begin order, as they were appended when they began
+            i = bisect_left(order_index.by_end, begin, lo=ongoing, key=lambda occurrence: occurrence.interval_value.begin)
+            while order_index.by_end[i] is not action_value:
+                i += 1
+            del order_index.by_end[i]
+            del order_index.ends[i]
+            order_index.by_end.insert(ongoing, action_value)
+            order_index.ends.insert(ongoing, action_value.interval_value.end)
+        self.changes.append(action_value)
+        return True
+
+    # The interval tree of an action type would be built again after each of its events: the order index, which is
+    # kept up to date, answers the same queries instead
+    def get_interval_tree(self, action_type: ActionType) -> OrderIndex:
+        return self.get_order_index(action_type)
+
+    # Keeps the indexes that are updated incrementally
+    def invalidate_indexes(self, action_type: ActionType) -> None:
+        (arity_buckets, order_index) = (self.arity_buckets.get(action_type), self.order_indexes.get(action_type))
+        super().invalidate_indexes(action_type)
+        if arity_buckets is not None:
+            self.arity_buckets[action_type] = arity_buckets
+        if order_index is not None:
+            self.order_indexes[action_type] = order_index
+
+    # Returns the occurrences inserted or completed since the last call
+    def pop_changes(self) -> list[ActionValue]:
+        (changes, self.changes) = (self.changes, [])
+        return changes
+
+# Monitors a formula on a log given line by line, updating its verdict after each event: the verdict is always the
+# result of evaluating the formula on the trace read so far. The conjuncts of the formula that are action quantifiers
+# are evaluated incrementally (see IncrementalQuantifier), the other ones are evaluated again after each event.
+class Monitor:
+    def __init__(self, formula: Formula, ignore_non_operations: bool = False):
+        self.formula = resolve_slots(formula)
+        self.trace = OnlineTrace()
+        self.ongoing_actions: dict[str, ActionValue] = {}
+        self.ignore_non_operations = ignore_non_operations
+        self.env = Environment()
+        self.parts = [IncrementalQuantifier(part) if isinstance(part, ActionQuantifier) else part for part in conjuncts(formula)]
+        self.update([])
+
+    # Reads a line of the log and returns the verdict on the trace read so far.
+    # Raises a LogParsingError if the line does not fit the trace.
+    def process_line(self, line: str) -> bool:
+        changes = self.read_line(line)
+        if changes:
+            self.update(changes)
+        return self.verdict
+
+    # Reads a line of the log into the trace, without updating the verdict, and returns the occurrences it inserted or completed
+    def read_line(self, line: str) -> list[ActionValue]:
+        parse_log_line(line, self.trace, self.ongoing_actions, self.ignore_non_operations)
+        return self.trace.pop_changes()
+
+    # Updates the verdict after the given occurrences were inserted or completed
+    def update(self, changes: list[ActionValue]) -> None:
+        self.verdict = True
+        for part in self.parts:
+            if isinstance(part, IncrementalQuantifier):
+                part.update(changes, self.trace, self.env)
+                result = part.verdict()
+            else:
+                result = part.evaluate(self.trace, self.env)
+            self.verdict = self.verdict and result
+
+# Evaluates a formula on the prefixes of a log with the given numbers of lines (as max_lines in parse_log), in a single
+# pass over the log: the lines between two cut points are read, then the verdict is updated once for all of them.
+# Returns for each cut point the verdict, and the time spent reading the lines and updating the verdict up to it.
+# As when parsing a prefix on its own, the actions that did not end by a cut point are ongoing there.
+def evaluate_prefixes(formula: Formula, log: str | Iterable[str], cut_points: list[int], ignore_non_operations: bool = False) -> list[tuple[bool, float, float]]:
+    monitor = Monitor(formula, ignore_non_operations)
+    results: dict[int, tuple[bool, float, float]] = {}
+    (parse_time, eval_time) = (0.0, 0.0)
+    lines = iter(log.splitlines() if isinstance(log, str) else log)
+    line_number = 0
+    for cut_point in sorted(set(cut_points)):
+        start = time.perf_counter()
+        changes = []
+        for line in islice(lines, max(cut_point - line_number, 0)):
+            changes += monitor.read_line(line)
+        line_number = max(cut_point, line_number)
+        parse_time += time.perf_counter() - start
+        start = time.perf_counter()
+        if changes:
+            monitor.update(changes)
+        eval_time += time.perf_counter() - start
+        DEBUG and print(f"Verdict after {cut_point} lines: {monitor.verdict}")
+        results[cut_point] = (monitor.verdict, parse_time, eval_time)
+    return [results[cut_point] for cut_point in cut_points]
+
+# Keeps the result of the body of an action quantifier for each occurrence of its action, updating the results that
+# an inserted or completed occurrence may change. An occurrence can only change the result for the occurrences of the
+# quantifier whose values agree with it on the variables that they share with the quantifier over it in the body,
+# which are looked up by value. When the quantifier in the body shares no variable, only the results for the occurrences
+# whose interval the body requires to overlap the one of the changed occurrence are updated (see required_overlap),
+# which are looked up in the order index of the trace; if the body requires none, every result is updated.
+# Only the decisive results are stored: the occurrences for which the body is false (universal) or true (existential).
+#
+# When the body is directly a quantifier of the same kind, a decisive pair of occurrences of both quantifiers is stored
+# instead for each occurrence, so that a change to an occurrence of the inner quantifier only updates its pairs with
+# the occurrences that have none, or whose decisive pair it is.
+class IncrementalQuantifier:
+    def __init__(self, quantifier: ActionQuantifier):
+        self.quantifier = quantifier
+        self.short_circuit_on = isinstance(quantifier, ExistsAction)
+        self.inner = quantifier.expression if type(quantifier.expression) is type(quantifier) else None
+        self.body = quantifier.expression if self.inner is None else self.inner.expression
+        # Matching occurrences of the quantifier by id, and by their values at the positions looked up
+        self.occurrences: dict[int, ActionValue] = {}
+        self.indexes: dict[tuple[Position, ...], dict[tuple, list[ActionValue]]] = {}
+        # Occurrences with a decisive result, and for pairs, an inner occurrence with which each one is decisive
+        self.decisive: set[int] = set()
+        self.witnesses: dict[int, ActionValue] = {}
+        # Quantifiers in the body, by action type, with the positions of the variables that they share with the quantifier,
+        # the kinds of overlap that their intervals must have with the one of the quantifier, and whether losing some of
+        # their occurrences can only make the result of the body not decisive (see losing_keeps_undecided)
+        label = quantifier.action.interval.label
+        self.links: dict[ActionType, list[tuple[ActionQuantifier, list[tuple[Position, Position]], set[str] | None, bool]]] = {}
+        for nested in quantifiers_in(self.body):
+            self.links.setdefault(nested.action.get_action_type(), []).append((nested, shared_positions(nested.action, quantifier.action),
+                required_overlap(nested, label), losing_keeps_undecided(quantifier, self.body, nested)))
+        self.inner_link = None if self.inner is None else shared_positions(self.inner.action, quantifier.action)
+        self.inner_overlap = None if self.inner is None else required_overlap(self.inner, label)
+
+    def verdict(self) -> bool:
+        return self.short_circuit_on if self.decisive else not self.short_circuit_on
+
+    # Updates the results that the inserted or completed occurrences may change, once for all of them
+    def update(self, changes: list[ActionValue], trace: Trace, env: Environment) -> None:
+        updated: dict[int, ActionValue] = {}
+        pairs: dict[tuple[int, int], tuple[ActionValue, ActionValue]] = {}
+        mark = env.mark()
+        for occurrence in changes:
+            action_type = occurrence.get_action_type()
+            if action_type == self.quantifier.action.get_action_type() and self.quantifier.bind_occurrence(occurrence, env):
+                env.undo(mark)
+                self.add_occurrence(occurrence)
+                updated[id(occurrence)] = occurrence
+            for (nested, link, overlap, monotone) in self.links.get(action_type, []):
+                for affected in self.linked_occurrences(occurrence, nested, link, overlap, monotone, trace):
+                    updated[id(affected)] = affected
+            # The pairs of the other occurrences with the changed one, if the body does not depend on its action
+            if self.inner is not None and action_type == self.inner.action.get_action_type() and action_type not in self.links:
+                for affected in self.linked_occurrences(occurrence, self.inner, self.inner_link, self.inner_overlap, True, trace):
+                    pairs[(id(affected), id(occurrence))] = (affected, occurrence)
+        for affected in updated.values():
+            self.evaluate(affected, trace, env)
+        for ((affected_id, _), (affected, occurrence)) in pairs.items():
+            if affected_id not in updated:
+                self.evaluate_pair(affected, occurrence, trace, env)
+
+    def add_occurrence(self, occurrence: ActionValue) -> None:
+        if id(occurrence) in self.occurrences:
+            return
+        self.occurrences[id(occurrence)] = occurrence
+        for (positions, index) in self.indexes.items():
+            index.setdefault(tuple(value_at(occurrence, position) for position in positions), []).append(occurrence)
+
+    # Returns the occurrences of the quantifier whose result may depend on an occurrence of the nested quantifier
+    def linked_occurrences(self, occurrence: ActionValue, nested: ActionQuantifier, link: list[tuple[Position, Position]],
+                           overlap: set[str] | None, monotone: bool, trace: Trace) -> list[ActionValue]:
+        action = nested.action
+        if len(occurrence.input_values) < len(action.inputs) or len(occurrence.output_values) < len(action.outputs):
+            return []
+        if not link:
+            if overlap is None:
+                return list(self.occurrences.values())
+            return self.overlapping_occurrences(occurrence, overlap, monotone, trace)
+        positions = tuple(position for (_, position) in link)
+        if positions not in self.indexes:
+            index: dict[tuple, list[ActionValue]] = {}
+            for other in self.occurrences.values():
+                index.setdefault(tuple(value_at(other, position) for position in positions), []).append(other)
+            self.indexes[positions] = index
+        return self.indexes[positions].get(tuple(value_at(occurrence, position) for (position, _) in link), [])
+
+    # Returns the occurrences of the quantifier whose interval has the given kinds of overlap with the one of the changed
+    # occurrence. The changed occurrence may have been ongoing until now, ending at infinity: the occurrences that only
+    # overlapped it then lose it from the occurrences of the nested quantifier, which, if monotone, only changes their
+    # result if it was decisive.
+    def overlapping_occurrences(self, occurrence: ActionValue, overlap: set[str], monotone: bool, trace: Trace) -> list[ActionValue]:
+        (begin, end) = (occurrence.interval_value.begin, occurrence.interval_value.end)
+        index = trace.get_interval_tree(self.quantifier.action.get_action_type())
+        affected = overlapping(index, overlap, begin, end)
+        if end != float("inf"):
+            affected += [other for other in overlapping(index, overlap, begin, float("inf")) if not monotone or id(other) in self.decisive]
+        return [other for other in affected if id(other) in self.occurrences]
+
+    # Evaluates the body for an occurrence of the quantifier, or its pairs until a decisive one
+    def evaluate(self, occurrence: ActionValue, trace: Trace, env: Environment) -> None:
+        quantifier = self.quantifier
+        mark = env.mark()
+        self.bind(quantifier, occurrence, env)
+        if self.inner is None:
+            decisive = self.body.evaluate(trace, env) == self.short_circuit_on
+        else:
+            # The previous decisive pair is tried first
+            witness = self.witnesses.pop(id(occurrence), None)
+            candidates = self.inner.find_candidates(trace, env)
+            if witness is not None:
+                candidates = [witness] + candidates
+            inner_mark = env.mark()
+            for inner_occurrence in candidates:
+                if not self.bind(self.inner, inner_occurrence, env):
+                    continue
+                decisive = self.body.evaluate(trace, env) == self.short_circuit_on
+                env.undo(inner_mark)
+                if decisive:
+                    self.witnesses[id(occurrence)] = inner_occurrence
+                    break
+            decisive = id(occurrence) in self.witnesses
+        env.undo(mark)
+        DEBUG and print(f"Updated {quantifier.action} for {occurrence}: {'decisive' if decisive else 'not decisive'}")
+        if decisive:
+            self.decisive.add(id(occurrence))
+        else:
+            self.decisive.discard(id(occurrence))
+
+    # Evaluates the body for a pair of occurrences of the quantifier and of the inner quantifier,
+    # unless another pair is known to be decisive for the occurrence of the quantifier
+    def evaluate_pair(self, occurrence: ActionValue, inner_occurrence: ActionValue, trace: Trace, env: Environment) -> None:
+        witness = self.witnesses.get(id(occurrence))
+        if witness is not None and witness is not inner_occurrence:
+            return
+        mark = env.mark()
+        self.bind(self.quantifier, occurrence, env)
+        decisive = self.bind(self.inner, inner_occurrence, env) and self.body.evaluate(trace, env) == self.short_circuit_on
+        env.undo(mark)
+        if decisive:
+            self.witnesses[id(occurrence)] = inner_occurrence
+            self.decisive.add(id(occurrence))
+        elif witness is not None:
+            # The pair is no longer decisive: look for another one
+            self.evaluate(occurrence, trace, env)
+
+    @staticmethod
+    def bind(quantifier: ActionQuantifier, occurrence: ActionValue, env: Environment) -> bool:
+        if not quantifier.bind_occurrence(occurrence, env):
+            return False
+        env.bind_interval(quantifier.action.interval.slot, occurrence.interval_value)
+        return True
+
+# Returns the action quantifiers in a formula, at any depth
+def quantifiers_in(formula: Formula) -> list[ActionQuantifier]:
+    quantifiers = []
+    stack = [formula]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ActionQuantifier):
+            quantifiers.append(node)
+        stack.extend(node.get_children())
+    return quantifiers
+
+# Returns the kinds of overlap ("overlapping", "within", "containing") that the interval of an occurrence of the quantifier
+# must have with the interval of the given label for the occurrence to change the result of the quantifier, or None if
+# the body does not require any: an occurrence that does not satisfy one of its guards cannot be a witness or counterexample.
+def required_overlap(quantifier: ActionQuantifier, label: str) -> set[str] | None:
+    overlap = set()
+    for guard in quantifier.guards:
+        guard_overlap = guard.get_overlap(quantifier.action.interval.label)
+        if guard_overlap is not None and guard_overlap[0] == label:
+            overlap |= guard_overlap[1]
+    return overlap or None
+
+# Returns whether losing occurrences of a nested quantifier can only change the result of the body of a quantifier from
+# decisive to not decisive: a universal (existential) quantifier loses counterexamples (witnesses), so its result can
+# only become true (false), and the body must then become true for a universal quantifier (false for an existential one).
+# This holds when the nested quantifier is of the same kind under an even number of negations, or of the other kind
+# under an odd one, through the operators whose result only grows with the one of their operands, or negations.
+def losing_keeps_undecided(quantifier: ActionQuantifier, body: Formula, nested: ActionQuantifier) -> bool:
+    stack: list[tuple[Formula, bool | None]] = [(body, True)]
+    while stack:
+        (node, positive) = stack.pop()
+        if node is nested:
+            return positive is not None and (type(nested) is type(quantifier)) == positive
+        if isinstance(node, Not):
+            stack.append((node.expression, None if positive is None else not positive))
+        elif isinstance(node, Implies):
+            stack += [(node.left, None if positive is None else not positive), (node.right, positive)]
+        elif isinstance(node, (And, Or, Memo, Quantifier, ActionQuantifier)):
+            stack += [(child, positive) for child in node.get_children()]
+        else:
+            stack += [(child, None) for child in node.get_children()]
+    return False
+
+# Returns the occurrences of an order index whose interval has the given kinds of overlap with [begin, end], where
+# "containing" means that [begin, end] contains them and "within" that it lies within them
+def overlapping(index: OrderIndex, overlap: set[str], begin: int | float, end: int | float) -> list[ActionValue]:
+    if "containing" in overlap:
+        return [other for other in index.within(begin, end)
+            if other.interval_value.begin >= begin and other.interval_value.end <= end]
+    if "within" in overlap:
+        return [other for other in index.containing(begin, end)
+            if other.interval_value.begin <= begin and other.interval_value.end >= end]
+    return [other for other in index.overlapping(begin, end)
+        if other.interval_value.begin <= end and other.interval_value.end >= begin]
+
+# Returns the positions of the variables of an action that are also variables of another action, with their positions there
+def shared_positions(action: Action, other: Action) -> list[tuple[Position, Position]]:
+    other_positions = {}
+    for (output, variables) in ((False, other.inputs), (True, other.outputs)):
+        for (i, variable) in enumerate(variables):
+            if not isinstance(variable, Wildcard):
+                other_positions.setdefault(variable.label, (output, i))
+    link = []
+    for (output, variables) in ((False, action.inputs), (True, action.outputs)):
+        for (i, variable) in enumerate(variables):
+            if not isinstance(variable, Wildcard) and variable.label in other_positions:
+                link.append(((output, i), other_positions[variable.label]))
+    return link
+
+def value_at(occurrence: ActionValue, position: Position) -> str | None:
+    (output, i) = position
+    values = occurrence.output_values if output else occurrence.input_values
+    return values[i] if i < len(values) else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor a formula on a log as its lines arrive, printing each change of the verdict")
+    parser.add_argument("-d", "--debug", action="store_true", help="Enable debug output")
+    parser.add_argument("-f", "--formula", type=handle_input, help="Path to formula file or formula string")
+    parser.add_argument("-l", "--log", help="Path to log file (default: standard input)")
+    parser.add_argument("-n", "--num-lines", type=int, default=None, help="Maximum number of lines to process (default: all)")
+    parser.add_argument("-i", "--ignore-non-operations", action="store_true", help="Ignore non-operation events")
+    args = parser.parse_args()
+
+    global DEBUG
+    DEBUG = args.debug
+    if args.formula is None:
+        print("Error: A formula must be provided.", file=sys.stderr)
+        sys.exit(1)
+    monitor = Monitor(parse_formula(args.formula), args.ignore_non_operations)
+    try:
+        log = sys.stdin if args.log is None else open(args.log, "r")
+    except OSError as e:
+        print(f"Error reading file: {e}", file=sys.stderr)
+        sys.exit(1)
+    verdict = monitor.verdict
+    print(f"Line 0: {verdict}")
+    with log:
+        for (line_number, line) in enumerate(log, 1):
+            if args.num_lines is not None and line_number > args.num_lines:
+                break
+            try:
+                monitor.process_line(line)
+            except LogParsingError as e:
+                print(e.display(line_number), file=sys.stderr)
+                sys.exit(1)
+            if monitor.verdict != verdict:
+                verdict = monitor.verdict
+                print(f"Line {line_number}: {verdict}", flush=True)
+    print(f"{'-'*50}\nVerdict: {verdict}\n{'-'*50}")
+
+if __name__ == "__main__":
+    main()
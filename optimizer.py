@@ -0,0 +1,136 @@
+DEBUG = False
+
+import sys
+import argparse
+from copy import deepcopy
+
+from ast_nodes import *
+from parse_formula import parse_formula, format_formula, handle_input
+from parse_log import parse_log, read_log
+
+# Rewrites a formula into an equivalent one that is cheaper to evaluate on the trace:
+# adjacent independent quantifiers are reordered so that the ones over fewer occurrences are outermost,
+# then the premises and conjuncts of a quantifier that do not depend on it are moved out of it,
+# and pairs of quantifiers checking that values agree are evaluated per group (see GroupAgreement).
+# The given formula is left unchanged. A description of each rewrite that applied is appended to rewrites.
+def optimize(formula: Formula, trace: Trace, rewrites: list[str] | None = None) -> Formula:
+    rewrites = [] if rewrites is None else rewrites
+    formula = deepcopy(formula)
+    before = repr(formula)
+    formula = reorder_quantifiers(formula, trace)
+    if repr(formula) != before:
+        rewrites.append("Reordered quantifiers by number of occurrences")
+    before = repr(formula)
+    formula = hoist_invariants(formula, set(), set())
+    if repr(formula) != before:
+        rewrites.append("Hoisted invariant premises and conjuncts")
+    formula = group_agreements(formula, rewrites)
+    return resolve_slots(formula)
+
+# Number of occurrences that a quantifier iterates over when none of its variables is bound
+def estimate_cardinality(quantifier: ActionQuantifier, trace: Trace) -> int:
+    action = quantifier.action
+    return len(trace.find_occurrences_by_arity(action.get_action_type(), len(action.inputs), len(action.outputs)))
+
+# Sorts every chain of directly nested quantifiers of the same kind by the number of their occurrences.
+# Such quantifiers commute: the occurrences of both actions are matched on their shared variables whatever their order.
+def reorder_quantifiers(formula: Formula, trace: Trace) -> Formula:
+    if isinstance(formula, ActionQuantifier):
+        chain = [formula]
+        while type(chain[-1].expression) is type(formula):
+            chain.append(chain[-1].expression)
+        body = reorder_quantifiers(chain[-1].expression, trace)
+        # An interval bound twice would be shadowed differently once reordered
+        if len({quantifier.action.interval.label for quantifier in chain}) == len(chain):
+            chain = sorted(chain, key=lambda quantifier: estimate_cardinality(quantifier, trace))
+        for quantifier in reversed(chain):
+            body = type(quantifier)(quantifier.action, body)
+        return body
+    children = formula.get_children()
+    if children:
+        formula.set_children([reorder_quantifiers(child, trace) for child in children])
+    return formula
+
+# Moves the premises of a universal quantifier, and the conjuncts of an existential one, that do not depend on the
+# variables and intervals it binds, to the quantifier around it (which binds the given variables and intervals).
+# With P independent of a: ∀a.(P ∧ Q → R) ≡ P → ∀a.(Q → R) and ∃a.(P ∧ Q) ≡ P ∧ ∃a.Q
+def hoist_invariants(formula: Formula, bound_variables: set[str], bound_intervals: set[str]) -> Formula:
+    if isinstance(formula, ActionQuantifier):
+        action = formula.action
+        new_variables = {variable.label for variable in action.inputs + action.outputs
+            if not isinstance(variable, Wildcard) and variable.label not in bound_variables}
+        new_interval = action.interval.label
+        body = hoist_invariants(formula.expression, bound_variables | new_variables, bound_intervals | {new_interval})
+
+        def is_invariant(expression: Formula) -> bool:
+            (variables, intervals) = expression.get_free_variables()
+            return not (variables & new_variables) and new_interval not in intervals
+
+        if isinstance(formula, ForAllAction) and isinstance(body, Implies):
+            # Nested implications are merged into one premise: (P → (Q → R)) ≡ (P ∧ Q → R)
+            (premises, conclusion) = (conjuncts(body.left), body.right)
+            while isinstance(conclusion, Implies):
+                premises += conjuncts(conclusion.left)
+                conclusion = conclusion.right
+            invariants = [premise for premise in premises if is_invariant(premise)]
+            premises = [premise for premise in premises if not is_invariant(premise)]
+            quantifier = ForAllAction(action, Implies(conjunction(premises), conclusion) if premises else conclusion)
+            return Implies(conjunction(invariants), quantifier) if invariants else quantifier
+        if isinstance(formula, ExistsAction):
+            expressions = conjuncts(body)
+            invariants = [expression for expression in expressions if is_invariant(expression)]
+            expressions = [expression for expression in expressions if not is_invariant(expression)]
+            # The quantifier is kept whole if nothing would be left in it
+            if invariants and expressions:
+                return conjunction(invariants + [ExistsAction(action, conjunction(expressions))])
+        return type(formula)(action, body)
+    if isinstance(formula, Quantifier):
+        bound_variables = bound_variables | {variable.label for variable in formula.variables}
+    children = formula.get_children()
+    if children:
+        formula.set_children([hoist_invariants(child, bound_variables, bound_intervals) for child in children])
+    return formula
+
+# Replaces every pair of quantifiers that checks that the values of two occurrences agree,
+# with premises that each depend on a single occurrence, by its evaluation per group
+def group_agreements(formula: Formula, rewrites: list[str]) -> Formula:
+    children = formula.get_children()
+    if children:
+        formula.set_children([group_agreements(child, rewrites) for child in children])
+    agreement = GroupAgreement.plan(formula)
+    if agreement is None:
+        return formula
+    (action, inner_action) = (agreement.quantifier.action, agreement.inner.action)
+    keys = ", ".join(variable.label for variable in agreement.key_variables) or "nothing"
+    rewrites.append(f"Grouped {action.get_action_type().name.lower()} {action.interval.label} and {inner_action.interval.label} "
+        f"by {keys} to check ({agreement.value} = {agreement.inner_value}) per group")
+    return agreement
+
+def conjunction(expressions: list[Formula]) -> Formula:
+    return expressions[0] if len(expressions) == 1 else And(*expressions)
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the formula rewritten for evaluation on a log")
+    parser.add_argument("-d", "--debug", action="store_true", help="Enable debug output")
+    parser.add_argument("-f", "--formula", type=handle_input, help="Path to formula file or formula string")
+    parser.add_argument("-l", "--log", help="Path to log file or log string")
+    parser.add_argument("-n", "--num-lines", type=int, default=None, help="Maximum number of lines to process (default: all)")
+    args = parser.parse_args()
+
+    global DEBUG
+    DEBUG = args.debug
+    if args.formula is None or args.log is None:
+        print("Error: Both a formula and a log must be provided.", file=sys.stderr)
+        sys.exit(1)
+    ast = parse_formula(args.formula)
+    trace = parse_log(read_log(args.log), args.num_lines)
+    if DEBUG:
+        print("-"*50, "Parsed formula:", format_formula(ast), sep="\n")
+
+    # Print the formula that would be evaluated on the log, and how it was obtained
+    rewrites: list[str] = []
+    optimized = optimize(ast, trace, rewrites)
+    print("-"*50, "Optimized formula:", format_formula(optimized), "-"*50, "Rewrites:", *(rewrites or ["None"]), "-"*50, sep="\n")
+
+if __name__ == "__main__":
+    main()
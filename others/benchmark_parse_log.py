@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import parse_log
+from parse_log import parse_log as parse, parse_time, parse_event_type, DATES
+from ast_nodes import ActionType
+
+# Parsing of the timestamp and event type fields before the fast path: strptime, and the prefixes and enum of each line
+def reference_time(date: str) -> datetime:
+    return datetime.strptime(date, "%Y-%m-%d %H:%M:%S.%f")
+
+def reference_event_type(full_event_action_type: str) -> tuple[ActionType, bool] | None:
+    if "Remove" in full_event_action_type:
+        return None
+    event_action_type = full_event_action_type.removeprefix("Reply").removeprefix("End")
+    if not ActionType.has_value(event_action_type.upper()):
+        return None
+    return ActionType(event_action_type.upper()), full_event_action_type != event_action_type
+
+def get_logs(paths: list[str]) -> list[str]:
+    logs = []
+    for path in paths:
+        if os.path.isdir(path):
+            logs += [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".log")]
+        else:
+            logs.append(path)
+    return logs
+
+# Returns the number of lines parsed per second, the best of the given number of runs, with the fields parsed by the
+# given functions, from empty caches
+def measure(contents: list[str], parse_time_function, parse_event_type_function, repeat: int) -> float:
+    (parse_log.parse_time, parse_log.parse_event_type) = (parse_time_function, parse_event_type_function)
+    lines = sum(content.count("\n") + 1 for content in contents)
+    best = float("inf")
+    try:
+        for _ in range(repeat):
+            parse_time.cache_clear()
+            DATES.clear()
+            start = time.perf_counter()
+            for content in contents:
+                parse(content, None)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        (parse_log.parse_time, parse_log.parse_event_type) = (parse_time, parse_event_type)
+    return lines / best
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the number of log lines parsed per second before and after the fast tokenizer")
+    parser.add_argument("logs", nargs="+", help="Log files, or directories of .log files")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of runs, the fastest of which is reported (default: 3)")
+    args = parser.parse_args()
+
+    contents = []
+    for log in get_logs(args.logs):
+        try:
+            with open(log, "r") as file:
+                contents.append(file.read())
+        except OSError as e:
+            print(f"Error reading file: {e}", file=sys.stderr)
+            sys.exit(1)
+    if not contents:
+        print("Error: No log to parse.", file=sys.stderr)
+        sys.exit(1)
+
+    before = measure(contents, reference_time, reference_event_type, args.repeat)
+    after = measure(contents, parse_time, parse_event_type, args.repeat)
+    print(f"{len(contents)} logs, {sum(content.count(chr(10)) + 1 for content in contents)} lines")
+    print(f"Before: {before:,.0f} lines/s")
+    print(f"After: {after:,.0f} lines/s ({after / before:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import sys
+import tracemalloc
+
+from parse_log import parse_log
+from benchmark_parse_log import get_logs
+
+# Returns the number of bytes allocated by the trace parsed from the log, and the number of its events
+def measure(content: str, columnar: bool) -> tuple[int, int]:
+    # Fill the caches of the parser first, so that they are not counted
+    parse_log(content, None, columnar=columnar)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        trace = parse_log(content, None, columnar=columnar)
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return (allocated, trace.get_length())
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory allocated per event by a trace and by a columnar trace")
+    parser.add_argument("logs", nargs="+", help="Log files, or directories of .log files")
+    args = parser.parse_args()
+
+    (trace_bytes, columnar_bytes, events) = (0, 0, 0)
+    for log in get_logs(args.logs):
+        try:
+            with open(log, "r") as file:
+                content = file.read()
+        except OSError as e:
+            print(f"Error reading file: {e}", file=sys.stderr)
+            sys.exit(1)
+        (allocated, length) = measure(content, False)
+        trace_bytes += allocated
+        events += length
+        columnar_bytes += measure(content, True)[0]
+    if events == 0:
+        print("Error: No event to store.", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{events} events")
+    print(f"Trace: {trace_bytes / events:,.0f} bytes/event")
+    print(f"Columnar trace: {columnar_bytes / events:,.0f} bytes/event ({trace_bytes / columnar_bytes:.1f}x less)")
+
+if __name__ == "__main__":
+    main()
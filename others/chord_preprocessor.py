@@ -1,8 +1,8 @@
 import sys
 import argparse
 import os
-from trace_parser import parse_trace_file 
-from ast_nodes import Trace, ActionType, Event, BeginEvent, EndEvent
+from parse_log import parse_log, read_log
+from ast_nodes import Trace, ActionType, Event, BeginEvent, EndEvent, SYMBOLS
 from datetime import datetime, timedelta
 from pprint import pprint
 
@@ -15,7 +15,7 @@ def process_readonly(event : Event, store_operations : dict[str, Event], readonl
     if isinstance(event, BeginEvent):
         store_operations[event.get_id()] = event
         if len(store_operations) == 1:
-            readonly_intervals.append(EndEvent(ActionType.READONLY, [], f"ReadOnly{len(readonly_intervals) // 2}",
+            readonly_intervals.append(EndEvent(ActionType.READONLY, f"ReadOnly{len(readonly_intervals) // 2}", [],
                                        time = event.get_time() - timedelta(milliseconds=1)))
     else:
         assert isinstance(event, EndEvent), f"Expected EndEvent, got {event} of type {type(event)}"
@@ -23,7 +23,7 @@ def process_readonly(event : Event, store_operations : dict[str, Event], readonl
 
         del store_operations[event.get_id()]
         if len(store_operations) == 0:
-            readonly_intervals.append(BeginEvent(ActionType.READONLY, [], f"ReadOnly{len(readonly_intervals) // 2}",
+            readonly_intervals.append(BeginEvent(ActionType.READONLY, f"ReadOnly{len(readonly_intervals) // 2}", [],
                             time = event.get_time() + timedelta(milliseconds=1)))
 
 
@@ -37,7 +37,7 @@ def process_membership(event : Event , current_members: dict[str, BeginEvent], m
     if isinstance(event, BeginEvent):
         membership_operations[event.get_id()] = event
         if len(membership_operations) == 1:
-            stable_intervals.append(EndEvent(ActionType.STABLE, [], f"Stable{len(stable_intervals) // 2}",
+            stable_intervals.append(EndEvent(ActionType.STABLE, f"Stable{len(stable_intervals) // 2}", [],
                                        time = event.get_time() - timedelta(milliseconds=1)))
 
     else:
@@ -48,10 +48,11 @@ def process_membership(event : Event , current_members: dict[str, BeginEvent], m
        
         assert len(start_event.values) > 0, f"Membership operation {start_event} has no arguments, expected node as argument"
 
-        node = start_event.values[0]
+        # Node names are compared and ordered, so they are decoded from the symbol table
+        node = SYMBOLS.name(start_event.values[0])
 
         if len(membership_operations) == 0:
-            stable_intervals.append(BeginEvent(ActionType.STABLE, [], f"Stable{len(stable_intervals) // 2}",
+            stable_intervals.append(BeginEvent(ActionType.STABLE, f"Stable{len(stable_intervals) // 2}", [],
                                        time = event.get_time() + timedelta(milliseconds=1)))
 
         if event.action_type == ActionType.JOIN:
@@ -59,8 +60,7 @@ def process_membership(event : Event , current_members: dict[str, BeginEvent], m
             assert node not in current_members, f"Node \"{event.values[0]}\" cannot join because it is already member: {event}, {current_members: }"
 
 
-            begin_event = BeginEvent(ActionType.MEMBER, [node],
-                       f"Membership{len(membership_intervals) // 2}-{node}",
+            begin_event = BeginEvent(ActionType.MEMBER, f"Membership{len(membership_intervals) // 2}-{node}", [SYMBOLS.intern(node)],
                        time = event.get_time() + timedelta(milliseconds=1))
 
             membership_intervals.append(begin_event)
@@ -76,8 +76,7 @@ def process_membership(event : Event , current_members: dict[str, BeginEvent], m
 
             begin_interval = current_members.pop(node)
 
-            membership_intervals.append(EndEvent(ActionType.MEMBER, [],
-                                begin_interval.get_id(),
+            membership_intervals.append(EndEvent(ActionType.MEMBER, begin_interval.get_id(), [],
                                 time = event.get_time() + timedelta(milliseconds=1)))
             return node
 
@@ -118,13 +117,11 @@ def update_ideal_intervals(time : datetime, successor_pointers: dict[str, str],
     currently_ideal = is_ideal(successor_pointers, ordered_members)
 
     if currently_ideal and (len(ideal_intervals) == 0 or type(ideal_intervals[-1]) is EndEvent):
-        ideal_intervals.append(BeginEvent(ActionType.IDEAL, [],
-                                f"Ideal{len(ideal_intervals) // 2}",
+        ideal_intervals.append(BeginEvent(ActionType.IDEAL, f"Ideal{len(ideal_intervals) // 2}", [],
                                 time = time))
 
     elif not currently_ideal and len(ideal_intervals) > 0 and type(ideal_intervals[-1]) is BeginEvent:
-        ideal_intervals.append(EndEvent(ActionType.IDEAL, [],
-                                f"Ideal{len(ideal_intervals) // 2}",
+        ideal_intervals.append(EndEvent(ActionType.IDEAL, f"Ideal{len(ideal_intervals) // 2}", [],
                                 time = time))
 
 def update_responsibility_intervals(time : datetime, successor_pointers: dict[str, str],
@@ -165,8 +162,7 @@ def update_responsibility_intervals(time : datetime, successor_pointers: dict[st
             assert begin_event is not None, f"BeginEvent of Responsibility of node: {succ} and key: {key} not found in ongoing responsibilities: {responsibility_begin_events}"
 
 
-            responsibility_intervals.append(EndEvent(ActionType.RESPONSIBLE, [],
-                                    begin_event.get_id(),
+            responsibility_intervals.append(EndEvent(ActionType.RESPONSIBLE, begin_event.get_id(), [],
                                     time = time))
 
 
@@ -179,10 +175,9 @@ def update_responsibility_intervals(time : datetime, successor_pointers: dict[st
 
         assert new_keys is not None, f"succ {succ} not found in new responsibilities: {new_responsibilities}"
 
-        # Create responsibility intervals for new keys
-        for key in new_keys - prev_keys:
-            begin_event = BeginEvent(ActionType.RESPONSIBLE, [succ, key],
-                                    f"Responsible-{len(responsibility_intervals)}-{succ}-{key}",
+        # Create responsibility intervals for new keys, in key order so that their ids are the same from run to run
+        for key in sorted(new_keys - prev_keys):
+            begin_event = BeginEvent(ActionType.RESPONSIBLE, f"Responsible-{len(responsibility_intervals)}-{succ}-{key}", [SYMBOLS.intern(succ), SYMBOLS.intern(key)],
                                     time = time)
 
             responsibility_intervals.append(begin_event)
@@ -247,25 +242,24 @@ def process_intervals(trace : Trace,
     responsibility_intervals : list[Event] = []
 
 
-    first_event = trace.events[0][0]
+    first_event = sorted(trace.events[0], key=lambda e: e.entry_str())[0]
     initial_timestamp = first_event.get_time() - timedelta(milliseconds=1)
 
     # Initial member
-    initial_member = first_event.values[0]
+    initial_member = SYMBOLS.name(first_event.values[0])
 
-    begin_event = BeginEvent(ActionType.MEMBER, [initial_member],
-                        f"Membership{len(membership_intervals) // 2}-{initial_member}",
+    begin_event = BeginEvent(ActionType.MEMBER, f"Membership{len(membership_intervals) // 2}-{initial_member}", [SYMBOLS.intern(initial_member)],
                         time = initial_timestamp)
 
     membership_intervals.append(begin_event)
     current_members[initial_member] = begin_event
 
     # Initially in a readonly  regimen
-    readonly_intervals.append(BeginEvent(ActionType.READONLY, [], f"ReadOnly{len(readonly_intervals) // 2}",
+    readonly_intervals.append(BeginEvent(ActionType.READONLY, f"ReadOnly{len(readonly_intervals) // 2}", [],
                         time = initial_timestamp))
 
     # Initially in a stable  regimen
-    stable_intervals.append(BeginEvent(ActionType.STABLE, [], f"Stable{len(stable_intervals) // 2}",
+    stable_intervals.append(BeginEvent(ActionType.STABLE, f"Stable{len(stable_intervals) // 2}", [],
                         time = initial_timestamp))
 
     # Initial check for ideal state and responsibility
@@ -284,7 +278,7 @@ def process_intervals(trace : Trace,
     for instant in trace.events:
 
         while successor_changes_idx < len(successor_changes) and \
-            instant[0].get_time() > successor_changes[successor_changes_idx][0]:
+            next(iter(instant)).get_time() > successor_changes[successor_changes_idx][0]:
 
             time, node, successor = successor_changes[successor_changes_idx]
             successor_pointers[node] = successor
@@ -301,7 +295,7 @@ def process_intervals(trace : Trace,
             
             successor_changes_idx += 1
 
-        for event in instant:
+        for event in sorted(instant, key=lambda e: e.entry_str()):
             event_counter += 1
 
 
@@ -390,16 +384,16 @@ def get_keys(trace: Trace) -> set[str]:
     for events in trace.events:
         for event in events:
             if len(event.values) > 0:
-                keys.add(event.values[0])
+                keys.add(SYMBOLS.name(event.values[0]))
 
-            if event.get_type() is ActionType.STORE and type(event) is BeginEvent:
-                keys.add(event.values[1])
+            if event.action_type is ActionType.STORE and type(event) is BeginEvent:
+                keys.add(SYMBOLS.name(event.values[1]))
 
-            if event.get_type() is ActionType.LOOKUP and type(event) is BeginEvent:
-                keys.add(event.values[1])
+            if event.action_type is ActionType.LOOKUP and type(event) is BeginEvent:
+                keys.add(SYMBOLS.name(event.values[1]))
 
-            if event.get_type() is ActionType.FINDNODE:
-                keys.add(event.values[1])
+            if event.action_type is ActionType.FINDNODE:
+                keys.add(SYMBOLS.name(event.values[1]))
 
     return keys
 
@@ -458,7 +452,7 @@ def get_log_files(log_path: str | None,
 def load_trace_data(log_path : str, successors_path : str | None, num_lines : int | None) \
         -> tuple[Trace, list[tuple[datetime, str, str]]]:
 
-    trace = parse_trace_file(log_path, num_lines, True)
+    trace = parse_log(read_log(log_path), num_lines, True)
     successor_changes = parse_successors(successors_path) if successors_path else []
     return trace, successor_changes
 
@@ -4,13 +4,18 @@ import sys
 import time
 import csv
 import re
+import multiprocessing
 from datetime import datetime
-from typing import OrderedDict
+from typing import Iterable, OrderedDict
 
-from chord_preprocessor import dir_path, preprocess_log_from_dir
-from trace_parser import parse_trace_file
-from parser import parse_ast
-from ast_nodes import Formula
+from bisect import bisect_right
+from itertools import islice
+
+from chord_preprocessor import dir_path, get_log_files, parse_successors, preprocess_trace, write_processed_log, flatten
+from parse_formula import parse_formula
+from ast_nodes import Formula, Trace, ActionValue
+from monitor import evaluate_prefixes
+from parse_log import read_lines, parse_log_line, LogParsingError
 
 def validate_or_create_dir(path: str) -> str:
     if os.path.isdir(path):
@@ -41,6 +46,8 @@ def parse_args() -> argparse.Namespace:
                         help="Line numbers to process")
 
     parser.add_argument("-r", "--responsibility", action="store_true", help="Include responsibility actions in log")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of processes evaluating the properties, longest evaluations first according to latest.csv (default: 1)")
     
     args = parser.parse_args()
 
@@ -48,6 +55,9 @@ def parse_args() -> argparse.Namespace:
         print(f"Error: You must specify either --line, or both --step and --max-lines", file=sys.stderr)
         parser.print_usage()
         sys.exit(1)
+    if args.jobs < 1:
+        print(f"Error: The number of jobs must be positive", file=sys.stderr)
+        sys.exit(1)
 
 
     return args
@@ -70,7 +80,7 @@ def parse_properties(properties_dir: str, verbose : bool = False) -> OrderedDict
 
 
         try:
-            formulas[os.path.splitext(os.path.basename(entry.path))[0]] = parse_ast(input_text)
+            formulas[os.path.splitext(os.path.basename(entry.path))[0]] = parse_formula(input_text)
         except Exception as e:
             print(f"Error parsing input: {e}", file=sys.stderr)
             printv(f"Skipping property file: {entry.path}", verbose)
@@ -105,6 +115,84 @@ def create_iterator(args) -> list[int] | range | None:
 
 
 
+# Parses the largest prefix of a log as the preprocessor does, and returns its trace with the number of events of
+# each prefix (a number of lines of the log), as the lines that are not events, such as regimen lines, are skipped
+def parse_prefixes(log_path: str, iterator: list[int] | range) -> tuple[Trace, list[int]]:
+    trace = Trace()
+    ongoing_actions: dict[str, ActionValue] = {}
+    lengths = [0]
+    for (line_number, line) in enumerate(islice(read_lines(log_path), max(iterator)), 1):
+        try:
+            parse_log_line(line, trace, ongoing_actions, True)
+        except LogParsingError as e:
+            print(e.display(line_number), file=sys.stderr)
+            sys.exit(1)
+        lengths.append(trace.get_length())
+    return (trace, [lengths[min(max(max_lines, 0), len(lengths) - 1)] for max_lines in iterator])
+
+# Preprocesses the largest prefix of the log of a directory, and returns for each prefix (a number of lines of the
+# log) the number of lines of the processed log that it covers: the processed events up to the time of its last event.
+# Intervals that the processed log closes after the end of a prefix are ongoing at its cut point.
+def preprocess_prefixes(directory: str, destination: str, iterator: list[int] | range, include_responsibility: bool, verbose: bool) -> list[int]:
+    log_path, successors_path = get_log_files(None, None, directory, verbose)
+    (trace, event_counts) = parse_prefixes(log_path, iterator)
+    successor_changes = parse_successors(successors_path) if successors_path else []
+    log_times = [event.get_time() for event in flatten(trace.events)]
+    events = preprocess_trace(trace, successor_changes, include_responsibility, verbose)
+    write_processed_log(events, destination, verbose)
+    processed_times = [event.get_time() for event in events]
+    return [bisect_right(processed_times, log_times[event_count - 1]) if event_count > 0 else 0 for event_count in event_counts]
+
+# Prefixes of a log whose processed trace grows, with their cut points: as the prefixes stop once the trace no longer grows
+def growing_prefixes(iterator: list[int] | range, cut_points: list[int], verbose: bool) -> list[tuple[int, int]]:
+    prefixes = []
+    previous = 0
+    for (max_lines, cut_point) in zip(iterator, cut_points):
+        if cut_point <= previous:
+            printv(f"Skipping trace with length {cut_point} (previous: {previous})", verbose)
+            break
+        prefixes.append((max_lines, cut_point))
+        previous = cut_point
+    return prefixes
+
+# Evaluates a property on every prefix of a processed log in a single pass (see evaluate_prefixes),
+# returning a row of the CSV for each prefix, or None on error
+def evaluate_property(formula: Formula, name: str, log: Iterable[str], prefixes: list[tuple[int, int]], row: dict) -> list[dict] | None:
+    try:
+        results = evaluate_prefixes(formula, log, [cut_point for (_, cut_point) in prefixes])
+    except Exception as e:
+        print(f"Error evaluating formula {name} on {row['log_name']}: {e}", file=sys.stderr)
+        return None
+    return [dict(row,
+        property=name,
+        original_trace_length=max_lines,
+        processed_trace_length=cut_point,
+        parse_time=parse_time,
+        eval_time=eval_time,
+        total_time=eval_time + parse_time,
+        result=result,
+        timestamp=datetime.now().isoformat())
+        for ((max_lines, cut_point), (result, parse_time, eval_time)) in zip(prefixes, results)]
+
+def log_dir_row(log_dir: os.DirEntry, nodes: str) -> dict:
+    return {
+        "log_name": os.path.basename(log_dir.path),
+        "property": None,
+        "original_trace_length": None,
+        "processed_trace_length": None,
+        "parse_time": None,
+        "eval_time": None,
+        "total_time": None,
+        "result": None,
+        "nodes": nodes,
+        "fail": "Faults" in log_dir.name,
+        "leave": "Leave" in log_dir.name,
+        "timestamp": None,
+    }
+
+# Evaluates the properties on the prefixes of the log of a directory: the log is preprocessed once up to its largest
+# prefix, and each property is evaluated on all the prefixes in a single incremental pass over the processed log.
+# The times of a prefix are the ones of the pass up to its cut point.
 def process_log_dir(
     log_dir: os.DirEntry, 
     iterator: list[int] | range, 
@@ -128,98 +216,117 @@ def process_log_dir(
             printv(f"Skipping log directory without nodes in name: {log_dir.path}", verbose)
             return
 
-        nodes = node_result.group(1)
-        fail = "Faults" in log_dir.name 
-        leave = "Leave" in log_dir.name 
-
-        timing_data = []
-        prev = 0
-
-        for max_lines in iterator:
-            preprocess_destination = f"{os.path.join(processed_dir, os.path.basename(log_dir.path))}-{max_lines}.log"
-
-            printv(f"\nPreprocessing for {max_lines = }, file destination: {preprocess_destination}", verbose)
-            
-            # TODO: currently never skips preprocessing
-            # Check if time gain is useful
-            if False and os.path.isfile(preprocess_destination):
-                printv(f"Skipping preprocessing, file already exists: {preprocess_destination}", verbose)
-                
-            else:
-                preprocess_log_from_dir(log_dir.path,
-                                        preprocess_destination,
-                                        max_lines,
-                                        include_responsibility,
-                                        verbose)
-
-            printv(f"Parsing trace file: {preprocess_destination}", verbose)
-
-            start_time = time.perf_counter()
-            # NOTE: Line limit used for preprocessing, not required here
-            trace = parse_trace_file(preprocess_destination, None)
-            parse_time = time.perf_counter() - start_time
-
-            printv(f"Parse time: {parse_time:.4f} seconds (wall-clock)", verbose)
-
-            if prev is not None and trace.get_length() <= prev: 
-                printv(f"Skipping trace with length {trace.get_length()} (previous: {prev})", verbose)
-                break
-
-
-            for (name, formula) in properties.items():
-                # If property requires a particular departure operation and the log does not contain it, skip
+        preprocess_destination = f"{os.path.join(processed_dir, os.path.basename(log_dir.path))}-{max(iterator)}.log"
+        printv(f"\nPreprocessing for max_lines = {max(iterator)}, file destination: {preprocess_destination}", verbose)
+        cut_points = preprocess_prefixes(log_dir.path, preprocess_destination, iterator, include_responsibility, verbose)
+        prefixes = growing_prefixes(iterator, cut_points, verbose)
+
+        row = log_dir_row(log_dir, node_result.group(1))
+        for (name, formula) in properties.items():
+            # If property requires a particular departure operation and the log does not contain it, skip
+            if name in property_map and not any([ x in log_dir.name for x in property_map[name]]):
+                printv(f"Skipping property {name} for log {log_dir.name}", verbose)
+                continue
+
+            printv(f"\nEvaluating formula \"{name}\" on {len(prefixes)} prefixes of trace '{log_dir.path}'", verbose)
+            rows = evaluate_property(formula, name, read_lines(preprocess_destination), prefixes, row)
+            if rows is None:
+                #TODO: record failures in csv
+                continue
+            for prefix_row in rows:
+                printv(f"Result after {prefix_row['original_trace_length']} lines: {prefix_row['result']} "
+                    f"({prefix_row['eval_time']:.4f} seconds of evaluation so far)", verbose)
+            append_timing_rows(rows, output_filename)
+
+
+# Evaluation times of a previous run, by log name, property and number of lines, to schedule the longest evaluations first
+def read_timings(filename: str) -> dict[tuple[str, str, int], float]:
+    timings = {}
+    if not os.path.isfile(filename):
+        return timings
+    with open(filename, "r", newline="") as csvfile:
+        for row in csv.DictReader(csvfile):
+            try:
+                timings[(row["log_name"], row["property"], int(row["original_trace_length"]))] = float(row["eval_time"])
+            except (KeyError, ValueError):
+                continue
+    return timings
+
+# Sorts evaluation tasks, the longest of the previous run first. A pass takes about as long as the evaluation of its
+# largest prefix from scratch. Evaluations that were not timed before come first, as they may be the longest
+def order_tasks(tasks: list[tuple[str, list[tuple[int, int]], dict, str]], timings: dict[tuple[str, str, int], float]) -> None:
+    tasks.sort(key=lambda task: -timings.get((task[2]["log_name"], task[3], task[1][-1][0] if task[1] else 0), float("inf")))
+
+# Properties of each worker process
+worker_properties: OrderedDict[str, Formula] = OrderedDict()
+
+def init_worker(properties_dir: str):
+    global worker_properties
+    worker_properties = parse_properties(properties_dir)
+
+# Preprocesses the log of a directory, returning the cut points of its prefixes
+def preprocess_task(task: tuple[str, str, list[int] | range, bool, bool]) -> list[int]:
+    (log_path, preprocess_destination, iterator, include_responsibility, verbose) = task
+    return preprocess_prefixes(log_path, preprocess_destination, iterator, include_responsibility, verbose)
+
+# Evaluates a property on the prefixes of a processed log, returning the rows of the CSV, or None on error
+def evaluate_task(task: tuple[str, list[tuple[int, int]], dict, str]) -> list[dict] | None:
+    (preprocess_destination, prefixes, row, name) = task
+    return evaluate_property(worker_properties[name], name, read_lines(preprocess_destination), prefixes, row)
+
+# Same as process_log_dir on every log directory, with a pool of processes: the logs are preprocessed first, then the
+# properties are evaluated on their prefixes, the longest evaluations of the previous run first so that the last ones
+# are short. Rows are written by this process only, as the evaluations complete.
+def process_log_dirs_parallel(
+    log_dirs: list[os.DirEntry],
+    iterator: list[int] | range,
+    properties_dir: str,
+    properties: OrderedDict[str, Formula],
+    processed_dir: str,
+    include_responsibility: bool,
+    property_map: dict[str, list[str]],
+    output_filename: str,
+    timings: dict[tuple[str, str, int], float],
+    node_pattern: re.Pattern,
+    jobs: int,
+    verbose: bool
+):
+    logs = []
+    for log_dir in log_dirs:
+        if not log_dir.is_dir():
+            printv(f"Skipping log file: {log_dir.path}", verbose)
+            continue
+        node_result = node_pattern.search(log_dir.name)
+        if node_result is None:
+            printv(f"Skipping log directory without nodes in name: {log_dir.path}", verbose)
+            continue
+        preprocess_destination = f"{os.path.join(processed_dir, os.path.basename(log_dir.path))}-{max(iterator)}.log"
+        logs.append((log_dir, node_result.group(1), preprocess_destination))
+
+    with multiprocessing.Pool(jobs, initializer=init_worker, initargs=(properties_dir,)) as pool:
+        printv(f"Preprocessing {len(logs)} logs with {jobs} processes", verbose)
+        all_cut_points = pool.map(preprocess_task, [(log_dir.path, preprocess_destination, iterator, include_responsibility, verbose)
+            for (log_dir, _, preprocess_destination) in logs])
+
+        tasks = []
+        for ((log_dir, nodes, preprocess_destination), cut_points) in zip(logs, all_cut_points):
+            prefixes = growing_prefixes(iterator, cut_points, verbose)
+            row = log_dir_row(log_dir, nodes)
+            for name in properties:
                 if name in property_map and not any([ x in log_dir.name for x in property_map[name]]):
                     printv(f"Skipping property {name} for log {log_dir.name}", verbose)
                     continue
+                tasks.append((preprocess_destination, prefixes, row, name))
 
-
-                var_store = {}
-                interval_store = {}
-
-                printv(f"\nEvaluating formula \"{name}\" on trace '{log_dir.path}' with {trace.get_length()} events", verbose)
-
-
-                start_wall = time.perf_counter()
-
-                try:
-                    result = formula.evaluate(trace, var_store, interval_store)
-                except Exception as e:
-                    message =  f"Error evaluating formula {name} on {log_dir.name}: {e}"
-                    print(message, file=sys.stderr)
-                    printv(message,verbose)
-
-                    #TODO: record failures in csv
-
-                    continue
-
-                end_wall = time.perf_counter()
-
-                eval_time = end_wall - start_wall
-
-                printv(f"Result: {result}", verbose)
-                printv(f"Evaluation time: {eval_time:.4f} seconds (wall-clock)", verbose)
-                
-
-                timing_data.append({
-                    "log_name": os.path.basename(log_dir.path),
-                    "property": name,
-                    "original_trace_length": max_lines,
-                    "processed_trace_length": trace.get_length(),
-                    "parse_time": parse_time,
-                    "eval_time": eval_time,
-                    "total_time": eval_time + parse_time,
-                    "result": result,
-                    "nodes": nodes,
-                    "fail": fail,
-                    "leave": leave,
-                    "timestamp": datetime.now().isoformat(),
-                })
-
-            prev = max_lines
-            
-
-            append_timing_rows(timing_data, output_filename)
-            timing_data.clear()
+        order_tasks(tasks, timings)
+        printv(f"Evaluating {len(tasks)} properties with {jobs} processes", verbose)
+        for rows in pool.imap_unordered(evaluate_task, tasks):
+            if rows is None:
+                continue
+            for row in rows:
+                printv(f"Evaluated \"{row['property']}\" on {row['log_name']} ({row['original_trace_length']} lines): "
+                    f"{row['result']} in {row['eval_time']:.4f} seconds", verbose)
+            append_timing_rows(rows, output_filename)
 
 
 def make_output_filename(output_dir: str, max_lines: int | None, step: int | None) -> str:
@@ -253,16 +360,32 @@ def main():
     
     node_pattern = re.compile(r"(\d+)nodes")
 
-    for entry in os.scandir(args.directory):
-        process_log_dir(entry, 
-                        iterator,
-                        properties,
-                        args.processed,
-                        args.responsibility,
-                        property_map,
-                        output_filename,
-                        node_pattern,
-                        verbose)
+    if args.jobs > 1:
+        timings = read_timings(os.path.join(args.output, "latest.csv"))
+        process_log_dirs_parallel(list(os.scandir(args.directory)),
+                                  iterator,
+                                  args.properties,
+                                  properties,
+                                  args.processed,
+                                  args.responsibility,
+                                  property_map,
+                                  output_filename,
+                                  timings,
+                                  node_pattern,
+                                  args.jobs,
+                                  verbose)
+
+    else:
+        for entry in os.scandir(args.directory):
+            process_log_dir(entry,
+                            iterator,
+                            properties,
+                            args.processed,
+                            args.responsibility,
+                            property_map,
+                            output_filename,
+                            node_pattern,
+                            verbose)
 
 
     print("\nMeasurements complete.")
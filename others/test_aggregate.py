@@ -0,0 +1,85 @@
+import unittest
+import random
+from copy import deepcopy
+from itertools import product
+from parse_log import parse_log
+from parse_formula import parse_formula
+from test_sweep_join import random_log
+from ast_nodes import *
+from indexes import EndpointTable, in_range
+
+AGGREGATES = [
+    "(forall member m (n) () (exists store s (- - -) (n) (before s m)))",
+    "(forall member m (n) () (forall store s (- - -) (n) (before s m)))",
+    "(forall member m (n) () (exists store s (- - -) (n) (before m s)))",
+    "(forall member m (n) () (exists member m2 (n) () (meets m2 m)))",
+    "(forall member m (n) () (exists member m2 (-) () (meets m m2)))",
+    "(forall member m (-) () (forall member m2 (-) () (exists store s (- k -) (-) (and (before s m) (not (before m2 s))))))",
+    "(forall member m (n) () (forall member m2 (n) () (implies (and (not (equals m m2)) (before m2 m)) (not (before m m2)))))",
+    "(forall store s1 (- k -) (-) (forall member m () () (forall store s2 (- k -) (-) (implies (and (not (equals s1 s2)) (before s2 m)) (not (before s1 s2))))))",
+    "(exists member m () () (forall store s (- - -) (-) (or (before s m) (before m s))))",
+]
+
+NOT_AGGREGATES = [
+    "(forall member m (n) () (exists store s (- - -) (n) (intersects s m)))",
+    "(forall member m (n) () (exists member m2 (-) () (not (meets m m2))))",
+    "(forall member m (n) () (exists store s (- - -) (n2) (and (before s m) (n = n2))))",
+    "(forall member m (n) () (exists store s (n - n) (-) (before s m)))",
+    "(forall member m (n) () (forall member m2 (n) () (implies (not (equals m m2)) (before m m2))))",
+]
+
+class TestEndpointTable(unittest.TestCase):
+
+    def test_same_as_scan(self):
+        rng = random.Random(0)
+        timepoints = [float("-inf"), 0, 1, 2, 3, 4, float("inf")]
+        ranges = [(low, low_excluded, high, high_excluded) for (low, high) in product(timepoints, timepoints)
+            for (low_excluded, high_excluded) in product([False, True], [False, True]) if low <= high]
+        for _ in range(20):
+            intervals = []
+            for _ in range(rng.randrange(1, 6)):
+                begin = rng.randrange(4)
+                intervals.append(IntervalValue(begin, rng.choice([begin + rng.randrange(3), float("inf")])))
+            table = EndpointTable([ActionValue(ActionType.STORE, interval_value, [], []) for interval_value in intervals])
+            for (end_range, begin_range) in product(ranges, rng.sample(ranges, 10)):
+                expected = any(in_range(interval.end, end_range) and in_range(interval.begin, begin_range) for interval in intervals)
+                self.assertEqual(table.exists(end_range, begin_range), expected, f"Mismatch for {intervals} on {end_range}, {begin_range}")
+
+
+class TestAggregateLookup(unittest.TestCase):
+
+    def evaluate_naively(self, formula: Formula, trace: Trace) -> bool:
+        formula = deepcopy(formula)
+        stack = [formula]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ActionQuantifier):
+                node.aggregate_lookup = None
+            stack.extend(node.get_children())
+        return formula.evaluate(trace, Environment(formula))
+
+    def find_lookups(self, formula: Formula) -> list[AggregateLookup]:
+        lookups = [formula.aggregate_lookup] if isinstance(formula, ActionQuantifier) and formula.aggregate_lookup is not None else []
+        return lookups + [lookup for child in formula.get_children() for lookup in self.find_lookups(child)]
+
+    def test_detection(self):
+        for formula_str in AGGREGATES:
+            self.assertTrue(self.find_lookups(parse_formula(formula_str)), f"Aggregate lookup not chosen for {formula_str}")
+        for formula_str in NOT_AGGREGATES:
+            self.assertFalse(self.find_lookups(parse_formula(formula_str)), f"Aggregate lookup chosen for {formula_str}")
+
+    def test_same_as_naive(self):
+        for formula_str in AGGREGATES:
+            formula = parse_formula(formula_str)
+            for seed in range(30):
+                trace = parse_log(random_log(seed), None)
+                self.assertEqual(formula.evaluate(trace, Environment(formula)), self.evaluate_naively(formula, trace),
+                    f"Mismatch for {formula} on seed {seed}")
+
+    def test_value_freshness(self):
+        formula = parse_formula(open("specs/properties/value_freshness.actl").read())
+        self.assertEqual(len(self.find_lookups(formula)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from itertools import product
+from parse_formula import ASTTransformer
+from ast_nodes import *
+
+TIMEPOINTS = [0, 1, 2, 3, float("inf")]
+
+# Every interval over a few time points, including degenerate and ongoing ones
+INTERVALS = [IntervalValue(begin, end) for (begin, end) in product(TIMEPOINTS, TIMEPOINTS) if begin <= end and begin != float("inf")]
+
+class TestAllenRelationSet(unittest.TestCase):
+
+    def evaluate(self, formula: Formula, left: IntervalValue, right: IntervalValue) -> bool:
+        env = Environment(formula, interval_store={"a": left, "b": right})
+        return formula.evaluate(Trace(), env)
+
+    def test_single_relations(self):
+        (a, b) = (Interval("a"), Interval("b"))
+        for (name, predicate) in ASTTransformer.RELATION_MAP.items():
+            relation_set = AllenRelationSet(name, [name], a, b)
+            for (left, right) in product(INTERVALS, INTERVALS):
+                # Degenerate intervals may both meet and start another one
+                if left.begin == left.end or right.begin == right.end:
+                    continue
+                self.assertEqual(self.evaluate(relation_set, left, right), self.evaluate(predicate(a, b), left, right),
+                    f"Mismatch for {name} on {left}, {right}")
+
+    def test_converse_relations(self):
+        for (left, right) in product(INTERVALS, INTERVALS):
+            relation = allen_relation(left.begin, left.end, right.begin, right.end)
+            inverse = allen_relation(right.begin, right.end, left.begin, left.end)
+            self.assertEqual(relation, len(ALLEN_RELATIONS) - 1 - inverse, f"Relation of {left}, {right} is not the inverse of its converse")
+
+    def test_composite_relations(self):
+        (a, b) = (Interval("a"), Interval("b"))
+        expansions = {
+            "in": Or(Starts(a, b), During(a, b), Finishes(a, b)),
+            "intersects": Or(
+                Equals(a, b),
+                Or(Starts(a, b), During(a, b), Finishes(a, b)),
+                Or(Starts(b, a), During(b, a), Finishes(b, a)),
+                Overlaps(a, b),
+                Overlaps(b, a),
+            ),
+        }
+        for (name, relations) in ASTTransformer.RELATION_SETS.items():
+            relation_set = AllenRelationSet(name, relations, a, b)
+            for (left, right) in product(INTERVALS, INTERVALS):
+                self.assertEqual(self.evaluate(relation_set, left, right), self.evaluate(expansions[name], left, right),
+                    f"Mismatch for {name} on {left}, {right}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from parse_log import parse_log
+from parse_formula import parse_formula
+from batch import evaluate_all, share_subformulas, normalize
+from test_sweep_join import random_log
+from ast_nodes import *
+
+FORMULAS = [
+    "(forall store s (- k -) (n) (exists member m (n) () (intersects m s)))",
+    "(forall store s2 (- k2 -) (n2) (exists member m2 (n2) () (intersects m2 s2)))",
+    "(and (forall store s (- k -) (-) (exists member m (n) () (in s m))) (forall member m (n) () (exists store s (- - -) (n) (before s m))))",
+    "(exists member m (n) () (forall store s (- - -) (-) (exists member m2 (n) () (before m m2))))",
+    "(forall member m (n) () (forall store s (- - -) (-) (exists member m2 (n) () (before s m2))))",
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (n = n2)))",
+    "(exists store s (- k -) (n) (not (n = 'node0)))",
+]
+
+class TestBatch(unittest.TestCase):
+
+    def test_normalize(self):
+        (shape, labels) = normalize(parse_formula(FORMULAS[0]).expression)
+        (other_shape, other_labels) = normalize(parse_formula(FORMULAS[1]).expression)
+        self.assertEqual(shape, other_shape)
+        self.assertEqual(labels, (["n"], ["s"]))
+        self.assertEqual(other_labels, (["n2"], ["s2"]))
+        # The labels are restored
+        self.assertEqual(format_formula_of(FORMULAS[1]), format_formula_of(FORMULAS[1], normalized=True))
+
+    def test_shared_subformulas(self):
+        formulas = [parse_formula(formula_str) for formula_str in FORMULAS]
+        memos = share_subformulas(formulas)
+        tables = {id(memo.table) for memo in memos}
+        # The innermost existentials of the fourth and fifth formulas: the ones in the first two are joined
+        # with the universal around them
+        self.assertEqual(len(memos), 2)
+        self.assertEqual(len(tables), 1)
+        self.assertIs(formulas[3].expression.expression, memos[0])
+
+    def test_same_as_separately(self):
+        for seed in range(30):
+            trace = parse_log(random_log(seed), None)
+            formulas = [parse_formula(formula_str) for formula_str in FORMULAS]
+            expected = [formula.evaluate(trace, Environment(formula)) for formula in formulas]
+            self.assertEqual(evaluate_all([parse_formula(formula_str) for formula_str in FORMULAS], trace), expected,
+                f"Mismatch on seed {seed}")
+            self.assertEqual(evaluate_all([parse_formula(formula_str) for formula_str in FORMULAS], trace, 0), expected,
+                f"Mismatch without sharing on seed {seed}")
+
+# Prints the formula, after normalizing it if asked
+def format_formula_of(formula_str: str, normalized: bool = False) -> str:
+    formula = parse_formula(formula_str)
+    if normalized:
+        normalize(formula)
+    return repr(formula)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from datetime import datetime
+from parse_log import parse_log
+from parse_formula import parse_formula
+from columnar import ColumnarTrace, ActionRecord
+from test_sweep_join import random_log
+from test_monitor import FORMULAS
+from ast_nodes import *
+
+class TestColumnarTrace(unittest.TestCase):
+
+    def test_same_as_trace(self):
+        for seed in range(20):
+            log = random_log(seed)
+            (trace, columnar) = (parse_log(log, None), parse_log(log, None, columnar=True))
+            self.assertEqual(len(columnar), len(trace))
+            self.assertEqual(columnar.get_length(), trace.get_length())
+            self.assertEqual([sorted(map(repr, events)) for events in columnar.events],
+                [sorted(map(repr, events)) for events in trace.events])
+            for action_type in (ActionType.MEMBER, ActionType.STORE):
+                self.assertEqual(columnar.find_occurrences(action_type), trace.find_occurrences(action_type))
+            for key in trace.input_index:
+                self.assertEqual(columnar.input_index.get(key), trace.input_index[key])
+            # Ordered by end time point
+            for key in trace.output_index:
+                self.assertEqual(columnar.output_index.get(key), trace.output_index[key])
+            for formula_str in FORMULAS:
+                formula = parse_formula(formula_str)
+                self.assertEqual(formula.evaluate(columnar, Environment(formula)), formula.evaluate(trace, Environment(formula)),
+                    f"Mismatch for {formula_str} on seed {seed}")
+
+    def test_records(self):
+        trace = ColumnarTrace()
+        time = datetime(2000, 1, 1, 12)
+        (node1, key, value, node2, node3) = map(SYMBOLS.intern, ["node1", "key", "value", "node2", "node3"])
+        store = trace.insert_begin_event(ActionType.STORE, "id-1", [node1, key, value], time)
+        self.assertIsInstance(store, ActionRecord)
+        # Materialized before the store ends, and kept up to date
+        (record,) = trace.find_occurrences(ActionType.STORE)
+        self.assertIsNot(record, store)
+        self.assertEqual(trace.find_occurrences_by_input(ActionType.STORE, 1, key), [record])
+        self.assertTrue(trace.insert_end_event(store, "id-1", [node2], time.replace(second=1)))
+        self.assertEqual(record.interval_value, IntervalValue(0, 1))
+        self.assertEqual(record.output_values, [node2])
+        self.assertEqual(trace.find_occurrences_by_output(ActionType.STORE, 0, node2), [record])
+        self.assertFalse(trace.insert_end_event(store, "id-1", [node3], time.replace(second=2)))
+        self.assertEqual(trace.get_time(1), time.replace(second=1))
+        self.assertEqual(repr(trace.events[-1]), "{E ⟨store⟩_id-1 (node2)}")
+        self.assertIsNotNone(trace.complete_event(EndEvent(ActionType.STORE, None, [node2], None), 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
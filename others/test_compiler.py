@@ -0,0 +1,91 @@
+import unittest
+import os
+from parse_log import parse_log
+from parse_formula import parse_formula
+from compiler import compile_formula
+from chord_preprocessor import get_log_files, load_trace_data, preprocess_trace
+from ast_nodes import *
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHORD_LOGS = os.path.join(ROOT, "logs", "openChord")
+
+LOG = """
+ 2000-01-01 12:00:00.00, Member, m-1, node1
+ 2000-01-01 12:00:05.00, Ideal, i-1
+ 2000-01-01 12:00:10.00, Store, id-001, node1, key, value1
+ 2000-01-01 12:00:20.00, ReplyStore, id-001, node1
+ 2000-01-01 12:00:30.00, Lookup, id-002, node2, key
+ 2000-01-01 12:00:40.00, ReplyLookup, id-002, node1, value1
+ 2000-01-01 12:00:50.00, Store, id-003, node1, key, value2
+ 2000-01-01 12:01:00.00, ReplyStore, id-003, node1
+ 2000-01-01 12:01:10.00, Lookup, id-004, node2, key
+ 2000-01-01 12:01:20.00, ReplyLookup, id-004, node1, value1
+ 2000-01-01 12:01:30.00, FindNode, id-005, node2, key
+ 2000-01-01 12:01:40.00, ReplyFindNode, id-005, node1
+ 2000-01-01 12:01:50.00, EndIdeal, i-1
+"""
+
+class TestCompiler(unittest.TestCase):
+
+    def assert_same_as_tree(self, formula: Formula, trace: Trace, store: dict[str, str] | None = None):
+        store = store or {}
+        self.assertEqual(compile_formula(formula).evaluate(trace, Environment(formula, store)), formula.evaluate(trace, Environment(formula, store)),
+            f"Mismatch for {formula}")
+
+    def test_properties(self):
+        properties_dir = os.path.join(ROOT, "specs", "properties")
+        traces = [parse_log(LOG, None)]
+        with open(os.path.join(ROOT, "logs", "openChord", "example.log")) as file:
+            traces.append(parse_log(file.read(), None))
+        for entry in sorted(os.listdir(properties_dir)):
+            with open(os.path.join(properties_dir, entry)) as file:
+                formula = parse_formula(file.read())
+            for trace in traces:
+                self.assert_same_as_tree(formula, trace)
+
+    @unittest.skipUnless(os.path.isdir(CHORD_LOGS), "openChord logs not found")
+    def test_chord_logs(self):
+        properties_dir = os.path.join(ROOT, "specs", "properties")
+        formulas = {}
+        for entry in sorted(os.listdir(properties_dir)):
+            with open(os.path.join(properties_dir, entry)) as file:
+                formulas[entry] = parse_formula(file.read())
+        log_dirs = sorted(entry.path for entry in os.scandir(CHORD_LOGS) if entry.is_dir())
+        self.assertTrue(log_dirs)
+        for directory in log_dirs:
+            # Preprocessed as measure_chord does, with the regimen and responsibility intervals
+            log_path, successors_path = get_log_files(None, None, directory)
+            (trace, successor_changes) = load_trace_data(log_path, successors_path, None)
+            events = preprocess_trace(trace, successor_changes, True)
+            trace = parse_log([event.entry_str() for event in events], None)
+            for (entry, formula) in formulas.items():
+                with self.subTest(log=os.path.basename(directory), property=entry):
+                    self.assert_same_as_tree(formula, trace)
+
+    def test_relations(self):
+        trace = parse_log(LOG, None)
+        for relation in ["before", "meets", "overlaps", "starts", "during", "finishes", "equals", "in", "intersects"]:
+            for (a, b) in [("l", "s"), ("s", "l"), ("l", "i"), ("i", "l")]:
+                formula = parse_formula(f"(forall lookup l (- -) (- -) (exists store s (- - -) (-) (exists ideal i () () ({relation} {a} {b}))))")
+                self.assert_same_as_tree(formula, trace)
+
+    def test_bound_variables(self):
+        trace = parse_log(LOG, None)
+        formula = parse_formula("(forall lookup l (- k) (- v) (v = w))")
+        self.assert_same_as_tree(formula, trace, {"w": "value1"})
+        self.assert_same_as_tree(formula, trace, {"w": "value2"})
+
+        formula = parse_formula("(exists store s (n k v) (-) (and (n = 'node1) (v = 'value2)))")
+        self.assert_same_as_tree(formula, trace)
+        self.assert_same_as_tree(formula, trace, {"k": "key"})
+        self.assert_same_as_tree(formula, trace, {"k": "other"})
+
+    def test_unbound_variable(self):
+        trace = parse_log(LOG, None)
+        formula = parse_formula("(forall lookup l (- k) (- v) (v = w))")
+        with self.assertRaises(ValueError):
+            compile_formula(formula).evaluate(trace, Environment(formula))
+
+
+if __name__ == "__main__":
+    unittest.main()
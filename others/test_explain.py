@@ -0,0 +1,46 @@
+import unittest
+from parse_log import parse_log
+from parse_formula import parse_formula
+from explain import explain, complexity_warnings
+from profiler import Profiler
+from test_sweep_join import random_log
+from test_monitor import FORMULAS
+from ast_nodes import *
+
+class TestExplain(unittest.TestCase):
+
+    def test_operators(self):
+        trace = parse_log(random_log(4), None)
+        operators = [explain(parse_formula(FORMULAS[i]), trace)[0].operator for i in (0, 2)]
+        self.assertEqual(operators, ["sweep join", "symmetric join"])
+        formula = parse_formula("(forall member m (n) () (exists store s (- k -) (-) (before s m)))")
+        self.assertEqual([step.operator for step in explain(formula, trace)], ["scan", "aggregate lookup"])
+        formula = parse_formula(FORMULAS[3])
+        memoize(formula)
+        self.assertIn("memo", [step.operator for step in explain(formula, trace)])
+
+    def test_same_as_actual(self):
+        # A tautology is evaluated for every pair of occurrences
+        formula = parse_formula("(forall member m (n) () (forall store s (- - -) (-) (or (before m s) (not (before m s)))))")
+        for seed in range(10):
+            trace = parse_log(random_log(seed), None)
+            steps = explain(formula, trace)
+            profiler = Profiler(formula)
+            self.assertTrue(formula.evaluate(trace, Environment(formula)))
+            profiler.detach()
+            for step in steps[:2]:
+                stats = profiler.stats[id(step.node)]
+                self.assertEqual((step.calls, step.evaluations), (stats.calls, stats.scanned))
+
+    def test_warnings(self):
+        formula = parse_formula("(forall member m (n) () (forall store s (- - -) (-) (forall member m2 (n2) () (before m s))))")
+        steps = explain(formula)
+        self.assertTrue(all(step.calls is None for step in steps[1:]))
+        warnings = complexity_warnings(steps)
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("O(n^3)", warnings[0])
+        self.assertEqual(complexity_warnings(explain(parse_formula(FORMULAS[0]))), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
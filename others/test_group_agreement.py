@@ -0,0 +1,79 @@
+import unittest
+from copy import deepcopy
+from parse_log import parse_log
+from parse_formula import parse_formula
+from optimizer import optimize, group_agreements
+from test_sweep_join import random_log
+from ast_nodes import *
+
+AGREEMENTS = [
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (n = n2)))",
+    "(forall store s (- - -) (n) (forall store s2 (- - -) (n2) (n2 = n)))",
+    "(forall store s (- k -) (n) (implies (not (n = 'node1)) (forall store s2 (- k -) (n2) (implies (not (n2 = 'node2)) (n = n2)))))",
+    "(forall member m (n) () (implies (not (n = 'node0)) (forall member m2 (n2) () (n = n2))))",
+]
+
+NOT_AGREEMENTS = [
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (implies (before s s2) (n = n2))))",
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (implies (not (n = 'node0)) (n = n2))))",
+    "(forall store s (- k -) (n) (forall store s2 (k - -) (n2) (n = n2)))",
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (k = n2)))",
+    "(forall store s (- k -) (n) (exists store s2 (- k -) (n2) (n = n2)))",
+]
+
+# Disables the physical operators of every quantifier, so that each one loops over the occurrences of its action
+def naive(formula: Formula) -> Formula:
+    formula = deepcopy(formula)
+    stack = [formula]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ActionQuantifier):
+            node.symmetric_join = None
+            if isinstance(node, ForAllAction):
+                node.sweep_join = None
+        stack.extend(node.get_children())
+    return formula
+
+class TestGroupAgreement(unittest.TestCase):
+
+    def test_detection(self):
+        for formula_str in AGREEMENTS:
+            self.assertIsInstance(group_agreements(parse_formula(formula_str), []), GroupAgreement, f"Not rewritten: {formula_str}")
+        for formula_str in NOT_AGREEMENTS:
+            self.assertNotIsInstance(group_agreements(parse_formula(formula_str), []), GroupAgreement, f"Rewritten: {formula_str}")
+
+    def test_same_as_naive(self):
+        for formula_str in AGREEMENTS:
+            formula = parse_formula(formula_str)
+            rewritten = group_agreements(parse_formula(formula_str), [])
+            for seed in range(30):
+                trace = parse_log(random_log(seed), None)
+                self.assertEqual(rewritten.evaluate(trace, Environment(rewritten)), naive(formula).evaluate(trace, Environment(formula)),
+                    f"Mismatch for {formula} on seed {seed}")
+
+    def test_after_hoisting(self):
+        formula = parse_formula("(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (forall member m (-) () "
+                                "(implies (and (in s m) (in s2 m)) (n = n2)))))")
+        # The premises are only hoisted when the member quantifier is moved outermost, on traces with fewer members than stores
+        rewritten = 0
+        for seed in range(30):
+            trace = parse_log(random_log(seed), None)
+            rewrites = []
+            optimized = optimize(formula, trace, rewrites)
+            rewritten += any(rewrite.startswith("Grouped store") for rewrite in rewrites)
+            self.assertEqual(optimized.evaluate(trace, Environment(optimized)), naive(formula).evaluate(trace, Environment(formula)),
+                f"Mismatch for {optimized} on seed {seed}")
+        self.assertGreater(rewritten, 0)
+
+    def test_bound_variables(self):
+        formula = parse_formula(AGREEMENTS[0])
+        rewritten = group_agreements(parse_formula(AGREEMENTS[0]), [])
+        for seed in range(30):
+            trace = parse_log(random_log(seed), None)
+            for store in ({"n": "node0"}, {"k": "key1"}):
+                self.assertEqual(rewritten.evaluate(trace, Environment(rewritten, store)), naive(formula).evaluate(trace, Environment(formula, store)),
+                    f"Mismatch for {formula} with {store} on seed {seed}")
+
+
+if __name__ == "__main__":
+    unittest.main()
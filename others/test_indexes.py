@@ -0,0 +1,219 @@
+import unittest
+import random
+from parse_log import parse_log
+from parse_formula import parse_formula
+from ast_nodes import *
+from indexes import IntervalTree, OrderIndex, EndpointTable, TimeRange, in_range
+
+LOG = """
+ 2000-01-01 12:00:00.00, Store, id-001, node1, key, value1
+ 2000-01-01 12:00:10.00, ReplyStore, id-001, node1
+ 2000-01-01 12:00:20.00, Store, id-002, node1, key, value2
+ 2000-01-01 12:00:30.00, ReplyStore, id-002, node1
+ 2000-01-01 12:00:30.00, Lookup, id-003, node2, key
+ 2000-01-01 12:00:40.00, ReplyLookup, id-003, node1, value2
+ 2000-01-01 12:00:50.00, Store, id-004, node1, key, value3
+"""
+
+class TestOrderIndex(unittest.TestCase):
+
+    def test_ranges(self):
+        trace = parse_log(LOG, None)
+        index = trace.get_order_index(ActionType.STORE)
+
+        # Store intervals: [0, 1], [2, 3], [5, inf]
+        self.assertEqual([SYMBOLS.name(o.input_values[2]) for o in index.ending_before(3)], ["value1"])
+        self.assertEqual([SYMBOLS.name(o.input_values[2]) for o in index.ending_at(3)], ["value2"])
+        self.assertEqual([SYMBOLS.name(o.input_values[2]) for o in index.ending_from(3)], ["value2", "value3"])
+        self.assertEqual([SYMBOLS.name(o.input_values[2]) for o in index.beginning_after(2)], ["value3"])
+        self.assertEqual([SYMBOLS.name(o.input_values[2]) for o in index.beginning_at(2)], ["value2"])
+        self.assertEqual([SYMBOLS.name(o.input_values[2]) for o in index.beginning_until(2)], ["value1", "value2"])
+        self.assertEqual(index.beginning_after(float("inf")), [])
+
+    def test_index_invalidated_on_insert(self):
+        trace = parse_log(LOG, None)
+        self.assertEqual(len(trace.get_order_index(ActionType.STORE).ending_before(10)), 2)
+
+        ongoing = trace.find_occurrences(ActionType.STORE)[-1]
+        trace.insert_end_event(ongoing, "id-004", [SYMBOLS.intern("node1")], datetime(2000, 1, 1, 12, 1))
+
+        self.assertEqual(len(trace.get_order_index(ActionType.STORE).ending_before(10)), 3)
+
+
+class TestValueIndex(unittest.TestCase):
+
+    def test_lookup_by_value(self):
+        trace = parse_log(LOG, None)
+
+        stores = trace.find_occurrences_by_input(ActionType.STORE, 2, SYMBOLS.intern("value2"))
+        self.assertEqual([o.interval_value for o in stores], [IntervalValue(2, 3)])
+        self.assertEqual(len(trace.find_occurrences_by_input(ActionType.STORE, 1, SYMBOLS.intern("key"))), 3)
+        self.assertEqual(trace.find_occurrences_by_input(ActionType.STORE, 1, SYMBOLS.intern("missing")), [])
+        # Outputs are indexed once the action terminates
+        self.assertEqual(len(trace.find_occurrences_by_output(ActionType.STORE, 0, SYMBOLS.intern("node1"))), 2)
+        self.assertEqual(len(trace.find_occurrences_by_output(ActionType.LOOKUP, 1, SYMBOLS.intern("value2"))), 1)
+
+    def test_arity_buckets(self):
+        trace = parse_log(LOG, None)
+
+        self.assertEqual(len(trace.find_occurrences_by_arity(ActionType.STORE, 3, 0)), 3)
+        # The ongoing store has no output values yet
+        self.assertEqual(len(trace.find_occurrences_by_arity(ActionType.STORE, 3, 1)), 2)
+        self.assertEqual(len(trace.find_occurrences_by_arity(ActionType.STORE, 4, 0)), 0)
+
+    def test_bound_variable(self):
+        log = "\n".join(f"2000-01-01 12:00:{i:02}.00, Lookup, l-{i}, node0, key{i % 5}\n2000-01-01 12:00:{i:02}.50, ReplyLookup, l-{i}, node0, value{i % 5}" for i in range(40))
+        trace = parse_log(log, None)
+
+        formula = parse_formula("(forall lookup l1 (- k) (- v1) (forall lookup l2 (- k) (- v2) (v1 = v2)))")
+        self.assertTrue(formula.evaluate(trace, Environment(formula)))
+
+        formula = parse_formula("(forall lookup l1 (- k) (- v1) (exists lookup l2 (- k2) (- v1) (not (k = k2))))")
+        self.assertFalse(formula.evaluate(trace, Environment(formula)))
+
+
+class TestIntervalTree(unittest.TestCase):
+
+    def test_against_scan(self):
+        rng = random.Random(0)
+        occurrences = []
+        for i in range(200):
+            begin = rng.randrange(100)
+            end = begin + rng.randrange(20) if i % 10 else None
+            occurrences.append(ActionValue(ActionType.MEMBER, IntervalValue(begin, end), [str(i)], []))
+        tree = IntervalTree(occurrences)
+
+        for _ in range(100):
+            begin = rng.randrange(110)
+            end = begin + rng.randrange(30) if rng.randrange(5) else float("inf")
+            key = lambda o: o.input_values[0]
+            overlapping = [o for o in occurrences if o.interval_value.begin <= end and o.interval_value.end >= begin]
+            containing = [o for o in occurrences if o.interval_value.begin <= begin and o.interval_value.end >= end]
+            within = [o for o in occurrences if o.interval_value.begin >= begin and o.interval_value.end <= end]
+            self.assertEqual(sorted(tree.overlapping(begin, end), key=key), sorted(overlapping, key=key))
+            self.assertEqual(sorted(tree.containing(begin, end), key=key), sorted(containing, key=key))
+            self.assertEqual(sorted(tree.within(begin, end), key=key), sorted(within, key=key))
+
+    def test_order_index_candidates(self):
+        rng = random.Random(1)
+        occurrences = []
+        for i in range(200):
+            begin = rng.randrange(100)
+            end = begin + rng.randrange(20) if i % 10 else None
+            occurrences.append(ActionValue(ActionType.MEMBER, IntervalValue(begin, end), [str(i)], []))
+        tree = IntervalTree(occurrences)
+        index = OrderIndex(occurrences)
+
+        # The order index returns candidates among which are the occurrences that the interval tree returns
+        for _ in range(100):
+            begin = rng.randrange(110)
+            end = begin + rng.randrange(30) if rng.randrange(5) else float("inf")
+            for query in ("overlapping", "containing", "within"):
+                candidates = set(map(id, getattr(index, query)(begin, end)))
+                self.assertLessEqual(set(map(id, getattr(tree, query)(begin, end))), candidates)
+
+    def test_relation_overlap_kinds(self):
+        formula = parse_formula("(intersects m s)")
+        self.assertEqual(formula.get_overlap("m"), ("s", {"overlapping"}))
+
+        formula = parse_formula("(or (in f i) (equals f i))")
+        self.assertEqual(formula.get_overlap("i"), ("f", {"overlapping", "containing"}))
+        self.assertEqual(formula.get_overlap("f"), ("i", {"overlapping", "within"}))
+
+        formula = parse_formula("(or (in f i) (before f i))")
+        self.assertIsNone(formula.get_overlap("f"))
+
+
+class TestEndpointTable(unittest.TestCase):
+
+    def test_against_scan(self):
+        rng = random.Random(0)
+        def random_range() -> TimeRange:
+            low = rng.randrange(-5, 110) if rng.randrange(4) else float("-inf")
+            high = low + rng.randrange(10) if rng.randrange(4) and low != float("-inf") else rng.choice([rng.randrange(110), float("inf")])
+            return (low, bool(rng.randrange(2)), high, bool(rng.randrange(2)))
+        for size in [1, 2, 3, 7, 64, 100]:
+            occurrences = []
+            for i in range(size):
+                begin = rng.randrange(100)
+                end = begin + rng.randrange(20) if i % 10 else None
+                occurrences.append(ActionValue(ActionType.MEMBER, IntervalValue(begin, end), [i], []))
+            table = EndpointTable(occurrences)
+            for _ in range(2000):
+                (end_range, begin_range) = (random_range(), random_range())
+                expected = any(in_range(o.interval_value.end, end_range) and in_range(o.interval_value.begin, begin_range) for o in occurrences)
+                self.assertEqual(table.exists(end_range, begin_range), expected, f"{size} occurrences, ends {end_range}, begins {begin_range}")
+            # Some ranges bounded on both sides were looked up in the segment tree
+            self.assertTrue(size < 7 or table.sorted_begins is not None)
+
+
+class TestOrderGuards(unittest.TestCase):
+
+    def test_exists_before(self):
+        trace = parse_log(LOG, None)
+        formula = parse_formula("(forall lookup l (- k) (- v) (exists store s (- k -) (-) (before s l)))")
+        self.assertTrue(formula.evaluate(trace, Environment(formula)))
+
+        # The store of value2 meets the lookup instead of preceding it
+        formula = parse_formula("(forall lookup l (- k) (- v) (exists store s (- k v) (-) (before s l)))")
+        self.assertFalse(formula.evaluate(trace, Environment(formula)))
+
+    def test_exists_meets(self):
+        trace = parse_log(LOG, None)
+        formula = parse_formula("(forall lookup l (- k) (- v) (exists store s (- k -) (-) (meets s l)))")
+        self.assertTrue(formula.evaluate(trace, Environment(formula)))
+
+        formula = parse_formula("(forall lookup l (- k) (- v) (exists store s (- k -) (-) (meets l s)))")
+        self.assertFalse(formula.evaluate(trace, Environment(formula)))
+
+    def test_exists_not_before(self):
+        trace = parse_log(LOG, None)
+        formula = parse_formula("(forall lookup l (- k) (- v) (exists store s (- k v) (-) (not (before l s))))")
+
+        self.assertTrue(formula.evaluate(trace, Environment(formula)))
+
+    def test_forall_premise(self):
+        trace = parse_log(LOG, None)
+        formula = parse_formula("(forall lookup l (- k) (- v) (forall store s (- k v2) () (implies (before l s) (v = v2))))")
+        self.assertFalse(formula.evaluate(trace, Environment(formula)))
+
+        formula = parse_formula("(forall lookup l (- k) (- v) (forall store s (- k v2) (-) (implies (before s l) (not (v2 = 'value3)))))")
+        self.assertTrue(formula.evaluate(trace, Environment(formula)))
+
+    def test_forall_without_premise_scans_everything(self):
+        trace = parse_log(LOG, None)
+        formula = parse_formula("(forall lookup l (- k) (- v) (forall store s (- k -) (-) (before s l)))")
+
+        self.assertFalse(formula.evaluate(trace, Environment(formula)))
+
+
+class TestOverlapGuards(unittest.TestCase):
+
+    def test_exists_intersects(self):
+        log = "\n".join(f"2000-01-01 12:00:{i:02}.00, Member, m-{i}, node{i % 3}\n2000-01-01 12:00:{i:02}.50, EndMember, m-{i}" for i in range(40))
+        log += "\n2000-01-01 12:01:00.00, Store, s-1, node0, key, value"
+        log += "\n2000-01-01 12:01:05.00, Member, m-40, node1"
+        log += "\n2000-01-01 12:01:10.00, ReplyStore, s-1, node0"
+        trace = parse_log(log, None)
+
+        formula = parse_formula("(forall store s (- - -) (n) (exists member m (n) () (intersects m s)))")
+        self.assertFalse(formula.evaluate(trace, Environment(formula)))
+
+        formula = parse_formula("(forall store s (- - -) (n) (exists member m (n2) () (intersects m s)))")
+        self.assertTrue(formula.evaluate(trace, Environment(formula)))
+
+        formula = parse_formula("(forall store s (- - -) (n) (forall member m (n2) () (implies (in m s) (n2 = 'node1))))")
+        self.assertTrue(formula.evaluate(trace, Environment(formula)))
+
+    def test_nested_guards(self):
+        # The guards of a quantifier are also found below the quantifiers of the same kind in its body,
+        # except the ones that depend on them
+        formula = parse_formula("(forall store s (- k -) (n) (forall member m (n2) () (implies (and (in s m) (n = n2)) (n = 'node1))))")
+        self.assertEqual(formula.guards, [])
+        self.assertEqual(len(formula.expression.guards), 2)
+        formula = parse_formula("(forall member m (n) () (forall store s (- k -) (n2) (implies (and (in s m) (n = 'node1)) (n2 = 'node1))))")
+        self.assertEqual(formula.guards, [formula.expression.expression.left.expressions[1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
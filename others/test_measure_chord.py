@@ -0,0 +1,58 @@
+import unittest
+import csv
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from measure_chord import read_timings, order_tasks, preprocess_prefixes, process_log_dirs_parallel
+
+LOGS = "logs/openChord"
+LOG_NAME = "openChord-3nodes-5keys-Stable-2"
+PROPERTIES = "specs/properties"
+
+class TestMeasureChord(unittest.TestCase):
+
+    def test_read_timings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "latest.csv")
+            self.assertEqual(read_timings(filename), {})
+            with open(filename, "w", newline="") as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=["log_name", "property", "original_trace_length", "eval_time"])
+                writer.writeheader()
+                writer.writerow({"log_name": "log", "property": "p", "original_trace_length": "100", "eval_time": "0.5"})
+                writer.writerow({"log_name": "log", "property": "q", "original_trace_length": "100", "eval_time": ""})
+            self.assertEqual(read_timings(filename), {("log", "p", 100): 0.5})
+
+    def test_order_tasks(self):
+        tasks = [("a.log", [(100, 10), (200, 20)], {"log_name": "a"}, name) for name in ("short", "new", "long")]
+        tasks.append(("b.log", [], {"log_name": "b"}, "short"))
+        order_tasks(tasks, {("a", "short", 200): 0.1, ("a", "long", 200): 2.0, ("a", "long", 100): 9.0, ("b", "short", 0): 1.0})
+        # Not timed first, then by the time of the largest prefix
+        self.assertEqual([(task[2]["log_name"], task[3]) for task in tasks], [("a", "new"), ("a", "long"), ("b", "short"), ("a", "short")])
+
+    def test_preprocess_prefixes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            destination = os.path.join(directory, "processed.log")
+            cut_points = preprocess_prefixes(os.path.join(LOGS, LOG_NAME), destination, [0, 100, 400, 10000], True, False)
+            with open(destination, "r") as file:
+                length = len(file.readlines())
+        self.assertEqual(cut_points[0], 0)
+        # The last cut point leaves out the events that the preprocessor adds after the last event of the log
+        self.assertTrue(0 < cut_points[1] < cut_points[2] < cut_points[3] <= length)
+
+    def test_parallel(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_dirs = [entry for entry in os.scandir(LOGS) if entry.name == LOG_NAME]
+            properties = OrderedDict((name, None) for name in ("key_consistency", "value_freshness"))
+            output_filename = os.path.join(directory, "timings.csv")
+            process_log_dirs_parallel(log_dirs, [200, 400], PROPERTIES, properties, directory, True, {}, output_filename,
+                {}, re.compile(r"(\d+)nodes"), 2, False)
+            with open(output_filename, "r", newline="") as csvfile:
+                rows = list(csv.DictReader(csvfile))
+        self.assertEqual(sorted((row["property"], row["original_trace_length"]) for row in rows),
+            [("key_consistency", "200"), ("key_consistency", "400"), ("value_freshness", "200"), ("value_freshness", "400")])
+        self.assertTrue(all(row["log_name"] == LOG_NAME and row["result"] in ("True", "False") for row in rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
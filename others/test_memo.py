@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime
+from parse_log import parse_log
+from parse_formula import parse_formula
+from test_sweep_join import random_log
+from ast_nodes import *
+
+class TestFreeVariables(unittest.TestCase):
+
+    def test_free_variables(self):
+        formula = parse_formula("(forall lookup l (- k) (- v) (exists store s (- k w) (-) (and (before s l) (in s i))))")
+        self.assertEqual(formula.get_free_variables(), ({"k", "v", "w"}, {"i"}))
+        self.assertEqual(formula.expression.get_free_variables(), ({"k", "w"}, {"l", "i"}))
+        self.assertEqual(formula.expression.expression.get_free_variables(), (set(), {"s", "l", "i"}))
+
+        formula = parse_formula("(forall lookup l (- -) (- -) ('value = v))")
+        self.assertEqual(formula.get_free_variables(), ({"v"}, set()))
+
+
+class TestMemo(unittest.TestCase):
+
+    def test_memoized_subformulas(self):
+        formula = parse_formula("(forall store s (- k -) (n) (forall member m (n2) () (exists member m2 (n) () (intersects m2 s))))")
+        memos = memoize(formula)
+        self.assertEqual(len(memos), 1)
+        self.assertIs(formula.expression.expression, memos[0])
+
+        # Every quantifier depends on the ones around it
+        formula = parse_formula("(forall store s (- k -) (n) (exists member m (n) () (intersects m s)))")
+        self.assertEqual(memoize(formula), [])
+
+    def test_same_as_unmemoized(self):
+        formula_strs = [
+            "(forall store s (- k -) (n) (forall member m (n2) () (exists member m2 (n) () (intersects m2 s))))",
+            "(forall store s (- k -) (-) (exists member m (n) () (or (in s m) (forall store s2 (- k -) (-) (not (before s2 s))))))",
+            "(exists member m (n) () (forall store s (- - -) (-) (exists store s2 (- k -) (n) (before m s2))))",
+        ]
+        for formula_str in formula_strs:
+            formula = parse_formula(formula_str)
+            memoized = parse_formula(formula_str)
+            memos = memoize(memoized, 2)
+            self.assertTrue(memos)
+            for seed in range(30):
+                trace = parse_log(random_log(seed), None)
+                self.assertEqual(memoized.evaluate(trace, Environment(memoized)), formula.evaluate(trace, Environment(formula)),
+                    f"Mismatch for {formula} on seed {seed}")
+            self.assertTrue(all(len(memo.cache) <= 2 for memo in memos))
+
+    def test_counters(self):
+        trace = parse_log(random_log(1), None)
+        formula = parse_formula("(forall store s (- - -) (-) (forall member m (-) () (exists member m2 (n) () (or (intersects m2 s) (not (intersects m2 s))))))")
+        (memo,) = memoize(formula)
+        self.assertTrue(formula.evaluate(trace, Environment(formula)))
+        stores = trace.find_occurrences_by_arity(ActionType.STORE, 3, 1)
+        members = trace.find_occurrences_by_arity(ActionType.MEMBER, 1, 0)
+        self.assertEqual(memo.misses, len(stores))
+        self.assertEqual(memo.hits, len(stores) * (len(members) - 1))
+
+    def test_cleared_when_trace_changes(self):
+        trace = parse_log("2000-01-01 12:00:00.00, Store, id-1, node0, key, value\n2000-01-01 12:00:01.00, Member, m-1, node1", None)
+        formula = parse_formula("(forall member m (-) () (exists store s (- - -) (n) (not (n = 'node0))))")
+        (memo,) = memoize(formula)
+        self.assertFalse(formula.evaluate(trace, Environment(formula)))
+
+        # The store completes with another node once the member began
+        store = trace.find_occurrences(ActionType.STORE)[0]
+        trace.insert_end_event(store, "id-1", [SYMBOLS.intern("node1")], datetime(2000, 1, 1, 12, 0, 2))
+        self.assertTrue(formula.evaluate(trace, Environment(formula)))
+
+
+if __name__ == "__main__":
+    unittest.main()
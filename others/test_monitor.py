@@ -0,0 +1,99 @@
+import unittest
+from copy import deepcopy
+from parse_log import parse_log, parse_log_line
+from parse_formula import parse_formula
+from monitor import Monitor, OnlineTrace, IncrementalQuantifier, evaluate_prefixes
+from test_sweep_join import random_log
+from ast_nodes import *
+
+FORMULAS = [
+    "(forall store s (- k -) (n) (exists member m (n) () (intersects m s)))",
+    "(exists member m (n) () (forall store s (- - -) (n) (before m s)))",
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (n = n2)))",
+    "(forall member m (n) () (forall store s (- k -) (n) (implies (in s m) (exists store s2 (- k -) (-) (before s2 s)))))",
+    "(exists store s (- k -) (n) (exists member m (n2) () (and (before s m) (not (n = n2)))))",
+    "(and (forall member m (n) () (not (n = 'node2))) (forall store s (- k -) (n) (exists member m (n) () (in s m))))",
+    "(or (forall member m (n) () (not (n = 'node2))) (exists store s (- - -) (n) (n = 'node1)))",
+    "(forall member m (n) () (forall member m2 (n2) () (or (equals m m2) (before m m2) (before m2 m) (n = n2))))",
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (forall member m (x) () (implies (and (in s m) (in s2 m)) (n = n2)))))",
+    "(forall store s (- - -) (n) (exists member m (x) () (intersects s m)))",
+    "(exists store s (- - -) (n) (exists member m (x) () (and (in s m) (n = x))))",
+]
+
+class TestMonitor(unittest.TestCase):
+
+    def test_same_as_offline(self):
+        for formula_str in FORMULAS:
+            formula = parse_formula(formula_str)
+            for seed in range(20):
+                monitor = Monitor(deepcopy(formula))
+                lines = random_log(seed).splitlines()
+                for (i, line) in enumerate(lines):
+                    monitor.process_line(line)
+                    trace = parse_log("\n".join(lines[:i + 1]), None)
+                    self.assertEqual(monitor.verdict, formula.evaluate(trace, Environment(formula)),
+                        f"Mismatch for {formula_str} on seed {seed} after line {i + 1}")
+
+    def test_prefixes(self):
+        for formula_str in FORMULAS:
+            formula = parse_formula(formula_str)
+            for seed in range(10):
+                log = random_log(seed)
+                cut_points = [7, 0, 3, 4, 12, 100, 7]
+                results = evaluate_prefixes(deepcopy(formula), log, cut_points)
+                self.assertEqual(len(results), len(cut_points))
+                for (cut_point, (verdict, parse_time, eval_time)) in zip(cut_points, results):
+                    trace = parse_log(log, cut_point)
+                    self.assertEqual(verdict, formula.evaluate(trace, Environment(formula)),
+                        f"Mismatch for {formula_str} on seed {seed} after {cut_point} lines")
+                    self.assertGreaterEqual(min(parse_time, eval_time), 0)
+
+    def test_pairs(self):
+        quantifier = IncrementalQuantifier(parse_formula(FORMULAS[2]))
+        self.assertIsNotNone(quantifier.inner)
+        self.assertEqual(quantifier.inner_link, [((False, 1), (False, 1))])
+        quantifier = IncrementalQuantifier(parse_formula(FORMULAS[0]))
+        self.assertIsNone(quantifier.inner)
+        self.assertEqual(list(quantifier.links), [ActionType.MEMBER])
+
+    def test_overlap(self):
+        # The members only change the results for the pairs of stores within them
+        quantifier = IncrementalQuantifier(parse_formula(FORMULAS[8]))
+        [(nested, link, overlap, monotone)] = quantifier.links[ActionType.MEMBER]
+        self.assertEqual((link, overlap, monotone), ([], {"overlapping", "containing"}, True))
+        self.assertEqual(quantifier.inner_overlap, None)
+        # A store that no longer intersects a member that ended may have lost its only witness
+        [(nested, link, overlap, monotone)] = IncrementalQuantifier(parse_formula(FORMULAS[9])).links[ActionType.MEMBER]
+        self.assertEqual((link, overlap, monotone), ([], {"overlapping"}, False))
+
+    def test_lost_witness(self):
+        # The store is equal to the member while both are ongoing, and no longer once the member ends
+        log = """2000-01-01 12:00:00.00, Member, m-1, node1
+2000-01-01 12:00:00.00, Store, s-1, node1, key, value
+2000-01-01 12:00:10.00, EndMember, m-1"""
+        monitor = Monitor(parse_formula("(forall store s (- - -) () (exists member m (n) () (equals s m)))"))
+        self.assertEqual([monitor.process_line(line) for line in log.splitlines()], [True, True, False])
+
+    def test_indexes(self):
+        lines = random_log(3).splitlines()
+        offline = parse_log("\n".join(lines), None)
+        trace = OnlineTrace()
+        # The indexes are built before the events, so that they are updated by each one
+        trace.get_order_index(ActionType.STORE)
+        arities = [(ActionType.STORE, 2, 1), (ActionType.STORE, 1, 0), (ActionType.MEMBER, 1, 0)]
+        for arity in arities:
+            trace.find_occurrences_by_arity(*arity)
+        ongoing_actions = {}
+        for line in lines:
+            parse_log_line(line, trace, ongoing_actions, False)
+        for arity in arities:
+            self.assertEqual(trace.find_occurrences_by_arity(*arity), offline.find_occurrences_by_arity(*arity))
+        self.assertEqual(len(trace.pop_changes()), sum(len(occurrences) for occurrences in offline.actions.values()) +
+            sum(occurrence.interval_value.end != float("inf") for occurrences in offline.actions.values() for occurrence in occurrences))
+        (online_index, offline_index) = (trace.get_order_index(ActionType.STORE), offline.get_order_index(ActionType.STORE))
+        self.assertEqual(online_index.begins, offline_index.begins)
+        self.assertEqual(online_index.ends, offline_index.ends)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import os
+from parse_log import parse_log
+from parse_formula import parse_formula, format_formula
+from optimizer import optimize
+from test_sweep_join import random_log
+from ast_nodes import *
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestOptimizer(unittest.TestCase):
+
+    def assert_same_result(self, formula_str: str, trace: Trace):
+        formula = parse_formula(formula_str)
+        optimized = optimize(formula, trace)
+        self.assertEqual(optimized.evaluate(trace, Environment(optimized)), formula.evaluate(trace, Environment(formula)),
+            f"Mismatch for {format_formula(optimized)}")
+
+    def test_reorder_and_hoist(self):
+        log = "\n".join(f"2000-01-01 12:00:{i:02}.00, Store, s-{i}, node0, key, value\n2000-01-01 12:00:{i:02}.50, ReplyStore, s-{i}, node0" for i in range(10))
+        log += "\n2000-01-01 12:01:00.00, Member, m-1, node0"
+        trace = parse_log(log, None)
+        formula = parse_formula("(forall store s1 (- k -) (-) (forall store s2 (- k -) (-) (forall member m (n) () (implies (and (in s1 m) (in s2 m) (before s1 s2)) (n = 'node0)))))")
+        optimized = optimize(formula, trace)
+
+        # The member has a single occurrence and is moved outermost, its premises with the first store
+        self.assertEqual(optimized.action.interval.label, "m")
+        self.assertEqual(optimized.expression.action.interval.label, "s1")
+        premise = optimized.expression.expression.left
+        self.assertEqual(repr(premise), repr(parse_formula("(in s1 m)")))
+        self.assertEqual(repr(optimized.expression.expression.right.expression.left), repr(parse_formula("(and (in s2 m) (before s1 s2))")))
+        # The given formula is unchanged
+        self.assertEqual(formula.action.interval.label, "s1")
+
+    def test_hoist_exists(self):
+        trace = parse_log(random_log(0), None)
+        formula = parse_formula("(forall store s (- k -) (n) (exists member m (n2) () (and (not (n = 'node0)) (intersects m s))))")
+        optimized = optimize(formula, trace)
+        self.assertIsInstance(optimized.expression, And)
+        self.assertIsInstance(optimized.expression.expressions[1], ExistsAction)
+
+    def test_same_as_unoptimized(self):
+        formula_strs = [
+            "(forall store s1 (- k -) (n1) (forall member m (n) () (forall store s2 (- k -) (n2) (implies (and (in s1 m) (in s2 m)) (n1 = n2)))))",
+            "(exists member m (n) () (exists store s (- k -) (n) (and (in s m) (not (k = 'key0)))))",
+            "(forall member m (n) () (forall store s (- k -) (-) (implies (intersects s m) (implies (k = 'key1) (exists member m2 (n) () (before m2 s))))))",
+            "(forall store s (- k -) (n) (exists member m (n2) () (and (not (n = 'node0)) (intersects m s))))",
+        ]
+        for formula_str in formula_strs:
+            for seed in range(30):
+                self.assert_same_result(formula_str, parse_log(random_log(seed), None))
+
+    def test_properties(self):
+        properties_dir = os.path.join(ROOT, "specs", "properties")
+        with open(os.path.join(ROOT, "logs", "openChord", "example.log")) as file:
+            trace = parse_log(file.read(), None)
+        for entry in sorted(os.listdir(properties_dir)):
+            with open(os.path.join(properties_dir, entry)) as file:
+                formula_str = file.read()
+            self.assert_same_result(formula_str, trace)
+            # The printed formula parses back to the same formula
+            optimized = optimize(parse_formula(formula_str), trace)
+            self.assertEqual(repr(parse_formula(format_formula(optimized))), repr(optimized))
+
+
+if __name__ == "__main__":
+    unittest.main()
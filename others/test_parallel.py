@@ -0,0 +1,57 @@
+import unittest
+from parse_log import parse_log
+from parse_formula import parse_formula
+from optimizer import optimize
+from parallel import evaluate_parallel, evaluate_chunk, WORK, OCCURRENCES_PER_CHECK
+from test_sweep_join import random_log
+from ast_nodes import *
+
+FORMULAS = [
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (implies (intersects s s2) (n = n2))))",
+    "(forall member m (n) () (forall store s (- - -) (n2) (or (before s m) (not (n = n2)))))",
+    "(exists store s (- k -) (n) (exists member m (n) () (in s m)))",
+    "(exists store s (- k -) (n) (exists store s2 (- k -) (n2) (and (intersects s s2) (not (n = n2)))))",
+    "(forall store s (- - -) (n) (exists member m (n) () (intersects m s)))",
+    "(forall member m (n) () (exists store s (- - -) (n) (before s m)))",
+]
+
+class TestParallel(unittest.TestCase):
+
+    def test_same_as_serial(self):
+        for formula_str in FORMULAS:
+            formula = parse_formula(formula_str)
+            for seed in range(10):
+                trace = parse_log(random_log(seed), None)
+                expected = formula.evaluate(trace, Environment(formula))
+                for jobs in (2, 3):
+                    self.assertEqual(evaluate_parallel(formula, trace, Environment(formula), jobs), expected,
+                        f"Mismatch for {formula} with {jobs} jobs on seed {seed}")
+
+    def test_optimized(self):
+        formula = parse_formula(open("specs/properties/value_consistency.actl").read())
+        trace = parse_log(random_log(0), None)
+        optimized = optimize(formula, trace)
+        self.assertEqual(evaluate_parallel(optimized, trace, Environment(optimized), 2), formula.evaluate(trace, Environment(formula)))
+
+    def test_chunk_stops_when_decided(self):
+        # Another chunk decides the quantifier while this one is being evaluated
+        class Decided:
+            def __init__(self):
+                self.checks = 0
+            def is_set(self) -> bool:
+                self.checks += 1
+                return self.checks > 1
+        log = "\n".join(f"2000-01-01 12:{i // 60:02}:{i % 60:02}.00, Member, m-{i}, node{i % 3}" for i in range(3 * OCCURRENCES_PER_CHECK))
+        trace = parse_log(log, None)
+        formula = parse_formula("(forall member m (n) () (not (n = 'node5)))")
+        occurrences = formula.find_candidates(trace, Environment(formula))
+        WORK.update(quantifier=formula, trace=trace, env=Environment(formula), symmetric_join=None, groups=[], chunks=[occurrences], decided=Decided())
+        try:
+            self.assertIsNone(evaluate_chunk(0))
+            self.assertEqual(WORK["decided"].checks, 2)
+        finally:
+            WORK.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
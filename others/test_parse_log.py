@@ -0,0 +1,70 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime
+from parse_log import parse_time, parse_event_type, parse_log, read_log
+from parse_formula import parse_formula
+from compiler import compile_formula
+from ast_nodes import ActionType, Environment, SYMBOLS
+
+LOG = """
+ 2000-01-01 12:00:00.00, Store, id-001, node1, key, value1
+ 2000-01-01 12:00:10.00, ReplyStore, id-001, node1
+ 2000-01-01 12:00:20.00, Store, id-002, node1, key, value2
+ 2000-01-01 12:00:30.00, ReplyStore, id-002, node1
+ 2000-01-01 12:00:30.00, Lookup, id-003, node2, key
+ 2000-01-01 12:00:40.00, ReplyLookup, id-003, node1, value2
+"""
+
+class TestParseLog(unittest.TestCase):
+
+    def test_parse_time(self):
+        for date in ["2025-07-23 17:31:13.907", "2000-01-01 12:00:00.000000", "1999-12-31 23:59:59.5", "2025-07-23 17:31:13.907123"]:
+            self.assertEqual(parse_time(date), datetime.strptime(date, "%Y-%m-%d %H:%M:%S.%f"))
+        for date in ["2025-07-23 17:31:13", "2025-13-23 17:31:13.907", "2025-07-23 25:31:13.907", "2025-07-23 17:31:13.9071234"]:
+            with self.assertRaises(ValueError):
+                parse_time(date)
+
+    def test_parse_event_type(self):
+        self.assertEqual(parse_event_type("STORE"), (ActionType.STORE, False))
+        self.assertEqual(parse_event_type("ReplySTORE"), (ActionType.STORE, True))
+        self.assertEqual(parse_event_type("EndMember"), (ActionType.MEMBER, True))
+        self.assertEqual(parse_event_type("ReadOnly"), (ActionType.READONLY, False))
+        self.assertEqual(parse_event_type("EndReadOnly"), (ActionType.READONLY, True))
+        self.assertIsNone(parse_event_type("RemoveSTORE"))
+
+    def test_read_log(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".log", delete=False) as file:
+            file.write(LOG)
+        try:
+            for max_lines in [None, 0, 3, 6]:
+                expected = parse_log(LOG, max_lines)
+                trace = parse_log(read_log(file.name), max_lines)
+                self.assertEqual([sorted(map(repr, events)) for events in trace.events],
+                    [sorted(map(repr, events)) for events in expected.events])
+            # The lines after max_lines are not read
+            lines = read_log(file.name)
+            parse_log(lines, 3)
+            self.assertEqual(next(lines).split(",")[2].strip(), "id-002")
+        finally:
+            os.remove(file.name)
+        self.assertEqual(len(parse_log(read_log(LOG), None).events), len(parse_log(LOG, None).events))
+
+    def test_symbols(self):
+        trace = parse_log(LOG, None)
+        (store, _) = trace.find_occurrences(ActionType.STORE)
+        self.assertEqual(store.input_values, [SYMBOLS.intern("node1"), SYMBOLS.intern("key"), SYMBOLS.intern("value1")])
+        self.assertEqual(list(map(SYMBOLS.name, store.output_values)), ["node1"])
+        # Values are named again to be printed
+        self.assertEqual(repr(store), "((0, 1), (node1, key, value1), (node1))")
+        self.assertEqual(next(iter(trace.events[0])).entry_str(), "2000-01-01 12:00:00.000, STORE, id-001, node1, key, value1")
+        formula = parse_formula("(exists store s (- k v) (n) (and (k = 'key) (v = 'value2)))")
+        self.assertTrue(formula.evaluate(trace, Environment(formula)))
+        self.assertTrue(compile_formula(formula).evaluate(trace, Environment(formula)))
+        formula = parse_formula("(exists store s (- k v) (n) (v = 'value3))")
+        self.assertFalse(formula.evaluate(trace, Environment(formula)))
+        self.assertEqual(repr(Environment(store={"k": "key"})), "Environment({'k': 'key'}, {})")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from parse_log import parse_log
+from parse_formula import parse_formula
+from profiler import Profiler
+from test_sweep_join import random_log
+from test_monitor import FORMULAS
+from ast_nodes import *
+
+class TestProfiler(unittest.TestCase):
+
+    def test_same_result(self):
+        for formula_str in FORMULAS:
+            for seed in range(10):
+                trace = parse_log(random_log(seed), None)
+                formula = parse_formula(formula_str)
+                expected = formula.evaluate(trace, Environment(formula))
+                profiler = Profiler(formula)
+                self.assertEqual(formula.evaluate(trace, Environment(formula)), expected)
+                self.assertEqual(profiler.stats[id(formula)].calls, 1)
+                profiler.detach()
+                self.assertNotIn("evaluate", formula.__dict__)
+
+    def test_counts(self):
+        trace = parse_log(random_log(3), None)
+        formula = parse_formula(FORMULAS[3])
+        profiler = Profiler(formula)
+        result = formula.evaluate(trace, Environment(formula))
+        (stats, inner) = (profiler.stats[id(formula)], profiler.stats[id(formula.expression)])
+        # The universal scans its occurrences until a counterexample, and evaluates its body for the matching ones
+        self.assertLessEqual(stats.scanned, len(trace.find_occurrences(ActionType.MEMBER)))
+        if result:
+            self.assertEqual(stats.scanned, len(trace.find_occurrences(ActionType.MEMBER)))
+        self.assertEqual(inner.calls, stats.scanned)
+        self.assertEqual(stats.short_circuits, int(not result))
+        self.assertLessEqual(inner.inclusive, stats.inclusive)
+        self.assertAlmostEqual(stats.exclusive + inner.inclusive, stats.inclusive)
+
+    def test_report(self):
+        trace = parse_log(random_log(5), None)
+        formula = parse_formula(FORMULAS[7])
+        profiler = Profiler(formula)
+        formula.evaluate(trace, Environment(formula))
+        report = profiler.report().splitlines()
+        self.assertEqual(len(report), 1 + len(profiler.stats))
+        self.assertTrue(report[1].endswith("∀ member[m] (n) -> () . …"))
+        stacks = profiler.collapsed_stacks().splitlines()
+        self.assertEqual(len(stacks), len(profiler.stacks))
+        for line in stacks:
+            (frames, time) = line.rsplit(" ", 1)
+            self.assertTrue(frames.startswith(profiler.labels[id(formula)]))
+            self.assertGreaterEqual(int(time), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
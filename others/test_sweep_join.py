@@ -0,0 +1,77 @@
+import unittest
+import random
+from datetime import datetime, timedelta
+from parse_log import parse_log
+from parse_formula import parse_formula
+from ast_nodes import *
+
+# Builds a random log of member and store actions over a few nodes, some of which never terminate
+def random_log(seed: int) -> str:
+    rng = random.Random(seed)
+    length = rng.randrange(4, 40)
+    start = datetime(2000, 1, 1, 12)
+    ongoing = []
+    lines = []
+    for i in range(length):
+        time = (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S.%f")
+        if ongoing and rng.random() < 0.5:
+            (action_type, id, values) = ongoing.pop(rng.randrange(len(ongoing)))
+            lines.append(f"{time}, End{action_type}, {id}, {values}" if action_type == "Member" else f"{time}, Reply{action_type}, {id}, {values}")
+            # Some actions end at the same time point as the next one begins
+            if rng.random() < 0.3:
+                continue
+        action_type = rng.choice(["Member", "Store"])
+        node = f"node{rng.randrange(3)}"
+        id = f"id-{i}"
+        if action_type == "Member":
+            lines.append(f"{time}, Member, {id}, {node}")
+            ongoing.append((action_type, id, ""))
+        else:
+            lines.append(f"{time}, Store, {id}, node0, key{rng.randrange(2)}, value")
+            ongoing.append((action_type, id, node))
+    return "\n".join(lines)
+
+class TestSweepJoin(unittest.TestCase):
+
+    def assert_same_as_naive(self, formula_str: str):
+        formula = parse_formula(formula_str)
+        self.assertIsNotNone(formula.sweep_join, f"Sweep join not chosen for {formula}")
+        for seed in range(30):
+            trace = parse_log(random_log(seed), None)
+            self.assertEqual(formula.evaluate(trace, Environment(formula)), formula.evaluate_naively(trace, Environment(formula), False),
+                f"Mismatch for {formula} on seed {seed}")
+
+    def test_intersects(self):
+        self.assert_same_as_naive("(forall store s (- - -) () (exists member m (-) () (intersects m s)))")
+
+    def test_shared_variable(self):
+        self.assert_same_as_naive("(forall store s (- - -) (n) (exists member m (n) () (intersects m s)))")
+
+    def test_in(self):
+        self.assert_same_as_naive("(forall store s (- - -) (n) (exists member m (n) () (in s m)))")
+        self.assert_same_as_naive("(forall store s (- - -) (n) (exists member m (n) () (in m s)))")
+
+    def test_disjunction(self):
+        self.assert_same_as_naive("(forall store s (- k -) (n) (or (exists member m (n) () (during s m)) (exists store s2 (- k -) () (overlaps s2 s))))")
+
+    def test_conjunction(self):
+        self.assert_same_as_naive("(forall store s (- k -) (n) (and (exists member m (n) () (intersects m s)) (exists member m (-) () (starts s m))))")
+
+    def test_outer_binding(self):
+        formula = parse_formula("(forall member m1 (n) () (forall store s (- - -) (n) (exists member m (n) () (intersects m s))))")
+        nested = formula.expression
+        self.assertIsNotNone(nested.sweep_join)
+        for seed in range(30):
+            trace = parse_log(random_log(seed), None)
+            for occurrence in trace.find_occurrences(ActionType.MEMBER):
+                store = {"n": occurrence.input_values[0]}
+                self.assertEqual(nested.evaluate(trace, Environment(nested, store)), nested.evaluate_naively(trace, Environment(nested, store), False))
+
+    def test_not_chosen(self):
+        self.assertIsNone(parse_formula("(forall store s (- - -) (n) (exists member m (n) () (before m s)))").sweep_join)
+        self.assertIsNone(parse_formula("(forall store s (- - -) (n) (exists member m (n2) () (and (intersects m s) (n = n2))))").sweep_join)
+        self.assertIsNone(parse_formula("(forall store s (- - -) (n) (exists member m (n) () (intersects m i)))").sweep_join)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from copy import deepcopy
+from parse_log import parse_log
+from parse_formula import parse_formula
+from optimizer import optimize
+from test_sweep_join import random_log
+from ast_nodes import *
+
+SYMMETRIC = [
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (n = n2)))",
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (implies (intersects s s2) (n2 = n))))",
+    "(forall member m (n) () (forall member m2 (n2) () (or (before m m2) (before m2 m) (intersects m m2) (n = n2))))",
+    "(forall member m (n) () (implies (not (n = 'node0)) (forall member m2 (n2) () (implies (not (n2 = 'node0)) (or (equals m m2) (not (n = n2)))))))",
+    "(exists store s (- k -) (n) (exists store s2 (- k -) (n2) (and (intersects s s2) (not (n = n2)))))",
+    "(forall member m (n) () (forall member m2 (n2) () (forall store s (- - -) (-) (implies (and (in m s) (in m2 s)) (n = n2)))))",
+]
+
+NOT_SYMMETRIC = [
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (implies (before s s2) (n = n2))))",
+    "(forall store s (- k -) (n) (forall store s2 (- - -) (n2) (n = n2)))",
+    "(forall store s (- k -) (n) (forall store s2 (k - -) (n2) (n = n2)))",
+    "(forall member m (n) () (forall store s (- - -) (n2) (n = n2)))",
+    "(forall store s (- k -) (n) (exists store s2 (- k -) (n2) (n = n2)))",
+    "(forall member m (n) () (implies (n = 'node0) (forall member m2 (n2) () (n = n2))))",
+]
+
+class TestSymmetricJoin(unittest.TestCase):
+
+    def evaluate_naively(self, formula: Formula, trace: Trace) -> bool:
+        formula = deepcopy(formula)
+        formula.symmetric_join = None
+        return formula.evaluate(trace, Environment(formula))
+
+    def test_detection(self):
+        for formula_str in SYMMETRIC:
+            self.assertIsNotNone(parse_formula(formula_str).symmetric_join, f"Symmetric join not chosen for {formula_str}")
+        for formula_str in NOT_SYMMETRIC:
+            self.assertIsNone(parse_formula(formula_str).symmetric_join, f"Symmetric join chosen for {formula_str}")
+
+    def test_same_as_naive(self):
+        for formula_str in SYMMETRIC:
+            formula = parse_formula(formula_str)
+            for seed in range(30):
+                trace = parse_log(random_log(seed), None)
+                self.assertEqual(formula.evaluate(trace, Environment(formula)), self.evaluate_naively(formula, trace),
+                    f"Mismatch for {formula} on seed {seed}")
+
+    def test_after_optimization(self):
+        formula = parse_formula("(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (forall member m (-) () "
+                                "(implies (and (in s m) (in s2 m)) (n = n2)))))")
+        for seed in range(30):
+            trace = parse_log(random_log(seed), None)
+            optimized = optimize(formula, trace)
+            self.assertEqual(optimized.evaluate(trace, Environment(optimized)), self.evaluate_naively(formula, trace),
+                f"Mismatch for {optimized} on seed {seed}")
+
+    def test_bound_variable(self):
+        formula = parse_formula("(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (n = n2)))")
+        for seed in range(30):
+            trace = parse_log(random_log(seed), None)
+            for store in ({"n": "node0"}, {"k": "key1"}):
+                self.assertEqual(formula.evaluate(trace, Environment(formula, store)),
+                    formula.evaluate_naively(trace, Environment(formula, store), False),
+                    f"Mismatch for {formula} with {store} on seed {seed}")
+
+
+if __name__ == "__main__":
+    unittest.main()
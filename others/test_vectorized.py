@@ -0,0 +1,60 @@
+import unittest
+from parse_log import parse_log
+from parse_formula import parse_formula
+from test_sweep_join import random_log
+import ast_nodes
+from ast_nodes import *
+
+FORMULAS = [
+    "(forall store s (- - -) (n) (exists member m (n) () (intersects m s)))",
+    "(forall store s (- k -) (n) (forall store s2 (- k -) (n2) (implies (overlaps s s2) (n = n2))))",
+    "(forall member m (n) () (exists store s (- k -) (n) (and (in s m) (not (k = 'key0)))))",
+    "(forall member m (n) () (forall store s (- - -) (n2) (or (before s m) (meets m s) (not (n = n2)))))",
+    "(forall store s (n k v) (-) (exists store s2 (n k v) (-) (and (starts s2 s) (not (equals s s2)))))",
+    "(forall store s (- k -) (-) (forall store s2 (- k -) (-) (or (during s s2) (finishes s s2) (equals s s2) (before s s2) (before s2 s) (intersects s s2))))",
+]
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestVectorized(unittest.TestCase):
+
+    def evaluate(self, formula: Formula, trace: Trace, threshold: int) -> bool:
+        saved = ast_nodes.VECTORIZE_THRESHOLD
+        ast_nodes.VECTORIZE_THRESHOLD = threshold
+        try:
+            return formula.evaluate(trace, Environment(formula))
+        finally:
+            ast_nodes.VECTORIZE_THRESHOLD = saved
+
+    def test_same_as_scalar(self):
+        for formula_str in FORMULAS:
+            formula = parse_formula(formula_str)
+            for seed in range(30):
+                trace = parse_log(random_log(seed), None)
+                self.assertEqual(self.evaluate(formula, trace, 0), self.evaluate(formula, trace, float("inf")),
+                    f"Mismatch for {formula} on seed {seed}")
+
+    def test_not_vectorizable(self):
+        self.assertIsNone(parse_formula("(forall store s (- - -) (n) (exists member m (n) () (intersects m s)))").column_leaves)
+        self.assertIsNotNone(parse_formula("(forall store s (- - -) (n) (exists member m (n) () (intersects m s)))").expression.column_leaves)
+        self.assertIsNone(parse_formula("(forall store s (- - -) (n) (- = n))").column_leaves)
+
+    def test_every_node_evaluates_columns(self):
+        def nodes(formula: Formula) -> list[Formula]:
+            return [formula] + [node for child in formula.get_children() for node in nodes(child)]
+        for formula_str in FORMULAS:
+            for quantifier in nodes(parse_formula(formula_str)):
+                if isinstance(quantifier, ActionQuantifier) and quantifier.column_leaves is not None:
+                    for node in nodes(quantifier.expression):
+                        self.assertTrue(hasattr(node, "evaluate_columns"), f"{type(node).__name__} in {quantifier}")
+
+    def test_ongoing_actions(self):
+        log = "\n".join(f"2000-01-01 12:00:{i:02}.00, Member, m-{i}, node{i % 3}" for i in range(40))
+        trace = parse_log(log, None)
+        for formula_str in ["(forall member m (n) () (forall member m2 (n) () (or (equals m m2) (finishes m m2) (finishes m2 m))))",
+                            "(exists member m (n) () (exists member m2 (n) () (and (starts m m2) (not (equals m m2)))))"]:
+            formula = parse_formula(formula_str)
+            self.assertEqual(self.evaluate(formula, trace, 0), self.evaluate(formula, trace, float("inf")), f"Mismatch for {formula}")
+
+
+if __name__ == "__main__":
+    unittest.main()
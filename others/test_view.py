@@ -0,0 +1,55 @@
+import unittest
+from datetime import datetime
+from parse_log import parse_log
+from parse_formula import parse_formula
+from test_sweep_join import random_log
+from test_monitor import FORMULAS
+from ast_nodes import *
+
+class TestView(unittest.TestCase):
+
+    def test_same_as_prefix(self):
+        for seed in range(6):
+            log = random_log(seed)
+            trace = parse_log(log, None)
+            for max_timepoint in range(len(trace)):
+                view = trace.view(max_timepoint=max_timepoint)
+                lines = sum(len(event_set) for event_set in trace.events[:max_timepoint + 1])
+                prefix = parse_log(log, lines)
+                self.assertEqual(len(view), len(prefix))
+                self.assertEqual(view.get_length(), prefix.get_length())
+                for action_type in (ActionType.MEMBER, ActionType.STORE):
+                    self.assertEqual(view.find_occurrences(action_type), prefix.find_occurrences(action_type))
+                for formula_str in FORMULAS:
+                    formula = parse_formula(formula_str)
+                    self.assertEqual(formula.evaluate(view, Environment(formula)), formula.evaluate(prefix, Environment(formula)),
+                        f"Mismatch for {formula_str} on seed {seed} up to time point {max_timepoint}")
+
+    def test_node(self):
+        trace = parse_log(random_log(7), None)
+        view = trace.view(node="node1")
+        members = view.find_occurrences(ActionType.MEMBER)
+        self.assertEqual(members, [occurrence for occurrence in trace.find_occurrences(ActionType.MEMBER)
+            if occurrence.input_values[0] == SYMBOLS.intern("node1")])
+        self.assertEqual(view.find_occurrences(ActionType.STORE), [])
+        self.assertEqual(view.find_occurrences_by_input(ActionType.MEMBER, 0, SYMBOLS.intern("node1")), members)
+        self.assertEqual(view.find_occurrences_by_input(ActionType.MEMBER, 0, SYMBOLS.intern("node2")), [])
+        # The occurrences are those of the trace
+        self.assertTrue(all(occurrence in trace.find_occurrences(ActionType.MEMBER) for occurrence in members))
+
+    def test_time_range(self):
+        trace = parse_log(random_log(5), None)
+        view = trace.view(time_range=(datetime(2000, 1, 1, 12, 0, 3), datetime(2000, 1, 1, 12, 0, 10)))
+        (first, last) = (view.first, view.last)
+        self.assertEqual(next(iter(trace.events[first])).get_time(), datetime(2000, 1, 1, 12, 0, 3))
+        self.assertEqual(next(iter(trace.events[last])).get_time(), datetime(2000, 1, 1, 12, 0, 10))
+        for occurrence in view.find_occurrences(ActionType.STORE):
+            self.assertTrue(first <= occurrence.interval_value.begin <= last)
+            self.assertTrue(occurrence.interval_value.end <= last or occurrence.interval_value.end == float("inf"))
+        self.assertIsNone(view.complete_event(next(iter(trace.events[0])), 0))
+        with self.assertRaises(TypeError):
+            view.insert_begin_event(ActionType.MEMBER, "id", ["node0"], datetime(2000, 1, 1, 13))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+DEBUG = False
+
+import multiprocessing
+
+from ast_nodes import *
+
+# Each job evaluates several chunks, so that chunks whose occurrences take longer do not leave the other jobs idle
+CHUNKS_PER_JOB = 4
+# Number of occurrences (or rows of a symmetric join) that a process evaluates before checking whether another chunk
+# decided the quantifier
+OCCURRENCES_PER_CHECK = 64
+
+# Work of the forked processes, set before forking them so that they share it copy-on-write with the parent:
+# the quantifier at the root of the formula, the trace, the environment and the chunks of its occurrences
+WORK: dict[str, Any] = {}
+
+# Evaluates a formula whose root is an action quantifier with the given number of processes, each one evaluating the body
+# for chunks of the occurrences of the action. The other chunks stop as soon as one of them decides the quantifier
+# (a counterexample for a universal, a witness for an existential). The formula is evaluated serially if its
+# root is not an action quantifier, if the processes cannot be forked, or if all the occurrences are handled at once
+# by a sweep join or an aggregate lookup.
+def evaluate_parallel(formula: Formula, trace: Trace, env: Environment, jobs: int) -> bool:
+    if jobs <= 1 or not isinstance(formula, ActionQuantifier) or "fork" not in multiprocessing.get_all_start_methods():
+        return formula.evaluate(trace, env)
+    quantifier = formula
+    if getattr(quantifier, "sweep_join", None) is not None or quantifier.aggregate_lookup is not None:
+        return formula.evaluate(trace, env)
+
+    short_circuit_on = isinstance(quantifier, ExistsAction)
+    symmetric_join = quantifier.symmetric_join
+    chunk_count = jobs * CHUNKS_PER_JOB
+    if symmetric_join is not None and symmetric_join.applies(env):
+        # Rows of the groups of a symmetric join, each one paired with the rows after it
+        groups = symmetric_join.find_groups(trace, env)
+        size = max(1, -(-sum(len(group) for group in groups) // chunk_count))
+        chunks = [(i, range(start, min(start + size, len(group)))) for (i, group) in enumerate(groups) for start in range(0, len(group), size)]
+    else:
+        (symmetric_join, groups) = (None, [])
+        occurrences = quantifier.find_candidates(trace, env)
+        size = max(1, -(-len(occurrences) // chunk_count))
+        chunks = [occurrences[start:start + size] for start in range(0, len(occurrences), size)]
+    if not chunks:
+        return not short_circuit_on
+    DEBUG and print(f"Evaluating {len(chunks)} chunks of {quantifier.action} with {jobs} processes")
+
+    context = multiprocessing.get_context("fork")
+    decided = context.Event()
+    WORK.update(quantifier=quantifier, trace=trace, env=env, symmetric_join=symmetric_join, groups=groups, chunks=chunks, decided=decided)
+    pool = context.Pool(min(jobs, len(chunks)))
+    try:
+        for result in pool.imap_unordered(evaluate_chunk, range(len(chunks))):
+            if result == short_circuit_on:
+                decided.set()
+                return short_circuit_on
+        return not short_circuit_on
+    finally:
+        # Terminating the processes can leave the pool waiting forever for the thread that hands out the chunks,
+        # blocked on the lock of their queue: the processes are left to stop the chunks that they evaluate, and to
+        # return at once for the remaining ones
+        pool.close()
+        pool.join()
+        WORK.clear()
+
+# Evaluates the quantifier over a chunk of its occurrences, in a forked process, a few occurrences at a time.
+# Returns None if another chunk decided the quantifier before this one was done.
+def evaluate_chunk(index: int) -> bool | None:
+    (quantifier, trace, env, decided) = (WORK["quantifier"], WORK["trace"], WORK["env"], WORK["decided"])
+    short_circuit_on = isinstance(quantifier, ExistsAction)
+    (symmetric_join, chunk) = (WORK["symmetric_join"], WORK["chunks"][index])
+    # The rows of a group of a symmetric join, or the occurrences
+    items = chunk[1] if symmetric_join is not None else chunk
+    for start in range(0, len(items), OCCURRENCES_PER_CHECK):
+        if decided.is_set():
+            return None
+        part = items[start:start + OCCURRENCES_PER_CHECK]
+        if symmetric_join is not None:
+            result = symmetric_join.evaluate_rows(trace, env, WORK["groups"][chunk[0]], part)
+        else:
+            result = quantifier.evaluate_occurrences(trace, env, part, short_circuit_on)
+        if result == short_circuit_on:
+            return short_circuit_on
+    return not short_circuit_on
@@ -6,6 +6,8 @@ import argparse
 
 from lark import Lark, Token, Tree, Transformer
 from ast_nodes import *
+from parse_log import parse_log, read_log
+from explain import explain, format_plan
 
 grammar = r"""
     ?start: expression
@@ -105,22 +107,20 @@ class ASTTransformer(Transformer):
         "equals": Equals,
     }
 
+    # Relations that are disjunctions of basic Allen relations, evaluated as a single node
+    RELATION_SETS = {
+        "in": ["starts", "during", "finishes"],
+        "intersects": ["equals", "starts", "during", "finishes", "started_by", "contains", "finished_by", "overlaps", "overlapped_by"],
+    }
+
     def relation(self, items):
         rel_type = items[0]
         a, b = items[1], items[2]
         
         if rel_type in self.RELATION_MAP:
             return self.RELATION_MAP[rel_type](a, b)
-        elif rel_type == "in":
-            return Or(Starts(a, b), During(a, b), Finishes(a, b))
-        elif rel_type == "intersects":
-            return Or(
-                Equals(a, b),
-                Or(Starts(a, b), During(a, b), Finishes(a, b)),
-                Or(Starts(b, a), During(b, a), Finishes(b, a)),
-                Overlaps(a, b),
-                Overlaps(b, a),
-            )
+        elif rel_type in self.RELATION_SETS:
+            return AllenRelationSet(rel_type, self.RELATION_SETS[rel_type], a, b)
         else:
             raise ValueError(f"Unknown relation {rel_type}")
 
@@ -163,12 +163,47 @@ def parse_formula(formula: str) -> Formula:
         if DEBUG:
             print("-"*50, "Tree:", sep="\n")
             print_tree(tree)
-        ast = ASTTransformer().transform(tree)
+        ast = resolve_slots(ASTTransformer().transform(tree))
     except Exception as e:
         print(f"Error parsing formula: {e}", file=sys.stderr)
         sys.exit(1)
     return ast
 
+# Relation names of the interval predicates, for printing formulas back in the syntax of the grammar
+RELATION_NAMES = {relation_cls: name for (name, relation_cls) in ASTTransformer.RELATION_MAP.items()}
+
+# Prints a formula in the syntax of the grammar, breaking lines at quantifiers and connectives
+def format_formula(formula: Formula, indent: int = 0) -> str:
+    padding = "  " * indent
+    if isinstance(formula, (Memo, GroupAgreement)):
+        return format_formula(formula.expression, indent)
+    if isinstance(formula, ActionQuantifier):
+        action = formula.action
+        keyword = "forall" if isinstance(formula, ForAllAction) else "exists"
+        inputs = " ".join(format_formula(variable) for variable in action.inputs)
+        outputs = " ".join(format_formula(variable) for variable in action.outputs)
+        header = f"{keyword} {action.get_action_type().name.lower()} {action.interval.label} ({inputs}) ({outputs})"
+        return f"{padding}({header}\n{format_formula(formula.expression, indent + 1)}\n{padding})"
+    if isinstance(formula, Not) and not isinstance(formula.expression, (ActionQuantifier, Memo, GroupAgreement, Not, And, Or, Implies)):
+        return f"{padding}(not {format_formula(formula.expression)})"
+    if isinstance(formula, (Not, And, Or, Implies)):
+        keyword = {Not: "not", And: "and", Or: "or", Implies: "implies"}[type(formula)]
+        expressions = "\n".join(format_formula(expression, indent + 1) for expression in formula.get_children())
+        return f"{padding}({keyword}\n{expressions}\n{padding})"
+    if isinstance(formula, Equal):
+        return f"{padding}({format_formula(formula.left)} = {format_formula(formula.right)})"
+    if isinstance(formula, AllenRelationSet):
+        return f"{padding}({formula.name} {formula.left.label} {formula.right.label})"
+    if type(formula) in RELATION_NAMES:
+        return f"{padding}({RELATION_NAMES[type(formula)]} {formula.left.label} {formula.right.label})"
+    if isinstance(formula, Wildcard):
+        return "-"
+    if isinstance(formula, Constant):
+        return f"'{formula.label}"
+    if isinstance(formula, Variable):
+        return formula.label
+    raise ValueError(f"Cannot format formula {formula} of {type(formula)}")
+
 def handle_input(value: str) -> str:
     # If the value is a file path, return its content
     if os.path.isfile(value):
@@ -189,6 +224,9 @@ def main():
     parser = argparse.ArgumentParser(description="Parse a formula from string or file")
     parser.add_argument("-d", "--debug", action="store_true", help="Enable debug output")
     parser.add_argument("-f", "--formula", type=handle_input, help="Path to formula file or formula string")
+    parser.add_argument("--explain", action="store_true", help="Print how each node of the formula will be evaluated, with the estimated number of evaluations on the log if given")
+    parser.add_argument("-l", "--log", help="Path to log file or log string, to estimate the number of evaluations with --explain")
+    parser.add_argument("-n", "--num-lines", type=int, default=None, help="Maximum number of lines of the log to process (default: all)")
     args = parser.parse_args()
 
     global DEBUG
@@ -206,6 +244,11 @@ def main():
 
     # Print the AST that was parsed from the formula
     print("-"*50, "Parsed formula:", ast, "-"*50, sep="\n")
+    if args.explain:
+        trace = parse_log(read_log(args.log), args.num_lines) if args.log is not None else None
+        # The subformulas are cached as when evaluating the formula
+        memoize(ast)
+        print("Plan:", format_plan(explain(ast, trace)), "-"*50, sep="\n")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,12 +4,17 @@ import os
 import sys
 import argparse
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator
 
 from ast_nodes import (
     Trace,
     ActionType,
     ActionValue,
+    SYMBOLS,
 )
+from columnar import ColumnarTrace
 
 EMPTY_VALUE = "no_value"
 
@@ -37,6 +42,64 @@ class DuplicateEndEventError(LogParsingError):
     def __str__(self) -> str:
         return f"End event '{self.id}' matches action that already terminated: '{self.action_value}'\n> {self.line.strip()}"
 
+# Event type fields by their text: the action type and whether the event ends the action, or None for the events that
+# are skipped. Filled with the fields written in the logs, and with any other known field the first time it is parsed.
+EVENT_TYPES: dict[str, tuple[ActionType, bool] | None] = {
+    prefix + name: (action_type, prefix != "")
+    for action_type in ActionType
+    for name in (action_type.value, action_type.value.title())
+    for prefix in ("", "Reply", "End")
+}
+
+# Returns the action type of an event type field and whether the event ends the action,
+# or None if the event is skipped
+def parse_event_type(full_event_action_type: str) -> tuple[ActionType, bool] | None:
+    if full_event_action_type in EVENT_TYPES:
+        return EVENT_TYPES[full_event_action_type]
+
+    if "Remove" in full_event_action_type:
+        #TODO:
+        # Convert to store
+        # Add bottom value to components if beginning of action
+        EVENT_TYPES[full_event_action_type] = None
+        return None
+
+    event_action_type = full_event_action_type.removeprefix("Reply").removeprefix("End")
+
+    if ActionType.has_value(event_action_type.upper()):
+        action_type = ActionType(event_action_type.upper())
+    else:
+        print(f"Unknown event action type: {full_event_action_type}", file=sys.stderr)
+        return None
+
+    # Begin event, or end event
+    if full_event_action_type == event_action_type:
+        EVENT_TYPES[full_event_action_type] = (action_type, False)
+    elif action_type == ActionType.FAIL or full_event_action_type.startswith("Reply") or "End" in full_event_action_type:
+        EVENT_TYPES[full_event_action_type] = (action_type, True)
+    else:
+        return None
+    return EVENT_TYPES[full_event_action_type]
+
+# Dates of the timestamps seen so far: year, month and day
+DATES: dict[str, tuple[int, int, int]] = {}
+
+# Parses a timestamp formatted as "%Y-%m-%d %H:%M:%S.%f" by slicing its fixed-width fields. Consecutive events often
+# share a timestamp, and all of them a few dates, which are cached.
+@lru_cache(maxsize=1024)
+def parse_time(date: str) -> datetime:
+    fraction = date[20:]
+    if not (len(date) > 20 and date[10] == " " and date[13] == ":" and date[16] == ":" and date[19] == "." and
+            len(fraction) <= 6 and (date[11:13] + date[14:16] + date[17:19] + fraction).isdigit()):
+        return datetime.strptime(date, "%Y-%m-%d %H:%M:%S.%f")
+    day = date[:10]
+    if day not in DATES:
+        parsed = datetime.strptime(day, "%Y-%m-%d")
+        DATES[day] = (parsed.year, parsed.month, parsed.day)
+    (year, month, day_of_month) = DATES[day]
+    # The fraction of a second is in microseconds once padded to 6 digits
+    return datetime(year, month, day_of_month, int(date[11:13]), int(date[14:16]), int(date[17:19]), int(fraction.ljust(6, "0")))
+
 def parse_log_line(line: str, trace: Trace, ongoing_actions: dict[str, ActionValue], ignore_non_operations: bool) -> None:
     line = line.strip()
     if not line or line.startswith("#"):
@@ -47,7 +110,7 @@ def parse_log_line(line: str, trace: Trace, ongoing_actions: dict[str, ActionVal
 
     # NOTE: Now removes empty strings from the list
     # TODO: double check logs to confirm it is the desired behaviour
-    components = [x.strip() for x in line.split(",") if x.strip()]
+    components = [x for x in map(str.strip, line.split(",")) if x]
     # components = list(map(lambda x: x.strip(","), line.strip().split(", ")))
 
     if len(components) < 3:
@@ -55,35 +118,27 @@ def parse_log_line(line: str, trace: Trace, ongoing_actions: dict[str, ActionVal
         return
 
     date, full_event_action_type, id = components[0:3]
-    values = components[3:]
+    # Values are stored as their numbers in the symbol table
+    values = list(map(SYMBOLS.intern, components[3:]))
 
-    time = datetime.strptime(date, "%Y-%m-%d %H:%M:%S.%f")
+    time = parse_time(date)
 
-    if "Remove" in full_event_action_type:
-        #TODO:
-        # Convert to store
-        # Add bottom value to components if beginning of action
-        return
-
-    event_action_type = full_event_action_type.removeprefix("Reply").removeprefix("End")
-
-    if ActionType.has_value(event_action_type.upper()):
-        action_type = ActionType(event_action_type.upper())
-    else:
-        print(f"Unknown event action type: {full_event_action_type}", file=sys.stderr)
+    event_type = parse_event_type(full_event_action_type)
+    if event_type is None:
         return
+    (action_type, end) = event_type
 
     # NOTE: Ignore non operations in log 
     if ignore_non_operations and action_type in (ActionType.IDEAL, ActionType.STABLE, ActionType.READONLY, ActionType.MEMBER, ActionType.RESPONSIBLE):
         return
 
     # Begin event
-    if full_event_action_type == event_action_type:
+    if not end:
         action_value = trace.insert_begin_event(action_type, id, values, time)
         ongoing_actions[id] = action_value
 
     # End event
-    elif action_type == ActionType.FAIL or full_event_action_type.startswith("Reply") or "End" in full_event_action_type:
+    else:
         #if action_type == ActionType.FAIL:
         #    values = []
         #if action_type == ActionType.LOOKUP and len(values) == 1:
@@ -96,21 +151,38 @@ def parse_log_line(line: str, trace: Trace, ongoing_actions: dict[str, ActionVal
         if not success:
             raise DuplicateEndEventError(line, id, action_value)
 
-def parse_log(log: str, max_lines: int | None, ignore_non_operations: bool = False) -> Trace:
-    trace = Trace()
+# Parses a log given as a string or as lines, such as the ones returned by read_log, which are only read up to max_lines,
+# into a trace or, if columnar, into a columnar trace (see ColumnarTrace)
+def parse_log(log: str | Iterable[str], max_lines: int | None, ignore_non_operations: bool = False, columnar: bool = False) -> Trace:
+    trace = ColumnarTrace() if columnar else Trace()
     ongoing_actions: dict[str, ActionValue] = {}
-    line_number = 1
-    for line in log.splitlines():
-        if max_lines is not None and line_number > max_lines:
-            break
+    lines = log.splitlines() if isinstance(log, str) else log
+    for (line_number, line) in enumerate(islice(lines, None if max_lines is None else max(max_lines, 0)), 1):
         try:
             parse_log_line(line, trace, ongoing_actions, ignore_non_operations)
         except LogParsingError as e:
             print(e.display(line_number), file=sys.stderr)
             sys.exit(1)
-        line_number += 1
     return trace
 
+# Returns the lines of a log lazily: read from the file if the value is the path of one, one buffer at a time,
+# or else split from the value as the log itself
+def read_log(value: str) -> Iterator[str]:
+    if not os.path.isfile(value):
+        return iter(value.splitlines())
+    if os.path.getsize(value) == 0:
+        print("Error: Input file is empty.", file=sys.stderr)
+        sys.exit(1)
+    return read_lines(value)
+
+def read_lines(path: str) -> Iterator[str]:
+    try:
+        with open(path, "r") as file:
+            yield from file
+    except OSError as e:
+        print(f"Error reading file: {e}", file=sys.stderr)
+        sys.exit(1)
+
 def handle_input(value: str) -> str:
     # If the value is a file path, return its content
     if os.path.isfile(value):
@@ -130,33 +202,37 @@ def handle_input(value: str) -> str:
 def main():
     parser = argparse.ArgumentParser(description="Parse a log from string or file")
     parser.add_argument("-d", "--debug", action="store_true", help="Enable debug output")
-    parser.add_argument("-l", "--log", type=handle_input, help="Path to log file or log string")
+    parser.add_argument("-l", "--log", help="Path to log file or log string")
     parser.add_argument("-n", "--num-lines", type=int, default=None, help="Maximum number of lines to process (default: all)")
     parser.add_argument("-i", "--ignore-non-operations", dest="ignore_non_operations", type=bool, default=False, help="Ignore non-operation events (default: False)")
+    parser.add_argument("-c", "--columnar", action="store_true", help="Store the trace in columns, using less memory per event")
     args = parser.parse_args()
 
     global DEBUG
     DEBUG = args.debug
+    if args.log == "":
+        print("Error: No input provided.", file=sys.stderr)
+        sys.exit(1)
+    # The lines of the log are parsed as they are read, up to the maximum number of lines
     if args.log is not None:
-        log = args.log
+        log = read_log(args.log)
     # If we do not have a log, read from stdin
     else:
         print("Enter log (Ctrl+D to end input):", file=sys.stderr)
-        log = sys.stdin.read().strip()
-    if not log:
-        print("Error: No input provided.", file=sys.stderr)
-        sys.exit(1)
-    trace = parse_log(args.log, args.num_lines, args.ignore_non_operations)
+        log = sys.stdin
+    trace = parse_log(log, args.num_lines, args.ignore_non_operations, args.columnar)
 
     # Print the trace that was parsed from the log
     if DEBUG:
+        if args.columnar:
+            trace.materialize()
         actions_str = ""
         for (action_type, values) in trace.actions.items():
             actions_str += f"\n{action_type.name.lower()}:"
             for value in values:
                 actions_str += f"\n{value}"
-        inputs_str = "\n".join([f"{action_type.name.lower()} {[i]}: {', '.join(values)}" for (action_type, i), values in trace.input_values.items()])
-        outputs_str = "\n".join([f"{action_type.name.lower()} {[i]}: {', '.join(values)}" for (action_type, i), values in trace.output_values.items()])
+        inputs_str = "\n".join([f"{action_type.name.lower()} {[i]}: {', '.join(map(SYMBOLS.name, values))}" for (action_type, i), values in trace.input_values.items()])
+        outputs_str = "\n".join([f"{action_type.name.lower()} {[i]}: {', '.join(map(SYMBOLS.name, values))}" for (action_type, i), values in trace.output_values.items()])
         print(f"{'-'*50}\nParsed trace action occurrences: {actions_str}\n{'-'*50}\nParsed trace input values:\n{inputs_str}\n{'-'*50}\nParsed trace output values:\n{outputs_str}")
     events_str = ""
     for (i, event_set) in enumerate(trace.events):
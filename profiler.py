@@ -0,0 +1,139 @@
+DEBUG = False
+
+from collections import defaultdict
+from time import perf_counter
+
+from ast_nodes import *
+
+# Leaves of the formula, evaluated by their parents as part of their own work
+LEAVES = (Variable, Interval, IntervalValue, Constant, Action)
+
+# Statistics of a node of the formula over the evaluation
+class NodeStats:
+    def __init__(self):
+        self.calls = 0
+        # Occurrences bound to the interval of a quantifier, one by one or as rows of columns
+        self.scanned = 0
+        # Calls decided before evaluating all the operands or occurrences: by a counterexample or witness for
+        # a quantifier, by the first decisive operand for a conjunction or disjunction, by a cached result for a memo
+        self.short_circuits = 0
+        # Time spent in the calls, including and excluding the calls of the nodes below
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+# Records the statistics of each node of a formula while it is evaluated by walking its tree. The evaluate method of
+# each node is replaced, on the node itself, by one that times the original method, so that a formula that is not
+# profiled is evaluated as before. The calls that the physical operators (joins, aggregate lookups) and the vectorized
+# evaluation of a body make to the nodes below a quantifier are recorded as they occur, the others being part of the
+# work of the quantifier.
+class Profiler:
+    def __init__(self, formula: Formula):
+        self.formula = formula
+        self.stats: dict[int, NodeStats] = {}
+        self.labels: dict[int, str] = {}
+        # Calls in progress: node, time spent in the calls below it, number of calls below it
+        self.stack: list[list] = []
+        # Exclusive time by stack of nodes
+        self.stacks: defaultdict[tuple[int, ...], float] = defaultdict(float)
+        self.attached: list[Formula] = []
+        self.attach(formula)
+
+    # Instruments the node and the ones below it, once each even if shared
+    def attach(self, node: Formula) -> None:
+        if id(node) in self.stats or isinstance(node, LEAVES):
+            return
+        children = [child for child in node.get_children() if not isinstance(child, LEAVES)]
+        self.stats[id(node)] = NodeStats()
+        self.labels[id(node)] = label(node, children)
+        self.instrument(node, len(children))
+        self.attached.append(node)
+        for child in children:
+            self.attach(child)
+
+    def instrument(self, node: Formula, child_count: int) -> None:
+        evaluate = node.evaluate
+        stats = self.stats[id(node)]
+        stack = self.stack
+        stacks = self.stacks
+        decisive = isinstance(node, (ExistsAction, Exists)) if isinstance(node, (ActionQuantifier, Quantifier)) else None
+
+        def profiled_evaluate(trace: Trace, env: Environment) -> Any:
+            frame = [id(node), 0.0, 0]
+            stack.append(frame)
+            start = perf_counter()
+            try:
+                result = evaluate(trace, env)
+            finally:
+                elapsed = perf_counter() - start
+                stack.pop()
+            stats.calls += 1
+            stats.inclusive += elapsed
+            exclusive = elapsed - frame[1]
+            stats.exclusive += exclusive
+            stacks[tuple(caller[0] for caller in stack) + (id(node),)] += exclusive
+            if stack:
+                stack[-1][1] += elapsed
+                stack[-1][2] += 1
+            if decisive is not None:
+                stats.short_circuits += result == decisive
+            elif isinstance(node, (And, Or, Memo)):
+                stats.short_circuits += frame[2] < child_count
+            return result
+
+        node.evaluate = profiled_evaluate
+        if isinstance(node, ActionQuantifier):
+            bind_occurrence = node.bind_occurrence
+            evaluate_columns_naively = node.evaluate_columns_naively
+
+            def profiled_bind_occurrence(occurrence: ActionValue, env: Environment) -> bool:
+                stats.scanned += 1
+                return bind_occurrence(occurrence, env)
+
+            def profiled_evaluate_columns_naively(trace: Trace, env: Environment, occurrences: list[ActionValue], short_circuit_on: bool) -> bool:
+                stats.scanned += len(occurrences)
+                return evaluate_columns_naively(trace, env, occurrences, short_circuit_on)
+
+            node.bind_occurrence = profiled_bind_occurrence
+            node.evaluate_columns_naively = profiled_evaluate_columns_naively
+
+    # Restores the methods of the nodes
+    def detach(self) -> None:
+        for node in self.attached:
+            for name in ("evaluate", "bind_occurrence", "evaluate_columns_naively"):
+                node.__dict__.pop(name, None)
+        self.attached = []
+
+    # Returns the formula tree, one node per line indented below its parent, with the statistics of each node
+    def report(self) -> str:
+        lines = [f"{'calls':>10} {'scanned':>10} {'short':>10} {'incl (s)':>10} {'excl (s)':>10}  formula"]
+
+        def visit(node: Formula, depth: int) -> None:
+            if isinstance(node, LEAVES):
+                return
+            stats = self.stats[id(node)]
+            scanned = stats.scanned if isinstance(node, ActionQuantifier) else "-"
+            lines.append(f"{stats.calls:>10} {scanned:>10} {stats.short_circuits:>10} {stats.inclusive:>10.4f} {stats.exclusive:>10.4f}  "
+                f"{'  ' * depth}{self.labels[id(node)]}")
+            for child in node.get_children():
+                visit(child, depth + 1)
+
+        visit(self.formula, 0)
+        return "\n".join(lines)
+
+    # Returns the exclusive time of each stack of nodes in microseconds, one "root;...;node time" line per stack,
+    # the collapsed format read by flame graph tools
+    def collapsed_stacks(self) -> str:
+        lines = []
+        for (stack, exclusive) in self.stacks.items():
+            frames = ";".join(self.labels[node_id].replace(";", ",") for node_id in stack)
+            lines.append(f"{frames} {round(exclusive * 1e6)}")
+        return "\n".join(lines) + "\n"
+
+# Returns the representation of the node with the ones of the given children elided
+def label(node: Formula, children: list[Formula]) -> str:
+    text = repr(node)
+    for child in children:
+        text = text.replace(repr(child), "…", 1)
+    if text == "…":
+        text = f"{type(node).__name__.lower()} …"
+    return " ".join(text.split())